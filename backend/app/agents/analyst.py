@@ -1,21 +1,64 @@
-from typing import Dict, Callable
-from groq import Groq
+from typing import Dict, Callable, List, Optional, Tuple
 from app.config import settings
+from app.utils.cancellation import CancellationToken, StageTimeout
+from app.utils.llm_client import LLM_ERRORS, llm_client
+from app.utils.metrics import metrics
+from app.utils.model_router import model_router
+from app.utils.token_budget import TokenBudget, truncate_to_tokens
 import json
 
 
 class AnalystAgent:
     """Analyst Agent - Analyzes patterns and forms hypotheses using LLM"""
     
-    def __init__(self, progress_callback: Callable = None):
+    def __init__(self, progress_callback: Callable = None, job_class: str = "interactive",
+                 cancel_token: CancellationToken = None):
         self.progress_callback = progress_callback
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        self.job_class = job_class  # Scheduling class for LLM requests (interactive/batch)
+        self.cancel_token = cancel_token or CancellationToken()
     
     def emit_progress(self, message: str, data: Dict = None):
         """Emit progress message"""
         if self.progress_callback:
             self.progress_callback("analyst", message, data or {})
     
+    def web_source_keys(self, scout_data: Dict) -> List[str]:
+        """Identifiers of the web sources in scout_data (their links, or titles without one)"""
+        return [
+            result.get('link') or result['title']
+            for results in (scout_data.get('web_search_results') or {}).values()
+            for result in results
+        ]
+    
+    def summarize_web_evidence(self, scout_data: Dict, already_sent: List[str] = None) -> List[str]:
+        """Format scraped web results as prompt bullet points, skipping sources already_sent"""
+        already_sent = set(already_sent or [])
+        web_summary = []
+        if scout_data.get('web_search_results'):
+            for category, results in scout_data['web_search_results'].items():
+                for result in results:
+                    # Prefer the shared per-source summary over raw scraped text
+                    if result.get('summary') == "UNRELATED":
+                        continue
+                    if (result.get('link') or result['title']) in already_sent:
+                        continue
+                    content = truncate_to_tokens(
+                        result.get('summary') or result.get('full_content', ''),
+                        settings.ANALYST_EVIDENCE_ITEM_TOKENS
+                    )
+                    web_summary.append(
+                        f"- [{result['title']}] {result['snippet']}\n  Content: {content}"
+                    )
+        return web_summary
+    
+    def fit_prompt_sections(self, patterns_summary: List[str], web_summary: List[str], contributors: List[str]) -> Dict[str, List[str]]:
+        """Trim variable prompt sections to the analyst token budget, by priority"""
+        budget = TokenBudget(settings.ANALYST_PROMPT_TOKEN_BUDGET)
+        budget.add("patterns", patterns_summary, priority=0)
+        budget.add("evidence", web_summary, priority=1, min_tokens=settings.ANALYST_EVIDENCE_ITEM_TOKENS)
+        budget.add("contributors", contributors, priority=2, min_tokens=30)
+        return budget.fit()
+    
     def build_analysis_prompt(self, scout_data: Dict) -> str:
         """Build prompt for LLM analysis"""
         
@@ -42,13 +85,17 @@ class AnalystAgent:
                 )
         
         # Summarize web findings
-        web_summary = []
-        if scout_data.get('web_search_results'):
-            for category, results in scout_data['web_search_results'].items():
-                for result in results:
-                    web_summary.append(
-                        f"- [{result['title']}] {result['snippet']}\n  Content: {result.get('full_content', '')[:500]}"
-                    )
+        web_summary = self.summarize_web_evidence(scout_data)
+        
+        contributors = [
+            f"- {c.get('name', c.get('username', 'Unknown'))}: {c.get('commit_count', c.get('contributions', 0))} commits"
+            for c in scout_data.get('top_contributors', [])
+        ]
+        
+        # Fit patterns, evidence and contributors into the token budget
+        sections = self.fit_prompt_sections(patterns_summary, web_summary, contributors)
+        patterns_summary = sections['patterns']
+        web_summary = sections['evidence']
         
         prompt = f"""You are an expert code archaeologist analyzing a GitHub repository's history.
 
@@ -64,10 +111,10 @@ class AnalystAgent:
 {chr(10).join(patterns_summary) if patterns_summary else "No significant patterns detected"}
 
 ## Web Research Findings:
-{chr(10).join(web_summary[:5]) if web_summary else "No web context found"}
+{chr(10).join(web_summary) if web_summary else "No web context found"}
 
 ## Top Contributors:
-{chr(10).join([f"- {c.get('name', c.get('username', 'Unknown'))}: {c.get('commit_count', c.get('contributions', 0))} commits" for c in scout_data.get('top_contributors', [])[:3]])}
+{chr(10).join(sections['contributors'])}
 
 ---
 
@@ -88,8 +135,95 @@ Be objective. Base confidence on evidence strength. If web sources provide clear
 
         return prompt
     
-    def parse_llm_response(self, response_text: str) -> Dict:
-        """Parse and validate LLM response"""
+    def build_delta_prompt(self, scout_data: Dict, previous_analysis: Dict) -> str:
+        """Build a follow-up prompt containing only the new web evidence.
+        
+        Used for re-analysis rounds: the repository stats, patterns and any
+        sources shown in earlier rounds (previous_analysis['sources_sent'])
+        are already in the conversation, so only the delta is sent.
+        """
+        new_evidence = self.summarize_web_evidence(scout_data, previous_analysis.get('sources_sent'))
+        web_summary = self.fit_prompt_sections([], new_evidence, [])['evidence']
+        
+        prompt = f"""## New Web Research Findings:
+{chr(10).join(web_summary) if web_summary else "The web search returned no additional context."}
+
+---
+
+Your previous hypothesis was: "{previous_analysis.get('hypothesis', 'unknown')}" with {previous_analysis.get('confidence', 0)}% confidence.
+
+Re-evaluate it in light of the new findings above. Keep everything you concluded from the git data unless the new evidence contradicts it.
+
+Respond in the same JSON format as before, adding one field:
+{{
+    "confidence_change_reason": "Why confidence went up, down or stayed the same, citing the specific new evidence"
+}}
+
+If the new sources confirm the hypothesis, confidence should be 80+. If they are irrelevant, keep confidence close to its previous value."""
+
+        return prompt
+    
+    def pre_analyze(self, scout_data: Dict) -> Optional[Dict]:
+        """Rule-based analysis for cases the collected signals already decide.
+        
+        Returns a complete analysis dict when a rule fires, otherwise None
+        so the LLM is consulted.
+        """
+        if not settings.FASTPATH_ENABLED:
+            return None
+        
+        repo_info = (scout_data.get('github_data') or {}).get('repo_info') or {}
+        patterns = scout_data.get('patterns_detected', {})
+        stop = patterns.get('sudden_stop')
+        decay = patterns.get('gradual_decay')
+        
+        # Rule 1: GitHub says the repository is archived
+        if repo_info.get('is_archived'):
+            last_activity = f" after its last commit on {scout_data['last_commit_date'][:10]}" if scout_data.get('last_commit_date') else ""
+            return {
+                "hypothesis": f"{scout_data['repo_name']} was officially archived by its maintainers on GitHub{last_activity} and is no longer maintained.",
+                "confidence": settings.FASTPATH_ARCHIVED_CONFIDENCE,
+                "reasoning": [
+                    "GitHub marks the repository as archived (read-only)",
+                    f"{scout_data['total_commits']} commits from {scout_data['contributors_count']} contributors over {scout_data['active_period_months']:.1f} months",
+                    f"No commits for {stop['months_since']:.0f} months" if stop else "Archiving is an explicit maintainer decision"
+                ],
+                "evidence_quality": "strong",
+                "needs_more_evidence": False,
+                "key_findings": ["Repository archived on GitHub"],
+                "likely_cause": "archived",
+                "fast_path": "archived"
+            }
+        
+        # Rule 2: long dormant with a steep decline before the stop
+        if (
+            stop and decay
+            and stop['months_since'] >= settings.FASTPATH_DORMANT_MONTHS
+            and decay['decline_percentage'] >= settings.FASTPATH_MIN_DECAY_PERCENT
+        ):
+            years = stop['months_since'] / 12
+            return {
+                "hypothesis": f"{scout_data['repo_name']} was gradually abandoned: activity declined {decay['decline_percentage']:.0f}% before development stopped {years:.0f} years ago.",
+                "confidence": settings.FASTPATH_DORMANT_CONFIDENCE,
+                "reasoning": [
+                    f"No commits since {stop['last_activity'][:10]} ({stop['months_since']:.0f} months)",
+                    f"Commit rate fell from {decay['early_avg']} to {decay['later_avg']} per month",
+                    "A long decline followed by silence is characteristic of abandonment"
+                ],
+                "evidence_quality": "medium",
+                "needs_more_evidence": False,
+                "key_findings": [
+                    f"Dormant for {years:.0f}+ years",
+                    f"{decay['decline_percentage']:.0f}% decline in activity"
+                ],
+                "likely_cause": "abandonment",
+                "fast_path": "dormant"
+            }
+        
+        return None
+    
+    def parse_llm_response(self, response_text: str, strict: bool = False) -> Dict:
+        """Parse and validate LLM response (strict raises ValueError instead of returning a default)"""
         try:
             # Try to extract JSON from response
             # Sometimes LLM adds extra text, so find JSON block
@@ -114,6 +248,9 @@ Be objective. Base confidence on evidence strength. If web sources provide clear
                 raise ValueError("No JSON found in response")
         
         except Exception as e:
+            if strict:
+                raise ValueError(str(e)) from e
+            
             self.emit_progress(f"Failed to parse LLM response: {e}")
             # Return default structure
             return {
@@ -126,38 +263,162 @@ Be objective. Base confidence on evidence strength. If web sources provide clear
                 "likely_cause": "unknown"
             }
     
-    def analyze(self, scout_data: Dict, previous_analysis: Dict = None) -> Dict:
-        """Analyze Scout's findings and form hypothesis"""
+    def request_completion(self, messages: List[Dict], model: str) -> Dict:
+        """Single analyst completion (identical prompts are served from the response cache)"""
+        completion = llm_client.complete(
+            messages=messages,
+            model=model,
+            agent="analyst",
+            job_class=self.job_class,
+            hedge=True,
+            cancel_token=self.cancel_token,
+            temperature=0.3,  # Lower temperature for more consistent analysis
+            max_tokens=1000
+        )
+        
+        if completion['queue_wait_seconds'] > 1:
+            self.emit_progress(f"Waited {completion['queue_wait_seconds']:.1f}s for LLM quota")
+        
+        if completion['cached']:
+            self.emit_progress("Reusing cached analysis for identical evidence")
+        
+        return completion
+    
+    def should_escalate(self, confidence: int, has_web_evidence: bool) -> bool:
+        """Whether a parsed answer is borderline enough to re-check on the next model.
+        
+        Git-only answers are told to stay at 60-70%, so they are not
+        escalated; the web round that follows decides them instead.
+        """
+        return has_web_evidence and abs(confidence - settings.CONFIDENCE_THRESHOLD) <= settings.ANALYST_ESCALATION_MARGIN
+    
+    def run_model_ladder(self, messages: List[Dict], allow_escalation: bool = True,
+                         has_web_evidence: bool = True) -> Tuple[Dict, List[Dict], Dict]:
+        """Analyze with the fastest model first, escalating when needed.
+        
+        A response that is not valid JSON gets one targeted repair request
+        on the same model; if that fails too, or a web-informed confidence
+        falls within ANALYST_ESCALATION_MARGIN of the threshold, the next
+        model up the ladder is asked (unless allow_escalation is False).
+        Returns the analysis, its conversation and the token usage summed
+        over all calls.
+        """
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        model = model_router.smallest
+        
+        while True:
+            conversation = list(messages)
+            analysis = None
+            
+            for attempt in range(2):
+                completion = self.request_completion(conversation, model)
+                usage["prompt_tokens"] += completion['usage']['prompt_tokens']
+                usage["completion_tokens"] += completion['usage']['completion_tokens']
+                conversation.append({"role": "assistant", "content": completion['content']})
+                
+                try:
+                    analysis = self.parse_llm_response(completion['content'], strict=True)
+                    break
+                except ValueError as e:
+                    if attempt == 0:
+                        metrics.incr("analyst.parse_retries")
+                        self.emit_progress(f"Response from {model} was not valid JSON ({e}) - requesting a corrected answer")
+                        conversation.append({
+                            "role": "user",
+                            "content": f"Your previous reply could not be parsed: {e}. Reply again with ONLY the JSON object in the requested format, including hypothesis, confidence and reasoning."
+                        })
+            
+            next_model = model_router.next_model(model) if allow_escalation else None
+            
+            if analysis is None:
+                if next_model:
+                    metrics.incr("analyst.escalations")
+                    self.emit_progress(f"Escalating to {next_model} after unparseable responses from {model}")
+                    model = next_model
+                    continue
+                # Top of the ladder and still unparseable: fall back to the default result
+                analysis = self.parse_llm_response(completion['content'])
+            
+            elif next_model and self.should_escalate(analysis['confidence'], has_web_evidence):
+                metrics.incr("analyst.escalations")
+                self.emit_progress(
+                    f"Confidence {analysis['confidence']}% from {model} is borderline - escalating to {next_model}"
+                )
+                model = next_model
+                continue
+            
+            analysis['model'] = model
+            return analysis, conversation, usage
+    
+    def analyze(self, scout_data: Dict, previous_analysis: Dict = None, conversation: List[Dict] = None,
+                allow_escalation: bool = True) -> Dict:
+        """Analyze Scout's findings and form hypothesis.
+        
+        When a previous analysis and its conversation are given, the round
+        continues that conversation and sends only the new web evidence.
+        The returned analysis carries the updated conversation under
+        'conversation' for the next round. allow_escalation=False keeps
+        the analysis on the fastest model.
+        """
         
         self.emit_progress("Analyst agent activated")
-        self.emit_progress("Processing commit patterns...")
+        
+        is_followup = bool(conversation) and bool(previous_analysis) and not previous_analysis.get('error')
         
         try:
-            # Build prompt
-            prompt = self.build_analysis_prompt(scout_data)
+            # Decisive signals need no LLM call
+            if not is_followup:
+                fast_analysis = self.pre_analyze(scout_data)
+                if fast_analysis:
+                    metrics.incr("analyst.fast_path")
+                    metrics.incr(f"analyst.fast_path.{fast_analysis['fast_path']}")
+                    self.emit_progress(
+                        f"Decisive signals found ({fast_analysis['fast_path']}) - skipping LLM analysis",
+                        {"fast_path": fast_analysis['fast_path']}
+                    )
+                    self.emit_progress(
+                        f"Analysis complete: {fast_analysis['hypothesis'][:100]}...",
+                        {"confidence": fast_analysis['confidence']}
+                    )
+                    self.emit_progress(f"Confidence score: {fast_analysis['confidence']}%")
+                    return fast_analysis
             
-            self.emit_progress("Consulting AI model for pattern analysis...")
+            metrics.incr("analyst.llm")
             
-            # Call Groq LLM
-            chat_completion = self.client.chat.completions.create(
-                messages=[
+            if is_followup:
+                # Re-analysis: keep round one's context, send only the delta
+                self.emit_progress("Re-evaluating previous hypothesis with new evidence...")
+                messages = conversation + [
+                    {
+                        "role": "user",
+                        "content": self.build_delta_prompt(scout_data, previous_analysis)
+                    }
+                ]
+            else:
+                self.emit_progress("Processing commit patterns...")
+                messages = [
                     {
                         "role": "system",
                         "content": "You are an expert software archaeologist specializing in analyzing abandoned codebases. You provide data-driven insights based on git history and external sources."
                     },
                     {
                         "role": "user",
-                        "content": prompt
+                        "content": self.build_analysis_prompt(scout_data)
                     }
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.3,  # Lower temperature for more consistent analysis
-                max_tokens=1000
+                ]
+            
+            self.emit_progress("Consulting AI model for pattern analysis...")
+            
+            # Call Groq LLM, starting with the fastest model on the ladder
+            analysis, analysis_conversation, usage = self.run_model_ladder(
+                messages, allow_escalation, has_web_evidence=bool(self.summarize_web_evidence(scout_data))
             )
             
-            # Parse response
-            response_text = chat_completion.choices[0].message.content
-            analysis = self.parse_llm_response(response_text)
+            analysis['conversation'] = analysis_conversation
+            analysis['token_usage'] = usage
+            # Sources now in the conversation; later rounds send only the rest
+            previously_sent = previous_analysis.get('sources_sent', []) if is_followup else []
+            analysis['sources_sent'] = list(dict.fromkeys(previously_sent + self.web_source_keys(scout_data)))
             
             # Emit progress with confidence
             confidence = analysis['confidence']
@@ -168,10 +429,20 @@ Be objective. Base confidence on evidence strength. If web sources provide clear
             
             self.emit_progress(f"Confidence score: {confidence}%")
             
+            # Explain how the new evidence moved the confidence
+            if is_followup:
+                previous_confidence = previous_analysis.get('confidence', 0)
+                analysis['previous_confidence'] = previous_confidence
+                self.emit_progress(
+                    f"Confidence changed from {previous_confidence}% to {confidence}%: "
+                    f"{analysis.get('confidence_change_reason', 'no reason given')}",
+                    {"previous_confidence": previous_confidence, "confidence": confidence}
+                )
+            
             # Determine if more evidence needed
-            if confidence < 70:
+            if confidence < settings.CONFIDENCE_THRESHOLD:
                 self.emit_progress(
-                    "⚠️ Confidence below threshold (70%) - more evidence recommended",
+                    f"⚠️ Confidence below threshold ({settings.CONFIDENCE_THRESHOLD}%) - more evidence recommended",
                     {"needs_verification": True}
                 )
                 analysis['needs_more_evidence'] = True
@@ -184,6 +455,10 @@ Be objective. Base confidence on evidence strength. If web sources provide clear
             
             return analysis
         
+        except (StageTimeout, *LLM_ERRORS):
+            # Out of time or the model is unreachable - fail the attempt so it
+            # is retried from its checkpoint instead of saving an error result
+            raise
         except Exception as e:
             self.emit_progress(f"Analysis failed: {str(e)}")
             return {
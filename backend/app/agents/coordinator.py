@@ -1,8 +1,24 @@
-from typing import TypedDict, Annotated, Literal
+import time
+from datetime import datetime
+from typing import TypedDict, Annotated, Literal, Optional
+from concurrent.futures import ThreadPoolExecutor
 from langgraph.graph import StateGraph, END
 from app.agents.scout import ScoutAgent
 from app.agents.analyst import AnalystAgent
 from app.agents.narrator import NarratorAgent
+from app.config import settings
+from app.utils.cancellation import CancellationToken
+from app.utils.metrics import metrics
+
+
+# Typical stage durations (seconds) used for time budgeting until enough runs are observed
+DEFAULT_STAGE_SECONDS = {
+    "scout": 20.0,
+    "web": 30.0,
+    "analyst": 10.0,
+    "narrator": 30.0,
+    "narrator_brief": 10.0
+}
 
 
 class InvestigationState(TypedDict):
@@ -17,16 +33,40 @@ class InvestigationState(TypedDict):
     current_round: int
     max_rounds: int
     messages: list
+    token_usage: dict
+    last_node: str
 
 
 class Coordinator:
     """Coordinator orchestrates multi-agent investigation using LangGraph"""
     
-    def __init__(self, progress_callback=None):
+    def __init__(self, progress_callback=None, stream_callback=None, job_class: str = "interactive",
+                 checkpoint_callback=None, cancel_token: CancellationToken = None):
         self.progress_callback = progress_callback
-        self.scout = ScoutAgent(progress_callback)
-        self.analyst = AnalystAgent(progress_callback)
-        self.narrator = NarratorAgent(progress_callback)
+        self.checkpoint_callback = checkpoint_callback  # Called with (node, state) after each node
+        self.cancel_token = cancel_token or CancellationToken()
+        self.scout = ScoutAgent(progress_callback, job_class=job_class, cancel_token=self.cancel_token)
+        self.analyst = AnalystAgent(progress_callback, job_class=job_class, cancel_token=self.cancel_token)
+        self.narrator = NarratorAgent(progress_callback, stream_callback, job_class=job_class,
+                                      cancel_token=self.cancel_token)
+        
+        # Optional latency target for the whole investigation (set by investigate)
+        self.deadline = None
+        self.brief_report = False
+        self.budget_decisions = []
+        
+        # Deadlines for LLM-bound nodes (scout sets its own per clone/log/web stage)
+        self.stage_timeouts = {
+            "analyst": settings.STAGE_TIMEOUT_ANALYST_SECONDS,
+            "narrator": settings.STAGE_TIMEOUT_NARRATOR_SECONDS
+        }
+        
+        # Speculative execution: off, web (prefetch web evidence) or full (also prepare the narrator)
+        self.speculative_mode = settings.SPECULATIVE_MODE
+        self._executor = None
+        self._speculative_web = None
+        self._speculative_token = None
+        self._narrator_prep = None
         
         # Build LangGraph workflow
         self.workflow = self.build_workflow()
@@ -36,6 +76,36 @@ class Coordinator:
         if self.progress_callback:
             self.progress_callback("coordinator", message, data or {})
     
+    def start_speculation(self, state: InvestigationState):
+        """Kick off work the graph may need later, in parallel with the analyst"""
+        if self.speculative_mode not in ("web", "full"):
+            return
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculative")
+        
+        scout_data = state['scout_data']
+        self.emit_progress("Speculatively gathering web evidence in parallel with analysis", {"speculative": True})
+        self._speculative_token = self.cancel_token.child()
+        self._speculative_web = self._executor.submit(
+            self.scout.search_web, state['repo_url'], scout_data['repo_name'], self._speculative_token
+        )
+        
+        if self.speculative_mode == "full":
+            self._narrator_prep = self._executor.submit(self.narrator.prepare, scout_data)
+    
+    def discard_speculative_web(self):
+        """Drop prefetched web evidence that turned out not to be needed"""
+        if self._speculative_web is None:
+            return
+        # Future.cancel() cannot stop a search that already started; the token can
+        self._speculative_web.cancel()
+        self._speculative_token.cancel("Speculative web search discarded")
+        self._speculative_web = None
+        self._speculative_token = None
+        metrics.incr("speculative.web.discarded")
+        self.emit_progress("Discarding speculative web evidence (not needed)", {"speculative": True})
+    
     def scout_node(self, state: InvestigationState) -> InvestigationState:
         """Scout agent node - gathers data"""
         self.emit_progress("Routing to Scout Agent")
@@ -49,11 +119,22 @@ class Coordinator:
         else:
             self.emit_progress("Scout analyzing git repository")
         
-        # Run scout
-        scout_data = self.scout.investigate(
-            repo_url=state['repo_url'],
-            include_web_search=do_web_search
-        )
+        if do_web_search and self._speculative_web is not None:
+            # Web evidence was prefetched while the analyst ran; no need to re-clone
+            scout_data = {
+                **state['scout_data'],
+                "web_search_results": self._speculative_web.result()
+            }
+            self._speculative_web = None
+            self._speculative_token = None
+            metrics.incr("speculative.web.used")
+            self.emit_progress("Using speculatively gathered web evidence", {"speculative": True})
+        else:
+            # Run scout
+            scout_data = self.scout.investigate(
+                repo_url=state['repo_url'],
+                include_web_search=do_web_search
+            )
         
         # Merge web search results if we already have scout data
         if state.get('scout_data') and do_web_search:
@@ -69,6 +150,8 @@ class Coordinator:
         if do_web_search:
             state['web_search_done'] = True
             state['needs_web_search'] = False  # Reset the flag after doing web search
+        else:
+            self.start_speculation(state)
         
         return state
     
@@ -76,30 +159,46 @@ class Coordinator:
         """Analyst agent node - analyzes patterns"""
         self.emit_progress("Routing to Analyst Agent")
         
+        # Escalating to a larger model costs roughly another analyst call
+        allow_escalation = True
+        if self.short_on_time("analyst", "analyst", "narrator"):
+            allow_escalation = False
+            self.record_budget_decision(
+                "no_model_escalation",
+                "Time budget is tight - analyst will stay on the fastest model"
+            )
+        
         # Run analyst
         analysis = self.analyst.analyze(
             scout_data=state['scout_data'],
-            previous_analysis=state.get('analysis')
+            previous_analysis=state.get('analysis'),
+            conversation=state.get('messages'),
+            allow_escalation=allow_escalation
         )
         
+        # Keep the analyst conversation for delta re-analysis, out of the analysis itself
+        state['messages'] = analysis.pop('conversation', state.get('messages', []))
+        self.record_token_usage(state, "analyst", analysis.pop('token_usage', None))
+        
         # Update state
         state['analysis'] = analysis
         state['confidence'] = analysis['confidence']
         
         # Determine if we need more evidence
-        if analysis['confidence'] < 70 and not state.get('web_search_done', False):
+        if analysis['confidence'] < settings.CONFIDENCE_THRESHOLD and not state.get('web_search_done', False):
             state['needs_web_search'] = True
             self.emit_progress(
-                f"Confidence {analysis['confidence']}% is below threshold (70%)",
+                f"Confidence {analysis['confidence']}% is below threshold ({settings.CONFIDENCE_THRESHOLD}%)",
                 {"decision": "request_more_evidence"}
             )
         else:
             state['needs_web_search'] = False
-            if analysis['confidence'] >= 70:
+            if analysis['confidence'] >= settings.CONFIDENCE_THRESHOLD:
                 self.emit_progress(
                     f"Confidence {analysis['confidence']}% meets threshold",
                     {"decision": "proceed_to_report"}
                 )
+                self.discard_speculative_web()
         
         return state
     
@@ -107,17 +206,112 @@ class Coordinator:
         """Narrator agent node - generates report"""
         self.emit_progress("Routing to Narrator Agent")
         
+        # Use narrator parts prepared ahead of time, if any
+        prepared = None
+        if self._narrator_prep is not None:
+            prepared = self._narrator_prep.result()
+            self._narrator_prep = None
+        
+        # A full report won't fit the remaining budget - write a condensed one
+        self.brief_report = self.short_on_time("narrator")
+        if self.brief_report:
+            self.record_budget_decision(
+                "brief_report",
+                "Time budget is tight - generating a condensed report with the fastest model"
+            )
+        
         # Run narrator
         report = self.narrator.generate_report(
             scout_data=state['scout_data'],
-            analysis=state['analysis']
+            analysis=state['analysis'],
+            prepared=prepared,
+            brief=self.brief_report
         )
         
         # Update state
         state['report'] = report
+        self.record_token_usage(state, "narrator", report.get('metadata', {}).get('token_usage'))
         
         return state
     
+    def time_remaining(self) -> Optional[float]:
+        """Seconds left in the time budget (None if there is no budget)"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+    
+    def estimate_stage(self, stage: str) -> float:
+        """Expected duration of a stage: p75 of recent runs, or a default"""
+        key = f"coordinator.stage.{stage}"
+        if metrics.sample_count(key) >= settings.STAGE_ESTIMATE_MIN_SAMPLES:
+            return metrics.percentile(key, 75)
+        return DEFAULT_STAGE_SECONDS[stage]
+    
+    def short_on_time(self, *stages: str) -> bool:
+        """True if the remaining budget can't cover the given stages"""
+        remaining = self.time_remaining()
+        if remaining is None:
+            return False
+        return remaining < sum(self.estimate_stage(stage) for stage in stages)
+    
+    def record_budget_decision(self, decision: str, message: str):
+        """Log a cheaper-path choice made to stay within the time budget"""
+        self.budget_decisions.append(decision)
+        metrics.incr(f"coordinator.budget.{decision}")
+        self.emit_progress(message, {
+            "decision": decision,
+            "time_remaining": round(self.time_remaining(), 1)
+        })
+    
+    def checkpointed(self, name: str, node):
+        """Wrap a node so it honours cancellation and its deadline, and its state is checkpointed"""
+        def run(state: InvestigationState) -> InvestigationState:
+            # Timed per stage so budget estimates reflect real durations
+            stage = name
+            if name == "scout" and state.get('needs_web_search'):
+                stage = "web"
+            started = time.monotonic()
+            
+            with self.cancel_token.stage(name, self.stage_timeouts.get(name)):
+                state = node(state)
+            
+            if name == "narrator" and self.brief_report:
+                stage = "narrator_brief"
+            metrics.observe(f"coordinator.stage.{stage}", time.monotonic() - started)
+            state['last_node'] = name
+            if self.checkpoint_callback:
+                self.checkpoint_callback(name, state)
+            return state
+        return run
+    
+    def resume_node(self, state: InvestigationState) -> InvestigationState:
+        """Entry node - passes state through so routing can pick up after a checkpoint"""
+        if state.get('last_node'):
+            self.emit_progress(f"Resuming investigation after {state['last_node']} step")
+        return state
+    
+    def route_resume(self, state: InvestigationState) -> Literal["scout", "analyst", "narrator", "end"]:
+        """Continue from the node after the last completed one"""
+        last_node = state.get('last_node')
+        if last_node == "scout":
+            return "analyst"
+        if last_node == "analyst":
+            return self.should_gather_more_evidence(state)
+        if last_node == "narrator":
+            return "end"
+        return "scout"
+    
+    def record_token_usage(self, state: InvestigationState, agent: str, usage: dict):
+        """Accumulate actual prompt/completion tokens per agent"""
+        if not usage:
+            return
+        totals = state.setdefault('token_usage', {}).setdefault(
+            agent, {"prompt_tokens": 0, "completion_tokens": 0, "calls": 0}
+        )
+        totals["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        totals["completion_tokens"] += usage.get("completion_tokens", 0)
+        totals["calls"] += 1
+    
     def should_gather_more_evidence(self, state: InvestigationState) -> Literal["scout", "narrator"]:
         """Decide whether to gather more evidence or proceed to report"""
         
@@ -130,13 +324,23 @@ class Coordinator:
         confidence = state.get('confidence', 0)
         web_search_done = state.get('web_search_done', False)
         
-        if confidence < 70 and not web_search_done:
-            self.emit_progress(f"Decision: Confidence {confidence}% < 70%, gathering web evidence")
+        if confidence < settings.CONFIDENCE_THRESHOLD and not web_search_done:
+            # Another scout + analyst round must still leave room for the report
+            if self.short_on_time("web", "analyst", "narrator"):
+                state['needs_web_search'] = False
+                self.discard_speculative_web()
+                self.record_budget_decision(
+                    "skip_web_search",
+                    f"Decision: Confidence {confidence}% < {settings.CONFIDENCE_THRESHOLD}%, but the time budget can't fit a web round - generating report"
+                )
+                return "narrator"
+            
+            self.emit_progress(f"Decision: Confidence {confidence}% < {settings.CONFIDENCE_THRESHOLD}%, gathering web evidence")
             state['needs_web_search'] = True
             return "scout"
         
         # Otherwise proceed to narrator
-        if confidence >= 70:
+        if confidence >= settings.CONFIDENCE_THRESHOLD:
             self.emit_progress(f"Decision: Confidence {confidence}% meets threshold, generating report")
         else:
             self.emit_progress(f"Decision: Web search done, generating report with {confidence}% confidence")
@@ -149,12 +353,23 @@ class Coordinator:
         workflow = StateGraph(InvestigationState)
         
         # Add nodes
-        workflow.add_node("scout", self.scout_node)
-        workflow.add_node("analyst", self.analyst_node)
-        workflow.add_node("narrator", self.narrator_node)
+        workflow.add_node("resume", self.resume_node)
+        workflow.add_node("scout", self.checkpointed("scout", self.scout_node))
+        workflow.add_node("analyst", self.checkpointed("analyst", self.analyst_node))
+        workflow.add_node("narrator", self.checkpointed("narrator", self.narrator_node))
         
-        # Set entry point
-        workflow.set_entry_point("scout")
+        # Set entry point - fresh runs route straight to scout
+        workflow.set_entry_point("resume")
+        workflow.add_conditional_edges(
+            "resume",
+            self.route_resume,
+            {
+                "scout": "scout",
+                "analyst": "analyst",
+                "narrator": "narrator",
+                "end": END
+            }
+        )
         
         # Add edges
         workflow.add_edge("scout", "analyst")
@@ -175,12 +390,36 @@ class Coordinator:
         # Compile
         return workflow.compile()
     
-    def investigate(self, repo_url: str, max_rounds: int = 3) -> dict:
-        """Run complete investigation"""
+    def investigate(self, repo_url: str, max_rounds: int = 3, resume_state: dict = None,
+                    time_budget: float = None, deadline_at: datetime = None) -> dict:
+        """Run complete investigation, or continue one from a checkpointed state.
+        
+        time_budget (seconds) is a latency target: when the remaining time
+        can't cover the estimated cost of the next stages, the coordinator
+        skips the web round, keeps the analyst on the fastest model or
+        writes a condensed report. It never aborts work already underway.
+        The budget runs from now unless deadline_at (UTC) fixes its end,
+        as it does for queued jobs, whose budget started at submission.
+        """
         
-        self.emit_progress("Investigation started")
+        if resume_state:
+            self.emit_progress("Investigation resumed from checkpoint")
+        else:
+            self.emit_progress("Investigation started")
         self.emit_progress(f"Repository: {repo_url}")
         
+        self.budget_decisions = []
+        if deadline_at:
+            self.deadline = time.monotonic() + (deadline_at - datetime.utcnow()).total_seconds()
+        else:
+            self.deadline = time.monotonic() + time_budget if time_budget else None
+        if self.deadline is not None:
+            remaining = self.time_remaining()
+            self.emit_progress(
+                f"Time budget: {max(remaining, 0):.0f}s left",
+                {"time_budget": time_budget, "time_remaining": round(remaining, 1)}
+            )
+        
         # Initialize state
         initial_state: InvestigationState = {
             "repo_url": repo_url,
@@ -192,11 +431,21 @@ class Coordinator:
             "web_search_done": False,
             "current_round": 0,
             "max_rounds": max_rounds,
-            "messages": []
+            "messages": [],
+            "token_usage": {},
+            "last_node": ""
         }
+        if resume_state:
+            initial_state.update(resume_state)
         
         # Run workflow
-        final_state = self.workflow.invoke(initial_state)
+        try:
+            final_state = self.workflow.invoke(initial_state)
+        finally:
+            self.discard_speculative_web()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
         
         self.emit_progress("Investigation complete!")
         
@@ -207,5 +456,7 @@ class Coordinator:
             "rounds_taken": final_state.get('current_round', 0),
             "web_search_performed": final_state.get('web_search_done', False),
             "analysis": final_state.get('analysis', {}),
-            "scout_data": final_state.get('scout_data', {})
+            "scout_data": final_state.get('scout_data', {}),
+            "token_usage": final_state.get('token_usage', {}),
+            "budget_decisions": self.budget_decisions
         }
\ No newline at end of file
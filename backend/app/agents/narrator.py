@@ -1,15 +1,103 @@
-from typing import Dict, Callable
-from groq import Groq
+from typing import Dict, Callable, List, Tuple
 from app.config import settings
+from app.utils.cancellation import CancellationToken, StageTimeout
+from app.utils.llm_client import LLM_ERRORS, llm_client
+from app.utils.model_router import model_router
+from app.utils.token_budget import TokenBudget, truncate_to_tokens
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+NARRATOR_SYSTEM_PROMPT = "You are a master storyteller and investigative journalist who creates engaging narratives about software projects. When external sources are provided, ALWAYS cite them specifically. When only git data is available, base your narrative on commit patterns. Write in clear, compelling prose."
+
+# Independent report sections for parallel generation:
+# (heading, instructions with web evidence, instructions without, max_tokens)
+REPORT_SECTIONS = [
+    (
+        "# 📖 THE STORY: [Clever Title]\n\n## ACT I: THE BIRTH",
+        "Replace [Clever Title] with a clever title. Write 2-3 paragraphs about the project's origins. If sources mention creation reasons, cite them: \"According to [Source X]...\"",
+        "Replace [Clever Title] with a clever title. Write 2-3 paragraphs about likely origins based on commit patterns and dates.",
+        700
+    ),
+    (
+        "## ACT II: THE GOLDEN AGE",
+        "Write 2-3 paragraphs about peak activity and growth. Use specific facts from git data and any relevant sources.",
+        "Write 2-3 paragraphs about peak activity period based on commit data.",
+        700
+    ),
+    (
+        "## ACT III: THE DECLINE",
+        "Write 2-3 paragraphs about what happened. Use specific evidence from the sources: quote or cite concrete facts (archiving, blog posts, \"moved to [alternative tool]\", \"deprecated in favor of [X]\"). Don't say \"sources suggest\" - name the source.",
+        "Write 2-3 paragraphs about decline based on commit patterns. Base this ONLY on git patterns (sudden stops, decay, etc.) since no external sources were found.",
+        800
+    ),
+    (
+        "# 🔍 KEY FINDINGS",
+        "Bullet points of discoveries, citing [Source X] where relevant.",
+        "Bullet points of discoveries from git analysis.",
+        400
+    ),
+    (
+        "# 💡 SALVAGEABILITY ANALYSIS",
+        "Rate: ✅ HIGHLY SALVAGEABLE / ⚠️ PARTIALLY SALVAGEABLE / ❌ NOT SALVAGEABLE. Explain based on evidence.",
+        "Rate: ✅ HIGHLY SALVAGEABLE / ⚠️ PARTIALLY SALVAGEABLE / ❌ NOT SALVAGEABLE. Base on code age, activity patterns, and technical relevance.",
+        400
+    ),
+    (
+        "# 🛠️ RECOMMENDATIONS",
+        "3-5 actionable recommendations.",
+        "3-5 actionable recommendations for someone inheriting this code.",
+        500
+    ),
+]
+
+# Closes every report written without external sources
+GIT_ONLY_NOTE = "**Note:** This analysis is based solely on git history patterns. External verification was not performed."
+
+# Appended to the narrative prompt when the investigation is short on time
+BRIEF_REPORT_INSTRUCTIONS = """
+
+**TIME-CONSTRAINED VERSION:** Keep the same headings but write at most one short paragraph per act and 3 bullets per list. Aim for under 400 words in total.
+"""
+
+
+class StrippedStream:
+    """Forwards streamed text as it reads after .strip().
+    
+    Leading whitespace is dropped and trailing whitespace is held back until
+    more text follows, so streamed sections line up with the stripped
+    sections the final report is joined from.
+    """
+    
+    def __init__(self, emit: Callable):
+        self.emit = emit
+        self.started = False
+        self.pending = ""
+    
+    def feed(self, chunk: str):
+        if not self.started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                return
+            self.started = True
+        
+        body = chunk.rstrip()
+        if body:
+            self.emit(self.pending + body)
+            self.pending = chunk[len(body):]
+        else:
+            self.pending += chunk
 
 
 class NarratorAgent:
     """Narrator Agent - Transforms findings into compelling narrative"""
     
-    def __init__(self, progress_callback: Callable = None):
+    def __init__(self, progress_callback: Callable = None, stream_callback: Callable = None, job_class: str = "interactive",
+                 cancel_token: CancellationToken = None):
         self.progress_callback = progress_callback
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        self.job_class = job_class  # Scheduling class for LLM requests (interactive/batch)
+        self.cancel_token = cancel_token or CancellationToken()
+        self.stream_callback = stream_callback  # Receives narrative chunks as they are generated
     
     def emit_progress(self, message: str, data: Dict = None):
         """Emit progress message"""
@@ -30,6 +118,39 @@ class NarratorAgent:
                         return True
         return False
     
+    def format_web_evidence(self, scout_data: Dict) -> List[str]:
+        """Format web sources as numbered evidence entries for citation, within the token budget"""
+        web_evidence_detailed = []
+        citation_counter = 1
+        
+        for category, results in scout_data.get('web_search_results', {}).items():
+            for result in results:
+                snippet = result.get('snippet', '')
+                
+                # Prefer the shared per-source summary over raw scraped text
+                summary = result.get('summary')
+                if summary == "UNRELATED":
+                    content_line = "Summary: Page is not about this repository"
+                elif summary:
+                    content_line = f"Summary: {truncate_to_tokens(summary, settings.NARRATOR_EVIDENCE_ITEM_TOKENS)}"
+                else:
+                    full_content = truncate_to_tokens(result.get('full_content', ''), settings.NARRATOR_EVIDENCE_ITEM_TOKENS)
+                    content_line = f"Full Content: {full_content if full_content else 'Content unavailable'}"
+                
+                evidence_entry = f"""
+[Source {citation_counter}] {result['title']}
+URL: {result['link']}
+Snippet: {snippet}
+{content_line}
+"""
+                web_evidence_detailed.append(evidence_entry)
+                citation_counter += 1
+        
+        # Numbers are assigned before trimming so they still match extract_citations
+        budget = TokenBudget(settings.NARRATOR_EVIDENCE_TOKEN_BUDGET)
+        budget.add("evidence", web_evidence_detailed, priority=0)
+        return budget.fit()["evidence"]
+    
     def build_narrative_prompt(self, scout_data: Dict, analysis: Dict) -> str:
         """Build prompt for narrative generation"""
         
@@ -49,22 +170,7 @@ class NarratorAgent:
         # Build different prompts based on evidence availability
         if has_web:
             # DETAILED PROMPT WITH CITATIONS
-            web_evidence_detailed = []
-            citation_counter = 1
-            
-            for category, results in scout_data.get('web_search_results', {}).items():
-                for result in results:
-                    full_content = result.get('full_content', '')
-                    snippet = result.get('snippet', '')
-                    
-                    evidence_entry = f"""
-[Source {citation_counter}] {result['title']}
-URL: {result['link']}
-Snippet: {snippet}
-Full Content: {full_content[:1000] if full_content else 'Content unavailable'}
-"""
-                    web_evidence_detailed.append(evidence_entry)
-                    citation_counter += 1
+            web_evidence_detailed = self.format_web_evidence(scout_data)
             
             prompt = f"""You are a master storyteller specializing in software archaeology. Create a compelling narrative report about this repository.
 
@@ -181,11 +287,140 @@ Base on code age, activity patterns, and technical relevance
 # 🛠️ RECOMMENDATIONS
 3-5 actionable recommendations for someone inheriting this code
 
-**Note:** This analysis is based solely on git history patterns. External verification was not performed.
+{GIT_ONLY_NOTE}
 """
         
         return prompt
     
+    def build_section_context(self, scout_data: Dict, analysis: Dict, has_web: bool) -> str:
+        """Shared data summary sent with every section prompt"""
+        patterns_text = []
+        if scout_data.get('patterns_detected'):
+            for pattern_name, pattern_data in scout_data['patterns_detected'].items():
+                patterns_text.append(f"- {pattern_name}: {pattern_data}")
+        
+        evidence = ""
+        if has_web:
+            evidence = f"""
+**External Evidence (cite as [Source X]):**
+{chr(10).join(self.format_web_evidence(scout_data))}
+"""
+        
+        return f"""You are writing one section of an archaeological report about a software repository.
+
+## Data Summary:
+
+**Repository:** {scout_data['repo_name']}
+**Hypothesis:** {analysis['hypothesis']}
+**Confidence:** {analysis['confidence']}%
+**Likely Cause:** {analysis.get('likely_cause', 'unknown')}
+
+**Timeline:**
+- First Commit: {scout_data.get('first_commit_date', 'Unknown')}
+- Last Commit: {scout_data.get('last_commit_date', 'Unknown')}
+- Total Commits: {scout_data['total_commits']}
+- Contributors: {scout_data['contributors_count']}
+- Active Period: {scout_data['active_period_months']:.1f} months
+
+**Git Patterns:**
+{chr(10).join(patterns_text) if patterns_text else "No significant patterns"}
+{evidence}
+**Key Findings:**
+{chr(10).join([f"- {f}" for f in analysis.get('key_findings', [])])}
+
+---
+"""
+    
+    def format_sources_section(self, scout_data: Dict) -> str:
+        """Sources section built directly from the citations (no LLM needed)"""
+        lines = ["# 📚 SOURCES"]
+        for citation in self.extract_citations(scout_data):
+            lines.append(f"- [Source {citation['number']}] {citation['title']} - {citation['url']}")
+        return "\n".join(lines)
+    
+    def generate_sections(self, scout_data: Dict, analysis: Dict, has_web: bool) -> Tuple[str, Dict]:
+        """Generate report sections concurrently and assemble them in order.
+        
+        Every section shares the same data summary. Streamed chunks are
+        forwarded in report order: the earliest unfinished section streams
+        live while later ones buffer until it completes. The stream carries
+        the same stripped sections and separators as the returned narrative,
+        so chunk offsets index into the final report.
+        """
+        context = self.build_section_context(scout_data, analysis, has_web)
+        
+        lock = threading.Lock()
+        buffers = [[] for _ in REPORT_SECTIONS]
+        finished = [False] * len(REPORT_SECTIONS)
+        cursor = {"index": 0}  # Section currently being streamed
+        
+        def forward(chunk: str):
+            # Caller holds the lock, so chunks reach the callback one at a time
+            if self.stream_callback:
+                self.stream_callback(chunk)
+        
+        def on_chunk(index: int, chunk: str):
+            with lock:
+                if index == cursor["index"]:
+                    forward(chunk)
+                else:
+                    buffers[index].append(chunk)
+        
+        def on_section_done(index: int):
+            with lock:
+                finished[index] = True
+                # Advance past finished sections, flushing what they buffered
+                while cursor["index"] < len(REPORT_SECTIONS) and finished[cursor["index"]]:
+                    cursor["index"] += 1
+                    if cursor["index"] < len(REPORT_SECTIONS):
+                        forward("\n\n" + "".join(buffers[cursor["index"]]))
+                        buffers[cursor["index"]] = []
+        
+        def write_section(index: int) -> Dict:
+            heading, web_instructions, git_instructions, max_tokens = REPORT_SECTIONS[index]
+            instructions = web_instructions if has_web else git_instructions
+            prompt = f"""{context}
+Write ONLY the following section of the report in markdown, starting with this heading exactly:
+
+{heading}
+
+{instructions}
+"""
+            stream = StrippedStream(lambda chunk: on_chunk(index, chunk))
+            try:
+                return llm_client.complete(
+                    cacheable=settings.LLM_CACHE_NARRATOR,
+                    messages=[
+                        {"role": "system", "content": NARRATOR_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    model=model_router.largest,
+                    agent="narrator",
+                    job_class=self.job_class,
+                    cancel_token=self.cancel_token,
+                    temperature=0.7,
+                    max_tokens=max_tokens,
+                    on_chunk=stream.feed
+                )
+            finally:
+                on_section_done(index)
+        
+        with ThreadPoolExecutor(max_workers=len(REPORT_SECTIONS)) as executor:
+            completions = list(executor.map(write_section, range(len(REPORT_SECTIONS))))
+        
+        sections = [completion['content'].strip() for completion in completions]
+        # Same closing as the single-prompt report: sources, or the git-only note
+        closing = self.format_sources_section(scout_data) if has_web else GIT_ONLY_NOTE
+        sections.append(closing)
+        if self.stream_callback:
+            self.stream_callback("\n\n" + closing)
+        
+        usage = {
+            "prompt_tokens": sum(c['usage']['prompt_tokens'] for c in completions),
+            "completion_tokens": sum(c['usage']['completion_tokens'] for c in completions)
+        }
+        return "\n\n".join(sections), usage
+    
     def extract_citations(self, scout_data: Dict) -> list:
         """Extract citations from web sources if they exist"""
         citations = []
@@ -272,8 +507,24 @@ Base on code age, activity patterns, and technical relevance
         
         return "\n".join(profiles) if profiles else "No contributor data available"
     
-    def generate_report(self, scout_data: Dict, analysis: Dict) -> Dict:
-        """Generate complete narrative report"""
+    def prepare(self, scout_data: Dict) -> Dict:
+        """Precompute report parts that only depend on git data.
+        
+        Lets the coordinator build these ahead of time while the analyst is
+        still working; generate_report uses them instead of recomputing.
+        """
+        return {
+            "timeline": self.generate_timeline(scout_data, {}),
+            "contributor_profiles": self.format_contributor_profiles(scout_data)
+        }
+    
+    def generate_report(self, scout_data: Dict, analysis: Dict, prepared: Dict = None, brief: bool = False) -> Dict:
+        """Generate complete narrative report.
+        
+        brief=True (used when the investigation is short on time) asks the
+        fastest model for a condensed version of the same structure.
+        """
+        prepared = prepared or {}
         
         self.emit_progress("Narrator agent activated")
         self.emit_progress("Synthesizing findings into narrative...")
@@ -287,32 +538,56 @@ Base on code age, activity patterns, and technical relevance
             else:
                 self.emit_progress("Crafting narrative from git analysis only...")
             
-            # Generate narrative using LLM
-            prompt = self.build_narrative_prompt(scout_data, analysis)
-            
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a master storyteller and investigative journalist who creates engaging narratives about software projects. When external sources are provided, ALWAYS cite them specifically. When only git data is available, base your narrative on commit patterns. Write in clear, compelling prose."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.7,
-                max_tokens=3500
-            )
-            
-            narrative = chat_completion.choices[0].message.content
-            
-            self.emit_progress("Generating timeline...")
-            timeline = self.generate_timeline(scout_data, analysis)
+            if settings.NARRATOR_PARALLEL_SECTIONS and not brief:
+                # Independent sections decode concurrently from shared context
+                self.emit_progress(f"Writing {len(REPORT_SECTIONS)} report sections in parallel...")
+                narrative, usage = self.generate_sections(scout_data, analysis, has_web)
+            else:
+                # Generate narrative using LLM
+                prompt = self.build_narrative_prompt(scout_data, analysis)
+                model, max_tokens = model_router.largest, 3500
+                if brief:
+                    self.emit_progress("Writing a condensed report to meet the time budget")
+                    prompt += BRIEF_REPORT_INSTRUCTIONS
+                    model, max_tokens = model_router.smallest, settings.NARRATOR_BRIEF_MAX_TOKENS
+                
+                # Sampling at temperature 0.7 varies per run, so caching is opt-in
+                completion = llm_client.complete(
+                    cacheable=settings.LLM_CACHE_NARRATOR,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": NARRATOR_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    model=model,
+                    agent="narrator",
+                    job_class=self.job_class,
+                    cancel_token=self.cancel_token,
+                    temperature=0.7,
+                    max_tokens=max_tokens,
+                    on_chunk=self.stream_callback
+                )
+                
+                if completion['queue_wait_seconds'] > 1:
+                    self.emit_progress(f"Waited {completion['queue_wait_seconds']:.1f}s for LLM quota")
+                
+                narrative = completion['content']
+                usage = completion['usage']
             
-            self.emit_progress("Creating contributor profiles...")
-            contributor_profiles = self.format_contributor_profiles(scout_data)
+            if prepared:
+                timeline = prepared['timeline']
+                contributor_profiles = prepared['contributor_profiles']
+            else:
+                self.emit_progress("Generating timeline...")
+                timeline = self.generate_timeline(scout_data, analysis)
+                
+                self.emit_progress("Creating contributor profiles...")
+                contributor_profiles = self.format_contributor_profiles(scout_data)
             
             # Extract citations only if web evidence exists
             citations = self.extract_citations(scout_data) if has_web else []
@@ -340,7 +615,9 @@ Base on code age, activity patterns, and technical relevance
                     "generated_at": datetime.now().isoformat(),
                     "confidence": analysis['confidence'],
                     "evidence_quality": analysis.get('evidence_quality', 'unknown'),
-                    "sources_found": len(citations)
+                    "sources_found": len(citations),
+                    "token_usage": usage,
+                    "brief": brief
                 }
             }
             
@@ -348,6 +625,10 @@ Base on code age, activity patterns, and technical relevance
             
             return report
         
+        except (StageTimeout, *LLM_ERRORS):
+            # Out of time or the model is unreachable - fail the attempt so it
+            # is retried from its checkpoint instead of saving an error result
+            raise
         except Exception as e:
             self.emit_progress(f"Report generation failed: {str(e)}")
             return {
@@ -1,19 +1,60 @@
 from typing import Dict, Callable
 from app.utils.git_analyzer import GitAnalyzer
 from app.utils.web_search import WebSearcher
+from app.utils.source_summaries import source_summarizer
+from app.utils.cancellation import CancellationToken
+from app.config import settings
 
 
 class ScoutAgent:
     """Scout Agent - Gathers information from git and web"""
     
-    def __init__(self, progress_callback: Callable = None):
+    def __init__(self, progress_callback: Callable = None, job_class: str = "interactive",
+                 cancel_token: CancellationToken = None):
         self.progress_callback = progress_callback
+        self.job_class = job_class  # Scheduling class for LLM requests (interactive/batch)
+        self.cancel_token = cancel_token or CancellationToken()
     
     def emit_progress(self, message: str, data: Dict = None):
         """Emit progress message"""
         if self.progress_callback:
             self.progress_callback("scout", message, data or {})
     
+    def search_web(self, repo_url: str, repo_name: str, cancel_token: CancellationToken = None) -> Dict:
+        """Search the web for context about the repository.
+        
+        cancel_token overrides the scout's own token (speculative searches
+        run under a child token so they can be stopped on their own).
+        """
+        cancel_token = cancel_token or self.cancel_token
+        self.emit_progress("Searching web for additional context...")
+        
+        try:
+            with cancel_token.stage("web", settings.STAGE_TIMEOUT_WEB_SECONDS):
+                searcher = WebSearcher(cancel_token)
+                # Extract owner from URL
+                parts = repo_url.rstrip('/').split('/')
+                owner = parts[-2] if len(parts) >= 2 else None
+                
+                web_results = searcher.search_repo_context(repo_name, owner)
+                
+                total_results = sum(len(v) for v in web_results.values())
+                self.emit_progress(f"Found {total_results} web sources")
+                
+                # Summarize each source once so Analyst and Narrator share compact versions
+                if settings.SOURCE_SUMMARIES_ENABLED and total_results:
+                    self.emit_progress("Summarizing web sources...")
+                    summarized = source_summarizer.attach_summaries(
+                        web_results, repo_name, self.job_class, cancel_token
+                    )
+                    self.emit_progress(f"Summarized {summarized} sources")
+            
+            return web_results
+        
+        except Exception as e:
+            self.emit_progress(f"Web search failed: {str(e)}")
+            return {}
+    
     def investigate(self, repo_url: str, include_web_search: bool = True) -> Dict:
         """Main investigation method"""
         
@@ -22,7 +63,7 @@ class ScoutAgent:
         
         try:
             # Git analysis
-            analyzer = GitAnalyzer(repo_url)
+            analyzer = GitAnalyzer(repo_url, self.cancel_token)
             git_data = analyzer.analyze()
             
             self.emit_progress(f"Repository cloned successfully")
@@ -53,23 +94,7 @@ class ScoutAgent:
             # Web search (optional)
             web_results = {}
             if include_web_search:
-                self.emit_progress("Searching web for additional context...")
-                
-                try:
-                    searcher = WebSearcher()
-                    # Extract owner from URL
-                    parts = repo_url.rstrip('/').split('/')
-                    owner = parts[-2] if len(parts) >= 2 else None
-                    repo_name = git_data['repo_name']
-                    
-                    web_results = searcher.search_repo_context(repo_name, owner)
-                    
-                    total_results = sum(len(v) for v in web_results.values())
-                    self.emit_progress(f"Found {total_results} web sources")
-                    
-                except Exception as e:
-                    self.emit_progress(f"Web search failed: {str(e)}")
-                    web_results = {}
+                web_results = self.search_web(repo_url, git_data['repo_name'])
             
             # Combine results
             final_result = {
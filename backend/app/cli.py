@@ -0,0 +1,213 @@
+"""Headless batch runner.
+
+Runs the Scout → Analyst → Narrator pipeline for every repository in a
+file across a process pool, without the API server or a database, and
+appends one JSON result per line to an NDJSON file. Re-running with the
+same output file skips repositories that already completed.
+
+Usage:
+    python -m app.cli scan repos.txt --output results.ndjson --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+# The pipeline never touches the database here, but Settings requires these.
+# LLM responses are cached on disk and the GitHub cache (a database table) is off.
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")
+os.environ.setdefault("SECRET_KEY", "cli")
+os.environ.setdefault("LLM_CACHE_BACKEND", "disk")
+os.environ.setdefault("GITHUB_API_CACHE_TTL_SECONDS", "0")
+
+from app.config import settings
+from app.utils.metrics import Metrics
+from app.utils.repo_identity import normalize_repo_url
+
+
+def read_repo_list(path: str) -> list:
+    """Repository URLs from a text file (one per line, # comments allowed), de-duplicated"""
+    urls = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            url = line.split("#", 1)[0].strip()
+            if url:
+                urls.setdefault(normalize_repo_url(url), url)
+    return list(urls.values())
+
+
+def read_completed(path: str) -> set:
+    """Normalized URLs already completed in an existing output file"""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial last line from an interrupted run
+            if record.get("status") == "completed":
+                completed.add(normalize_repo_url(record["repo_url"]))
+    return completed
+
+
+# Set in each pool process by init_worker
+_verbose = False
+
+
+def init_worker(workers: int, verbose: bool):
+    """Per-process setup: split the LLM quota so the pool as a whole stays within it"""
+    global _verbose
+    settings.LLM_TPM_LIMIT = max(1, settings.LLM_TPM_LIMIT // workers)
+    settings.LLM_RPM_LIMIT = max(1, settings.LLM_RPM_LIMIT // workers)
+    _verbose = verbose
+
+
+def scan_repo(repo_url: str, job_class: str, time_budget: float = None) -> dict:
+    """Investigate one repository in a pool process and return its result record"""
+    from app.agents.coordinator import Coordinator
+    
+    def progress(agent_name: str, message: str, data: dict = None):
+        if _verbose:
+            print(f"  [{repo_url}] {agent_name}: {message}", file=sys.stderr, flush=True)
+    
+    started = time.monotonic()
+    record = {"repo_url": repo_url}
+    
+    try:
+        result = Coordinator(progress_callback=progress, job_class=job_class).investigate(
+            repo_url, time_budget=time_budget
+        )
+        analysis = result.get("analysis", {})
+        report = result.get("report", {})
+        record.update({
+            "status": "completed",
+            "confidence": result.get("confidence", 0),
+            "hypothesis": analysis.get("hypothesis"),
+            "likely_cause": analysis.get("likely_cause"),
+            "rounds_taken": result.get("rounds_taken", 0),
+            "web_search_performed": result.get("web_search_performed", False),
+            "token_usage": result.get("token_usage", {}),
+            "budget_decisions": result.get("budget_decisions", []),
+            "report": report.get("narrative")
+        })
+        
+        # An error fallback from the analyst or narrator is a failure, so a re-run retries it
+        error = analysis.get("error") or report.get("error")
+        if error:
+            record.update({"status": "failed", "error": error})
+    except Exception as e:
+        record.update({"status": "failed", "error": str(e)})
+    
+    record["duration_seconds"] = round(time.monotonic() - started, 2)
+    record["finished_at"] = datetime.utcnow().isoformat()
+    return record
+
+
+def print_summary(stats: Metrics, wall_seconds: float, skipped: int):
+    """Throughput statistics for the run"""
+    completed = stats.counter("completed")
+    failed = stats.counter("failed")
+    processed = completed + failed
+    
+    print("", file=sys.stderr)
+    print("Scan summary", file=sys.stderr)
+    print(f"  processed:   {processed} ({completed} completed, {failed} failed, {skipped} skipped from earlier runs)", file=sys.stderr)
+    print(f"  wall time:   {wall_seconds:.1f}s", file=sys.stderr)
+    if processed:
+        print(f"  throughput:  {processed / wall_seconds * 60:.2f} repos/min", file=sys.stderr)
+        print(
+            f"  per repo:    p50 {stats.percentile('duration', 50):.1f}s, "
+            f"p95 {stats.percentile('duration', 95):.1f}s",
+            file=sys.stderr
+        )
+        print(
+            f"  LLM tokens:  {stats.counter('prompt_tokens')} prompt, {stats.counter('completion_tokens')} completion",
+            file=sys.stderr
+        )
+
+
+def scan(args):
+    repos = read_repo_list(args.repos_file)
+    completed = read_completed(args.output)
+    pending = [url for url in repos if normalize_repo_url(url) not in completed]
+    skipped = len(repos) - len(pending)
+    
+    print(
+        f"Scanning {len(pending)} repositories with {args.workers} workers"
+        + (f" ({skipped} already completed in {args.output})" if skipped else ""),
+        file=sys.stderr
+    )
+    
+    stats = Metrics(max_samples=max(1, len(pending)))
+    started = time.monotonic()
+    
+    # Not a with-block: its exit would wait for running investigations even after Ctrl-C
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=init_worker,
+        initargs=(args.workers, args.verbose)
+    )
+    interrupted = False
+    
+    try:
+        with open(args.output, "a", encoding="utf-8") as out:
+            futures = [pool.submit(scan_repo, url, args.job_class, args.time_budget) for url in pending]
+            
+            for done, future in enumerate(as_completed(futures), start=1):
+                record = future.result()
+                
+                # One flushed line per repo, so an interrupted scan can resume
+                out.write(json.dumps(record, default=str) + "\n")
+                out.flush()
+                
+                stats.incr(record["status"])
+                stats.observe("duration", record["duration_seconds"])
+                for usage in record.get("token_usage", {}).values():
+                    stats.incr("prompt_tokens", usage.get("prompt_tokens", 0))
+                    stats.incr("completion_tokens", usage.get("completion_tokens", 0))
+                
+                outcome = f"{record['confidence']}%" if record["status"] == "completed" else record["error"]
+                print(
+                    f"[{done}/{len(pending)}] {record['repo_url']} {record['status']} "
+                    f"({outcome}) in {record['duration_seconds']:.1f}s",
+                    file=sys.stderr
+                )
+    except KeyboardInterrupt:
+        interrupted = True
+        print("Interrupted - finished results are saved; re-run to resume", file=sys.stderr)
+    finally:
+        # Pool processes got the same SIGINT; drop queued repos instead of waiting on them
+        pool.shutdown(wait=not interrupted, cancel_futures=interrupted)
+    
+    print_summary(stats, time.monotonic() - started, skipped)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neural Archaeologist headless runner")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    scan_parser = subparsers.add_parser("scan", help="Investigate every repository listed in a file")
+    scan_parser.add_argument("repos_file", help="Text file with one repository URL per line")
+    scan_parser.add_argument("--output", "-o", default="results.ndjson",
+                             help="NDJSON file to append results to (also used to resume)")
+    scan_parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 2,
+                             help="Investigations to run in parallel (one process each)")
+    scan_parser.add_argument("--job-class", default="batch", choices=["interactive", "batch"],
+                             help="LLM scheduling class")
+    scan_parser.add_argument("--time-budget", type=float, default=None,
+                             help="Per-repository latency target in seconds")
+    scan_parser.add_argument("--verbose", "-v", action="store_true", help="Print agent progress")
+    
+    args = parser.parse_args()
+    if args.command == "scan":
+        scan(args)
+
+
+if __name__ == "__main__":
+    main()
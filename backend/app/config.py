@@ -19,6 +19,116 @@ class Settings(BaseSettings):
     # App Settings
     DEBUG: bool = True
     
+    # Job Queue / Workers
+    WORKER_CONCURRENCY: int = 2  # Investigations run in parallel per worker process
+    WORKER_POLL_INTERVAL_SECONDS: float = 2.0
+    JOB_VISIBILITY_TIMEOUT_SECONDS: int = 300  # Job is reclaimed if its worker stops heartbeating
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: int = 30
+    USER_MAX_QUEUED_INTERACTIVE: int = 5  # Queued jobs per user before new requests get 429
+    USER_MAX_QUEUED_BATCH: int = 1000
+    ADMISSION_RETRY_AFTER_SECONDS: int = 30  # Retry-After hint on 429
+    RUN_EMBEDDED_WORKER: bool = False  # Run worker threads inside the API process (single-box dev)
+    SINGLE_FLIGHT_ENABLED: bool = True  # Concurrent investigations of one repo share a single run
+    SINGLE_FLIGHT_RESOLVE_HEAD: bool = True  # Include the remote HEAD SHA in the key (git ls-remote)
+    HEAD_RESOLVE_TIMEOUT_SECONDS: float = 5.0
+    
+    # Batches
+    BATCH_MAX_REPOS: int = 500
+    BATCH_DEFAULT_CONCURRENCY: int = 4  # Children of one batch running at once
+    BATCH_HEAD_RESOLVE_CONCURRENCY: int = 16  # Parallel git ls-remote calls while submitting
+    GITHUB_API_CACHE_TTL_SECONDS: int = 3600  # Shared GitHub REST response cache (0 disables)
+    
+    # Result Reuse
+    PIPELINE_VERSION: str = "1"  # Bump when agent logic changes so stored results stop matching
+    RESULT_REUSE_ENABLED: bool = True
+    RESULT_REUSE_MAX_AGE_HOURS: float = 24.0  # Freshness window for reusing another run's result
+    
+    # Cancellation / Stage Deadlines (seconds; 0 disables a deadline)
+    CANCEL_POLL_INTERVAL_SECONDS: float = 2.0  # How often workers check for cancel requests
+    STAGE_TIMEOUT_CLONE_SECONDS: float = 300.0
+    STAGE_TIMEOUT_LOG_PARSE_SECONDS: float = 120.0
+    STAGE_TIMEOUT_WEB_SECONDS: float = 120.0  # Search, scraping and source summaries
+    STAGE_TIMEOUT_ANALYST_SECONDS: float = 180.0
+    STAGE_TIMEOUT_NARRATOR_SECONDS: float = 300.0
+    GITHUB_API_TIMEOUT_SECONDS: float = 15.0  # Per GitHub REST request
+    
+    # Resource Governor (per process)
+    RESOURCE_CLONE_SLOTS: int = 4  # Concurrent git clones
+    RESOURCE_DISK_BUDGET_MB: int = 5120  # Temp disk for clones
+    RESOURCE_CLONE_DEFAULT_MB: int = 100  # Disk reserved for a clone of unknown size
+    RESOURCE_SCRAPE_SLOTS: int = 8  # Concurrent article scrapes
+    RESOURCE_LLM_SLOTS: int = 8  # Concurrent uncached LLM calls from agent threads
+    RESOURCE_REPORT_INTERVAL_SECONDS: int = 300  # Worker utilization log interval (0 disables)
+    
+    # Shared LLM Client
+    LLM_MAX_CONCURRENCY: int = 8  # In-flight completions per process
+    LLM_MAX_CONNECTIONS: int = 20  # HTTP/2 connection pool size
+    LLM_TIMEOUT_SECONDS: float = 90.0  # Per-call timeout
+    LLM_MAX_RETRIES: int = 3
+    LLM_BACKOFF_BASE_SECONDS: float = 1.0
+    LLM_BACKOFF_MAX_SECONDS: float = 20.0
+    LLM_TPM_LIMIT: int = 6000  # Tokens per minute available to this process
+    LLM_RPM_LIMIT: int = 30  # Requests per minute available to this process
+    
+    # Model Routing
+    LLM_MODEL_LADDER: str = "llama-3.1-8b-instant,llama-3.3-70b-versatile"  # Fastest first
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_PERCENTILE: float = 95.0  # Hedge once a call exceeds this latency percentile
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # Latency samples needed before hedging
+    CONFIDENCE_THRESHOLD: int = 70  # Below this the Coordinator gathers web evidence
+    ANALYST_ESCALATION_MARGIN: int = 5  # Answers within this of the threshold are re-checked by the next model up
+    
+    # LLM Response Cache
+    LLM_CACHE_BACKEND: str = "database"  # database, disk, none
+    LLM_CACHE_DIR: str = ".llm_cache"  # Used by the disk backend
+    LLM_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 7  # 7 days
+    LLM_CACHE_MAX_ENTRIES: int = 5000  # Oldest entries evicted beyond this
+    LLM_CACHE_NARRATOR: bool = False  # Narrator uses temperature 0.7, opt in explicitly
+    
+    # Analyst Fast Path (rule-based analysis that skips the LLM)
+    FASTPATH_ENABLED: bool = True
+    FASTPATH_ARCHIVED_CONFIDENCE: int = 90  # Confidence when GitHub reports the repo archived
+    FASTPATH_DORMANT_MONTHS: float = 60.0  # Months without commits to count as dormant
+    FASTPATH_MIN_DECAY_PERCENT: float = 70.0  # Required gradual_decay decline for dormant repos
+    FASTPATH_DORMANT_CONFIDENCE: int = 80
+    
+    # Coordinator
+    SPECULATIVE_MODE: str = "off"  # off, web (prefetch web evidence), full (also prepare narrator)
+    STAGE_ESTIMATE_MIN_SAMPLES: int = 5  # Observed runs before stage timings replace the defaults
+    
+    # Source Summaries
+    SOURCE_SUMMARIES_ENABLED: bool = True  # Summarize each scraped page once, shared by all agents
+    SOURCE_SUMMARY_MAX_WORDS: int = 120
+    
+    # Prompt Token Budgets
+    ANALYST_PROMPT_TOKEN_BUDGET: int = 2000  # Patterns + evidence + contributors
+    ANALYST_EVIDENCE_ITEM_TOKENS: int = 150  # Per scraped article
+    NARRATOR_EVIDENCE_TOKEN_BUDGET: int = 3000
+    NARRATOR_EVIDENCE_ITEM_TOKENS: int = 300
+    
+    # Narrator
+    NARRATOR_PARALLEL_SECTIONS: bool = False  # Generate report sections concurrently
+    NARRATOR_BRIEF_MAX_TOKENS: int = 1200  # Condensed report when the time budget is tight
+    
+    # Report Streaming
+    REPORT_PERSIST_INTERVAL_SECONDS: float = 2.0  # How often partial reports are saved
+    
+    # Live Events
+    EVENT_BUS_BACKEND: str = "postgres"  # postgres (LISTEN/NOTIFY, any worker) or local (embedded worker only)
+    EVENT_BUFFER_SIZE: int = 1000  # Recent agent events kept per investigation for reconnect replay
+    EVENT_BUFFER_INVESTIGATIONS: int = 500  # Least recently active investigations' buffers are evicted
+    
+    # Logs API
+    LOGS_PAGE_SIZE: int = 200  # Default rows per /logs page
+    LOGS_PAGE_MAX: int = 1000
+    
+    # Agent Log Writer
+    AGENT_LOG_BATCH_SIZE: int = 50  # Rows per bulk insert
+    AGENT_LOG_FLUSH_INTERVAL_SECONDS: float = 0.5  # Max time a log waits in the buffer
+    AGENT_LOG_FLUSH_TIMEOUT_SECONDS: float = 5.0  # Max time completion waits for logs to land
+    AGENT_LOG_QUEUE_MAX: int = 10000  # Oldest rows are dropped beyond this
+    
     class Config:
         env_file = ".env"
 
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
@@ -21,4 +21,44 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# create_all only adds missing tables; columns and indexes added to existing
+# tables since their first release are brought up to date here (idempotent)
+SCHEMA_UPGRADES = [
+    # Single-flight deduplication and batches
+    "ALTER TABLE investigations ADD COLUMN IF NOT EXISTS leader_id UUID "
+    "REFERENCES investigations (id) ON DELETE SET NULL",
+    "ALTER TABLE investigations ADD COLUMN IF NOT EXISTS batch_id UUID "
+    "REFERENCES investigation_batches (id) ON DELETE CASCADE",
+    "CREATE INDEX IF NOT EXISTS ix_investigations_leader_id ON investigations (leader_id)",
+    "CREATE INDEX IF NOT EXISTS ix_investigations_batch_id ON investigations (batch_id)",
+    # Event sequence numbers and keyset pagination
+    "ALTER TABLE agent_logs ADD COLUMN IF NOT EXISTS seq INTEGER",
+    "DROP INDEX IF EXISTS ix_agent_logs_investigation_seq",
+    # Older API/worker races could store a seq twice; keep the first row's number
+    "UPDATE agent_logs AS dup SET seq = NULL FROM agent_logs AS kept "
+    "WHERE dup.investigation_id = kept.investigation_id AND dup.seq = kept.seq AND dup.id > kept.id",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_agent_logs_investigation_seq ON agent_logs (investigation_id, seq)",
+    "CREATE INDEX IF NOT EXISTS ix_agent_logs_investigation_id_id ON agent_logs (investigation_id, id)",
+    # GitHub REST responses moved to github_response_cache; drop the copies keyed by request URL
+    "DELETE FROM repo_cache WHERE repo_url LIKE 'https://api.github.com/%'",
+    # Job queue scheduling
+    "ALTER TABLE investigation_jobs ADD COLUMN IF NOT EXISTS repo_key TEXT",
+    "ALTER TABLE investigation_jobs ADD COLUMN IF NOT EXISTS batch_id UUID",
+    "ALTER TABLE investigation_jobs ADD COLUMN IF NOT EXISTS user_id UUID",
+    "ALTER TABLE investigation_jobs ADD COLUMN IF NOT EXISTS job_class VARCHAR DEFAULT 'interactive'",
+    "CREATE INDEX IF NOT EXISTS ix_investigation_jobs_repo_key ON investigation_jobs (repo_key)",
+    "CREATE INDEX IF NOT EXISTS ix_investigation_jobs_batch_id ON investigation_jobs (batch_id)",
+    "CREATE INDEX IF NOT EXISTS ix_investigation_jobs_user_id ON investigation_jobs (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_investigation_jobs_job_class ON investigation_jobs (job_class)",
+]
+
+
+def upgrade_schema(bind=engine):
+    """Apply SCHEMA_UPGRADES in one transaction; run after Base.metadata.create_all"""
+    with bind.begin() as connection:
+        # API processes and workers start together; let one of them apply the DDL
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('schema_upgrade'))"))
+        for statement in SCHEMA_UPGRADES:
+            connection.execute(text(statement))
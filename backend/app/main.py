@@ -1,13 +1,24 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import socketio
-from app.database import engine
+from sqlalchemy.orm import Session
+from app.database import engine, get_db, upgrade_schema
 from app.models import Base
 from app.config import settings
-from app.utils.websocket import sio
+from app.utils.websocket import sio, set_event_loop
+from app.utils import job_queue
+from app.utils.metrics import metrics
+from app.utils.llm_cache import llm_cache
+from app.utils.llm_client import llm_client
+from app.utils.model_router import model_router
+from app.utils.resource_governor import resource_governor
+from app.utils.log_writer import log_writer
+from app.utils.event_bus import event_bus
 
-# Create all database tables
+# Create all database tables, then add columns/indexes missing from older ones
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -28,18 +39,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Last-Id", "X-Has-More"],  # Logs pagination cursor
 )
 
 # Import and include routes
 from app.routes.auth import router as auth_router
 from app.routes.investigations import router as investigations_router
+from app.routes.batches import router as batches_router
 
 app.include_router(auth_router)
 app.include_router(investigations_router)
+app.include_router(batches_router)
 
 # Startup event
 @app.on_event("startup")
 async def startup_event():
+    # Let pipeline threads push Socket.IO events onto this loop
+    set_event_loop(asyncio.get_running_loop())
+    event_bus.start_listener()
+    
+    # Optionally process the job queue in-process (single-box deployments)
+    if settings.RUN_EMBEDDED_WORKER:
+        from app.worker import Worker
+        Worker().start()
+        print("✅ Embedded investigation worker started")
     print("✅ Database tables created successfully")
     print("✅ WebSocket server ready")
     print("📊 API Docs: http://127.0.0.1:8000/docs")
@@ -50,6 +73,24 @@ async def startup_event():
 async def health_check():
     return {"status": "healthy", "message": "Neural Archaeologist API is running"}
 
+# Metrics endpoint
+@app.get("/metrics")
+async def get_metrics(db: Session = Depends(get_db)):
+    return {
+        "job_queue": job_queue.stats(db),
+        "llm_cache": llm_cache.stats(),
+        "llm_scheduler": llm_client.stats(),
+        "model_latency": model_router.stats(),
+        "resources": resource_governor.stats(),
+        "agent_log_writer": log_writer.stats(),
+        "analyst_fast_path": {
+            "skipped": metrics.counter("analyst.fast_path"),
+            "llm": metrics.counter("analyst.llm"),
+            "skip_rate": metrics.ratio("analyst.fast_path", ["analyst.fast_path", "analyst.llm"])
+        },
+        **metrics.snapshot()
+    }
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -57,6 +98,7 @@ async def root():
         "message": "Welcome to Neural Archaeologist API",
         "docs": "/docs",
         "health": "/health",
+        "metrics": "/metrics",
         "websocket": "/socket.io"
     }
 
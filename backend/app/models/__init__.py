@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Float, ForeignKey, Integer, Text
+from sqlalchemy import Column, String, DateTime, Float, ForeignKey, Index, Integer, Text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -26,18 +26,33 @@ class Investigation(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     repo_url = Column(Text, nullable=False)
-    status = Column(String, default="pending")  # pending, processing, completed, failed
+    status = Column(String, default="pending")  # pending, processing, completed, failed, cancelled
     findings = Column(JSONB, default={})  # Scout and Analyst data
     report = Column(Text, nullable=True)  # Final narrative from Narrator
     confidence = Column(Float, default=0.0)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
+    # Set when this investigation follows an identical in-flight one and reuses its results
+    leader_id = Column(UUID(as_uuid=True), ForeignKey("investigations.id", ondelete="SET NULL"), nullable=True, index=True)
+    batch_id = Column(UUID(as_uuid=True), ForeignKey("investigation_batches.id", ondelete="CASCADE"), nullable=True, index=True)
     
     # Relationships
     user = relationship("User", back_populates="investigations")
     agent_logs = relationship("AgentLog", back_populates="investigation", cascade="all, delete-orphan")
 
 
+class InvestigationBatch(Base):
+    __tablename__ = "investigation_batches"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    source = Column(Text, nullable=False)  # "org:<name>" or "list"
+    total = Column(Integer, default=0)
+    max_concurrency = Column(Integer, default=4)  # Children running at once across all workers
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+
 class AgentLog(Base):
     __tablename__ = "agent_logs"
     
@@ -47,9 +62,16 @@ class AgentLog(Base):
     message = Column(Text, nullable=False)
     data = Column(JSONB, default={})  # Additional context
     timestamp = Column(DateTime, default=datetime.utcnow)
+    seq = Column(Integer, nullable=True)  # Per-investigation event sequence number (Socket.IO catch-up)
     
     # Relationship
     investigation = relationship("Investigation", back_populates="agent_logs")
+    
+    __table_args__ = (
+        # One writer per sequence number: the worker while a job runs, otherwise the API
+        Index("uq_agent_logs_investigation_seq", "investigation_id", "seq", unique=True),
+        Index("ix_agent_logs_investigation_id_id", "investigation_id", "id"),  # Keyset pagination
+    )
 
 
 class RepoCache(Base):
@@ -57,4 +79,69 @@ class RepoCache(Base):
     
     repo_url = Column(Text, primary_key=True)
     git_data = Column(JSONB, default={})  # Cached commit data
-    last_updated = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    last_updated = Column(DateTime, default=datetime.utcnow)
+
+
+class GithubResponseCache(Base):
+    __tablename__ = "github_response_cache"
+    
+    request_key = Column(Text, primary_key=True)  # Request URL plus sorted query params
+    status_code = Column(Integer, nullable=False)
+    body = Column(JSONB, nullable=True)
+    headers = Column(JSONB, default={})  # Only the ones the helpers read (Link for pagination)
+    fetched_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+    
+    cache_key = Column(String(64), primary_key=True)  # sha256 of model + params + messages
+    model = Column(String, nullable=False)
+    response = Column(JSONB, default={})  # Completion content and token usage
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_hit_at = Column(DateTime, nullable=True)
+
+
+class InvestigationResult(Base):
+    __tablename__ = "investigation_results"
+    
+    result_key = Column(Text, primary_key=True)  # normalized repo URL @ HEAD SHA # pipeline version
+    repo_url = Column(Text, nullable=False, index=True)
+    investigation_id = Column(UUID(as_uuid=True), ForeignKey("investigations.id", ondelete="SET NULL"), nullable=True)
+    findings = Column(JSONB, default={})
+    report = Column(Text, nullable=True)
+    confidence = Column(Float, nullable=True)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class InvestigationCheckpoint(Base):
+    __tablename__ = "investigation_checkpoints"
+    
+    investigation_id = Column(UUID(as_uuid=True), ForeignKey("investigations.id", ondelete="CASCADE"), primary_key=True)
+    node = Column(String, nullable=False)  # Last completed workflow node
+    state = Column(JSONB, default={})  # InvestigationState after that node
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class InvestigationJob(Base):
+    __tablename__ = "investigation_jobs"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    investigation_id = Column(UUID(as_uuid=True), ForeignKey("investigations.id", ondelete="CASCADE"), nullable=False, index=True)
+    repo_url = Column(Text, nullable=False)
+    repo_key = Column(Text, nullable=True, index=True)  # Normalized URL (+ HEAD SHA) for single-flight
+    batch_id = Column(UUID(as_uuid=True), nullable=True, index=True)  # Per-batch concurrency limit applies
+    user_id = Column(UUID(as_uuid=True), nullable=True, index=True)  # For per-user fair share
+    job_class = Column(String, default="interactive", index=True)  # interactive, batch
+    status = Column(String, default="queued", index=True)  # queued, running, done, failed, cancelled
+    payload = Column(JSONB, default={})  # Pipeline options
+    attempts = Column(Integer, default=0)
+    available_at = Column(DateTime, default=datetime.utcnow)  # Not claimable before this (retry backoff)
+    locked_by = Column(String, nullable=True)  # Worker currently holding the job
+    locked_until = Column(DateTime, nullable=True)  # Visibility timeout; reclaimable after this
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
\ No newline at end of file
@@ -0,0 +1,262 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field, HttpUrl
+from typing import List, Optional
+from datetime import datetime
+import uuid
+import asyncio
+
+from app.database import get_db
+from app.models import Investigation, InvestigationBatch, User
+from app.config import settings
+from app.routes.investigations import get_current_user, snapshot_key, submit_investigation
+from app.utils import job_queue
+from app.utils.github_cache import github_get, github_headers
+from app.utils.repo_identity import normalize_repo_url
+
+
+router = APIRouter(prefix="/api/batches", tags=["Batches"])
+
+
+# Request/Response Models
+class BatchCreate(BaseModel):
+    repo_urls: List[HttpUrl] = []
+    org: Optional[str] = None  # GitHub org to expand into its repositories
+    include_forks: bool = False  # Org scans only
+    max_concurrency: int = Field(settings.BATCH_DEFAULT_CONCURRENCY, ge=1, le=32)
+    force_fresh: bool = False
+
+
+def list_org_repos(org: str, limit: int, include_forks: bool = False) -> List[str]:
+    """Repository URLs of a GitHub organization (cached, paginated)"""
+    urls = []
+    page = 1
+    while len(urls) < limit:
+        response = github_get(
+            f"https://api.github.com/orgs/{org}/repos",
+            headers=github_headers(),
+            params={'per_page': 100, 'page': page, 'type': 'all'},
+            timeout=settings.GITHUB_API_TIMEOUT_SECONDS
+        )
+        if response.status_code != 200:
+            if page == 1:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Could not list repositories for organization '{org}'"
+                )
+            break
+        
+        repos = response.json() or []
+        for repo in repos:
+            if repo.get('fork') and not include_forks:
+                continue
+            urls.append(repo['html_url'])
+        if len(repos) < 100:
+            break
+        page += 1
+    
+    return urls[:limit]
+
+
+def batch_summary(db: Session, batch: InvestigationBatch, include_children: bool = False) -> dict:
+    """Batch record with aggregate progress across its investigations"""
+    counts = dict(
+        db.query(Investigation.status, func.count(Investigation.id))
+        .filter(Investigation.batch_id == batch.id)
+        .group_by(Investigation.status)
+        .all()
+    )
+    finished = sum(counts.get(s, 0) for s in job_queue.FINISHED_STATUSES)
+    
+    summary = {
+        "id": str(batch.id),
+        "source": batch.source,
+        "total": batch.total,
+        "max_concurrency": batch.max_concurrency,
+        "status": "completed" if batch.completed_at else "processing",
+        "progress": counts,
+        "percent_complete": round(finished / batch.total * 100, 1) if batch.total else 100.0,
+        "created_at": batch.created_at,
+        "completed_at": batch.completed_at
+    }
+    
+    if include_children:
+        children = db.query(Investigation).filter(
+            Investigation.batch_id == batch.id
+        ).order_by(Investigation.created_at.asc()).all()
+        summary["investigations"] = [
+            {
+                "id": str(inv.id),
+                "repo_url": inv.repo_url,
+                "status": inv.status,
+                "confidence": inv.confidence
+            }
+            for inv in children
+        ]
+    
+    return summary
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def create_batch(
+    data: BatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Start investigations for a list of repositories or a whole GitHub org"""
+    
+    if bool(data.repo_urls) == bool(data.org):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either repo_urls or org"
+        )
+    
+    if data.org:
+        # One past the limit so oversized orgs are rejected rather than silently truncated
+        repo_urls = await asyncio.to_thread(
+            list_org_repos, data.org, settings.BATCH_MAX_REPOS + 1, data.include_forks
+        )
+        source = f"org:{data.org}"
+    else:
+        repo_urls = [str(url) for url in data.repo_urls]
+        source = "list"
+    
+    # The same repository listed twice (or under different URL spellings) runs once
+    unique = {}
+    for url in repo_urls:
+        unique.setdefault(normalize_repo_url(url), url)
+    repo_urls = list(unique.values())
+    
+    if not repo_urls:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No repositories to investigate"
+        )
+    if len(repo_urls) > settings.BATCH_MAX_REPOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batches are limited to {settings.BATCH_MAX_REPOS} repositories"
+        )
+    
+    # Admission control against the user's batch queue
+    retry_after = job_queue.admission_retry_after(db, current_user.id, "batch", len(repo_urls))
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many queued batch investigations - retry later",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
+    batch = InvestigationBatch(
+        id=uuid.uuid4(),
+        user_id=current_user.id,
+        source=source,
+        total=len(repo_urls),
+        max_concurrency=data.max_concurrency
+    )
+    db.add(batch)
+    
+    investigations = [
+        Investigation(
+            id=uuid.uuid4(),
+            user_id=current_user.id,
+            repo_url=url,
+            status="pending",
+            batch_id=batch.id
+        )
+        for url in repo_urls
+    ]
+    db.add_all(investigations)
+    db.commit()
+    
+    # Resolve snapshot keys in parallel (one git ls-remote each)
+    semaphore = asyncio.Semaphore(settings.BATCH_HEAD_RESOLVE_CONCURRENCY)
+    
+    async def resolve(url: str) -> str:
+        async with semaphore:
+            return await snapshot_key(url)
+    
+    keys = await asyncio.gather(*(resolve(url) for url in repo_urls))
+    
+    # Children run at batch priority so interactive investigations stay responsive
+    for investigation, key in zip(investigations, keys):
+        submit_investigation(db, investigation, key, data.force_fresh, {"job_class": "batch"})
+    
+    # Every child may have been answered from recent results
+    job_queue.close_finished_batches(db, [batch.id])
+    return batch_summary(db, batch)
+
+
+@router.get("/")
+async def list_batches(
+    skip: int = 0,
+    limit: int = 20,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """List the current user's batches"""
+    
+    batches = db.query(InvestigationBatch).filter(
+        InvestigationBatch.user_id == current_user.id
+    ).order_by(InvestigationBatch.created_at.desc()).offset(skip).limit(limit).all()
+    
+    return [batch_summary(db, batch) for batch in batches]
+
+
+@router.get("/{batch_id}")
+async def get_batch(
+    batch_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get batch progress and its investigations"""
+    
+    batch = db.query(InvestigationBatch).filter(
+        InvestigationBatch.id == batch_id,
+        InvestigationBatch.user_id == current_user.id
+    ).first()
+    
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Batch not found"
+        )
+    
+    return batch_summary(db, batch, include_children=True)
+
+
+@router.post("/{batch_id}/cancel")
+async def cancel_batch(
+    batch_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cancel every unfinished investigation in a batch"""
+    
+    batch = db.query(InvestigationBatch).filter(
+        InvestigationBatch.id == batch_id,
+        InvestigationBatch.user_id == current_user.id
+    ).first()
+    
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Batch not found"
+        )
+    
+    pending = db.query(Investigation).filter(
+        Investigation.batch_id == batch.id,
+        Investigation.status.in_(["pending", "processing"])
+    ).all()
+    for investigation in pending:
+        if not investigation.leader_id:
+            job_queue.promote_follower(db, investigation)
+            job_queue.cancel(db, investigation.id)
+        investigation.leader_id = None
+        investigation.status = "cancelled"
+        investigation.completed_at = datetime.utcnow()
+    db.commit()
+    job_queue.close_finished_batches(db, [batch.id])
+    
+    return batch_summary(db, batch)
@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
 import asyncio
 
 from app.database import get_db
 from app.models import Investigation, User, AgentLog
-from app.agents.coordinator import Coordinator
 from app.utils.auth import verify_token
+from app.utils import job_queue, result_index
+from app.utils.event_bus import event_bus
+from app.utils.log_writer import last_seq
+from app.utils.repo_identity import repo_key, resolve_head_sha
+from app.config import settings
 from fastapi import Header
 
 
@@ -19,6 +23,8 @@ router = APIRouter(prefix="/api/investigations", tags=["Investigations"])
 # Request/Response Models
 class InvestigationCreate(BaseModel):
     repo_url: HttpUrl
+    force_fresh: bool = False  # Skip reusing a recent result for the same repo snapshot
+    time_budget_seconds: Optional[float] = Field(None, gt=0)  # Latency target, e.g. 45 for "report within 45s"
 
 
 class InvestigationResponse(BaseModel):
@@ -74,85 +80,74 @@ def get_current_user(authorization: str = Header(None), db: Session = Depends(ge
     return user
 
 
-def progress_callback_sync(investigation_id: str, db: Session):
-    """Create a callback function for agent progress"""
-    def callback(agent_name: str, message: str, data: dict = None):
-        # Save agent log to database
-        log = AgentLog(
-            investigation_id=investigation_id,
-            agent_name=agent_name,
-            message=message,
-            data=data or {}
-        )
-        db.add(log)
-        db.commit()
-        
-        # Note: WebSocket events will be polled by frontend instead
-        # Real-time WebSocket from background tasks is complex in FastAPI
-    
-    return callback
+async def snapshot_key(repo_url: str) -> str:
+    """Identical repo snapshots share one run: key on normalized URL (+ HEAD SHA if resolvable)"""
+    head_sha = None
+    if settings.SINGLE_FLIGHT_RESOLVE_HEAD:
+        head_sha = await asyncio.to_thread(resolve_head_sha, repo_url, settings.HEAD_RESOLVE_TIMEOUT_SECONDS)
+    return repo_key(repo_url, head_sha)
 
 
-def run_investigation(investigation_id: str, repo_url: str, db: Session):
-    """Background task to run investigation"""
-    import traceback
-    
-    # Get investigation record
-    investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+def submit_investigation(db: Session, investigation: Investigation, key: str,
+                         force_fresh: bool = False, payload: dict = None):
+    """Answer a new investigation from a recent result, attach it to an
+    identical in-flight run, or queue it for a worker"""
+    payload = payload or {}
+    budgeted = bool(payload.get("time_budget_seconds"))
     
-    if not investigation:
-        print(f"[ERROR] Investigation {investigation_id} not found in database")
-        return
+    # No worker runs this investigation yet, so the log rows below can safely take last_seq + 1
     
-    try:
-        # Update status
-        investigation.status = "processing"
-        db.commit()
-        print(f"[INFO] Starting investigation {investigation_id} for {repo_url}")
-        
-        # Create coordinator with progress callback
-        callback = progress_callback_sync(investigation_id, db)
-        coordinator = Coordinator(progress_callback=callback)
-        
-        # Run investigation
-        result = coordinator.investigate(repo_url)
-        
-        # Save results - include full report data in findings for visualization
-        investigation.findings = {
-            "scout_data": result.get("scout_data", {}),
-            "analysis": result.get("analysis", {}),
-            "rounds_taken": result.get("rounds_taken", 0),
-            "web_search_performed": result.get("web_search_performed", False),
-            "report_data": result.get("report", {})  # Full report object with timeline, citations, etc.
-        }
-        investigation.report = result["report"]["narrative"]
-        investigation.confidence = result["confidence"]
-        investigation.status = "completed"
-        investigation.completed_at = datetime.utcnow()
-        
-        db.commit()
-        print(f"[SUCCESS] Investigation {investigation_id} completed with {result['confidence']}% confidence")
-    
-    except Exception as e:
-        # Mark as failed AND log the error to console
-        error_msg = f"Investigation failed: {str(e)}"
-        print(f"[ERROR] {error_msg}")
-        print(f"[TRACEBACK] {traceback.format_exc()}")
-        
-        investigation.status = "failed"
-        investigation.report = error_msg
+    # Someone investigated this exact snapshot recently - reuse their result
+    reused = None if force_fresh else result_index.lookup(db, key)
+    if reused:
+        result_index.apply(db, investigation, reused)
+        db.add(AgentLog(
+            investigation_id=investigation.id,
+            agent_name="coordinator",
+            message="Reused a recent investigation of this repository snapshot",
+            data={"source_investigation_id": str(reused.investigation_id) if reused.investigation_id else None,
+                  "result_created_at": reused.created_at.isoformat()},
+            seq=last_seq(db, investigation.id) + 1
+        ))
         db.commit()
+    
+    # Otherwise queue for a worker process (see app/worker.py), or follow an in-flight run
+    elif settings.SINGLE_FLIGHT_ENABLED and not force_fresh and not budgeted:
+        leader_id = job_queue.enqueue_or_follow(db, investigation, key, payload)
+        if leader_id:
+            db.add(AgentLog(
+                investigation_id=investigation.id,
+                agent_name="coordinator",
+                message="Identical investigation already in progress - sharing its results",
+                data={"leader_id": leader_id},
+                seq=last_seq(db, investigation.id) + 1
+            ))
+            db.commit()
+    else:
+        # Time-budgeted runs may cut corners, so they are neither followed nor indexed for reuse
+        shareable_key = None if budgeted else key
+        job_queue.enqueue(db, investigation.id, investigation.repo_url, payload,
+                          repo_key=shareable_key, batch_id=investigation.batch_id,
+                          user_id=investigation.user_id)
 
 
 @router.post("/", response_model=InvestigationResponse, status_code=status.HTTP_201_CREATED)
 async def create_investigation(
     data: InvestigationCreate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Start a new investigation"""
     
+    # Admission control: a full per-user queue is told when to come back
+    retry_after = job_queue.admission_retry_after(db, current_user.id, "interactive")
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many queued investigations - retry later",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
     # Create investigation record
     investigation = Investigation(
         id=uuid.uuid4(),
@@ -165,13 +160,19 @@ async def create_investigation(
     db.commit()
     db.refresh(investigation)
     
-    # Queue background task
-    background_tasks.add_task(
-        run_investigation,
-        str(investigation.id),
-        str(data.repo_url),
-        db
-    )
+    key = await snapshot_key(str(data.repo_url))
+    
+    # Per-run options the worker needs
+    payload = {}
+    if data.time_budget_seconds:
+        payload["time_budget_seconds"] = data.time_budget_seconds
+        # Absolute, so time spent queued and on retries comes out of the same budget
+        payload["deadline_at"] = (
+            investigation.created_at + timedelta(seconds=data.time_budget_seconds)
+        ).isoformat()
+    
+    submit_investigation(db, investigation, key, data.force_fresh, payload)
+    
     # return investigation (changed part)
     # Return response with UUID converted to string
     return {
@@ -264,19 +265,110 @@ async def delete_investigation(
             detail="Investigation not found"
         )
     
+    # Don't strand users following this run, then stop the worker running it
+    job_queue.promote_follower(db, investigation)
+    job_queue.cancel(db, investigation.id)
+    
     db.delete(investigation)
     db.commit()
     
     return None
 
 
+@router.post("/{investigation_id}/cancel", response_model=InvestigationResponse)
+async def cancel_investigation(
+    investigation_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Stop a pending or running investigation"""
+    
+    investigation = db.query(Investigation).filter(
+        Investigation.id == investigation_id,
+        Investigation.user_id == current_user.id
+    ).first()
+    
+    if not investigation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Investigation not found"
+        )
+    
+    if investigation.status not in ("pending", "processing"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Investigation is already {investigation.status}"
+        )
+    
+    worker_running = False
+    if investigation.leader_id:
+        # A follower just detaches; the shared run continues for everyone else
+        investigation.leader_id = None
+    else:
+        # Hand the run to a follower if there is one; otherwise the worker stops at its next check
+        job_queue.promote_follower(db, investigation)
+        worker_running = job_queue.cancel(db, investigation.id)
+    
+    investigation.status = "cancelled"
+    investigation.completed_at = datetime.utcnow()
+    if worker_running:
+        # The worker may hold unflushed events; it logs the cancellation in its own sequence
+        db.commit()
+    else:
+        log = AgentLog(
+            investigation_id=investigation.id,
+            agent_name="coordinator",
+            message="Cancellation requested",
+            data={"cancelled": True},
+            seq=last_seq(db, investigation.id) + 1
+        )
+        db.add(log)
+        db.commit()
+        event_bus.publish(
+            "agent_message",
+            investigation_id=str(investigation.id),
+            agent_name=log.agent_name,
+            message=log.message,
+            data=log.data,
+            seq=log.seq
+        )
+        event_bus.publish("investigation_error", investigation_id=str(investigation.id), error="Investigation cancelled")
+    job_queue.close_finished_batches(db, [investigation.batch_id])
+    
+    return {
+        "id": str(investigation.id),
+        "repo_url": investigation.repo_url,
+        "status": investigation.status,
+        "confidence": investigation.confidence,
+        "created_at": investigation.created_at,
+        "completed_at": investigation.completed_at
+    }
+
+
 @router.get("/{investigation_id}/logs")
 async def get_investigation_logs(
     investigation_id: str,
+    response: Response,
+    after_id: Optional[int] = Query(None, ge=0),
+    leader_after_id: Optional[int] = Query(None, ge=0),
+    limit: int = Query(settings.LOGS_PAGE_SIZE, ge=1, le=settings.LOGS_PAGE_MAX),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get agent logs for an investigation"""
+    """Get agent logs for an investigation, oldest first.
+    
+    Keyset-paginated by log id, with one cursor per stream: pass the
+    X-Last-Id header of the previous page as after_id to get only newer
+    rows. Followers also get the run they are attached to (X-Leader-Id),
+    paged by X-Leader-Last-Id / leader_after_id. X-Has-More says whether to
+    fetch again right away; 204 means nothing new since the cursors.
+    
+    Each investigation's rows are written by one writer at a time, in
+    order, so within a stream ids become visible in increasing order and a
+    cursor never passes a row that has yet to commit. Streams written by
+    different processes would not share that guarantee, which is why they
+    are never paged by a common id.
+    """
     
     # Verify ownership
     investigation = db.query(Investigation).filter(
@@ -290,14 +382,36 @@ async def get_investigation_logs(
             detail="Investigation not found"
         )
     
-    # Get logs
-    logs = db.query(AgentLog).filter(
-        AgentLog.investigation_id == investigation_id
-    ).order_by(AgentLog.timestamp.asc()).all()
+    # Followers read the logs of the run they are attached to, plus their own
+    streams = [(investigation.id, after_id, "X-Last-Id")]
+    if investigation.leader_id:
+        streams.append((investigation.leader_id, leader_after_id, "X-Leader-Last-Id"))
+        response.headers["X-Leader-Id"] = str(investigation.leader_id)
+    
+    logs = []
+    has_more = False
+    for source, cursor, header in streams:
+        # One past the limit to tell whether another page follows
+        query = db.query(AgentLog).filter(AgentLog.investigation_id == source)
+        if cursor is not None:
+            query = query.filter(AgentLog.id > cursor)
+        rows = query.order_by(AgentLog.id.asc()).limit(limit + 1).all()
+        has_more = has_more or len(rows) > limit
+        rows = rows[:limit]
+        response.headers[header] = str(rows[-1].id if rows else cursor or 0)
+        logs.extend(rows)
+    
+    if not logs and (after_id is not None or leader_after_id is not None):
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    logs.sort(key=lambda log: (log.timestamp, log.id))
     
     return [
         {
             "id": log.id,
+            "investigation_id": str(log.investigation_id),
+            "seq": log.seq,
             "agent_name": log.agent_name,
             "message": log.message,
             "data": log.data,
@@ -0,0 +1,90 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class InvestigationCancelled(BaseException):
+    """Raised when a running investigation has been cancelled.
+    
+    Derives from BaseException (like asyncio.CancelledError) so the agents'
+    broad `except Exception` fallbacks don't swallow it.
+    """
+
+
+class StageTimeout(Exception):
+    """Raised when a pipeline stage runs past its deadline"""
+
+
+class CancellationToken:
+    """Cooperative cancellation plus per-stage deadlines for one investigation.
+    
+    Work checks the token between and inside stages; cancel() may be called
+    from any thread. Stage deadlines are per thread, so speculative work
+    running alongside the analyst keeps its own budget.
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._children = []
+        self.reason = None
+    
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            self.reason = reason
+            self._event.set()
+            children, self._children = self._children, []
+        for child in children:
+            child.cancel(reason)
+    
+    def child(self) -> "CancellationToken":
+        """Token for optional work: cancelling it stops only that work, cancelling this token stops both"""
+        child = CancellationToken()
+        with self._lock:
+            if not self._event.is_set():
+                self._children.append(child)
+                return child
+        child.cancel(self.reason)
+        return child
+    
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def remaining(self, default: Optional[float] = None) -> Optional[float]:
+        """Seconds left in the current thread's stage (capped at default)"""
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is None:
+            return default
+        left = max(0.0, deadline - time.monotonic())
+        return min(left, default) if default is not None else left
+    
+    def check(self):
+        """Raise if cancelled or the current stage is out of time"""
+        if self._event.is_set():
+            raise InvestigationCancelled(self.reason)
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is not None and time.monotonic() > deadline:
+            raise StageTimeout(f"Stage '{self._local.stage}' exceeded its deadline")
+    
+    def wait(self, seconds: float):
+        """Sleep that wakes up early (and raises) on cancellation"""
+        if self._event.wait(seconds):
+            self.check()
+    
+    @contextmanager
+    def stage(self, name: str, seconds: Optional[float]):
+        """Run a block under a deadline; nested stages can only shorten it"""
+        previous = (getattr(self._local, "stage", None), getattr(self._local, "deadline", None))
+        deadline = time.monotonic() + seconds if seconds else None
+        if previous[1] is not None and (deadline is None or previous[1] < deadline):
+            deadline = previous[1]
+        
+        self._local.stage, self._local.deadline = name, deadline
+        try:
+            self.check()
+            yield self
+        finally:
+            self._local.stage, self._local.deadline = previous
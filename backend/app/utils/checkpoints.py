@@ -0,0 +1,43 @@
+import json
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import InvestigationCheckpoint
+
+
+def save(db: Session, investigation_id: str, node: str, state: Dict):
+    """Persist workflow state after a completed node (one row per investigation)"""
+    # Round-trip through JSON so anything non-serializable is stored as text
+    snapshot = json.loads(json.dumps(state, default=str))
+    
+    checkpoint = db.query(InvestigationCheckpoint).filter(
+        InvestigationCheckpoint.investigation_id == investigation_id
+    ).first()
+    if not checkpoint:
+        checkpoint = InvestigationCheckpoint(investigation_id=investigation_id)
+        db.add(checkpoint)
+    
+    checkpoint.node = node
+    checkpoint.state = snapshot
+    checkpoint.updated_at = datetime.utcnow()
+    db.commit()
+
+
+def load(db: Session, investigation_id: str) -> Optional[Tuple[str, Dict]]:
+    """Last completed node and state for an investigation, if any"""
+    checkpoint = db.query(InvestigationCheckpoint).filter(
+        InvestigationCheckpoint.investigation_id == investigation_id
+    ).first()
+    if not checkpoint:
+        return None
+    return checkpoint.node, checkpoint.state
+
+
+def clear(db: Session, investigation_id: str):
+    """Drop the checkpoint once the investigation has finished"""
+    db.query(InvestigationCheckpoint).filter(
+        InvestigationCheckpoint.investigation_id == investigation_id
+    ).delete(synchronize_session=False)
+    db.commit()
@@ -0,0 +1,221 @@
+import json
+import queue
+import select
+import threading
+import time
+from typing import Dict, List
+
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.websocket import (
+    emit_threadsafe,
+    emit_agent_message,
+    emit_confidence_update,
+    emit_report_chunk,
+    emit_investigation_complete,
+    emit_investigation_error
+)
+
+# Events workers may publish, and the Socket.IO emitter each one maps to
+EMITTERS = {
+    "agent_message": emit_agent_message,
+    "confidence_update": emit_confidence_update,
+    "report_chunk": emit_report_chunk,
+    "investigation_complete": emit_investigation_complete,
+    "investigation_error": emit_investigation_error
+}
+
+CHANNEL = "investigation_events"
+_MAX_PAYLOAD_BYTES = 7900  # Postgres caps NOTIFY payloads at 8000 bytes
+_PUBLISH_BATCH = 100
+_TEXT_FIELDS = ("message", "error")  # Free text that may be trimmed to fit
+_TRUNCATED_MARK = "... [truncated]"
+
+
+def dispatch(event: str, args: Dict):
+    """Hand an event to the Socket.IO server in this process"""
+    emitter = EMITTERS.get(event)
+    if emitter:
+        emit_threadsafe(emitter(**args))
+
+
+def encode(event: str, args: Dict) -> List[str]:
+    """NOTIFY payloads for one event, split or trimmed to fit the size cap"""
+    message = json.dumps({"event": event, "args": args}, default=str)
+    if len(message.encode("utf-8")) <= _MAX_PAYLOAD_BYTES:
+        return [message]
+    
+    if event == "report_chunk" and len(args["chunk"]) > 1:
+        # Long chunks go out as consecutive pieces with their own offsets
+        half = len(args["chunk"]) // 2
+        return (
+            encode(event, {**args, "chunk": args["chunk"][:half]})
+            + encode(event, {**args, "chunk": args["chunk"][half:], "offset": args["offset"] + half})
+        )
+    
+    # Oversized structured data stays in the database; the text itself still goes out,
+    # cut down as far as needed (the full row can be re-read from the logs API)
+    metrics.incr("event_bus.truncated")
+    args = {**args, "data": {"truncated": True}} if "data" in args else dict(args)
+    while True:
+        message = json.dumps({"event": event, "args": args}, default=str)
+        overflow = len(message.encode("utf-8")) - _MAX_PAYLOAD_BYTES
+        if overflow <= 0:
+            return [message]
+        
+        fields = [
+            field for field in _TEXT_FIELDS
+            if isinstance(args.get(field), str) and len(args[field]) > len(_TRUNCATED_MARK)
+        ]
+        if not fields:
+            metrics.incr("event_bus.oversized")
+            print(f"[ERROR] Dropping oversized '{event}' event")
+            return []
+        
+        # Escaping makes characters several bytes wide, so cut in proportion and re-check
+        field = max(fields, key=lambda name: len(args[name]))
+        text = args[field]
+        escaped = len(json.dumps(text).encode("utf-8"))
+        keep = int(len(text) * max(0, escaped - overflow - len(_TRUNCATED_MARK)) / escaped)
+        args[field] = text[:min(keep, len(text) - len(_TRUNCATED_MARK) - 1)] + _TRUNCATED_MARK
+
+
+def _raw_connection(autocommit: bool):
+    """Dedicated psycopg2 connection, detached from the SQLAlchemy pool"""
+    from app.database import engine
+    
+    fairy = engine.raw_connection()
+    fairy.detach()
+    connection = fairy.driver_connection
+    connection.autocommit = autocommit
+    return connection
+
+
+class LocalEventBus:
+    """Emits straight onto this process's event loop (embedded worker only)"""
+    
+    def publish(self, event: str, **args):
+        dispatch(event, args)
+    
+    def start_listener(self):
+        pass
+
+
+class PostgresEventBus:
+    """Relays worker events to every API process through LISTEN/NOTIFY.
+    
+    publish() only queues the event; a publisher thread sends queued events
+    in one transaction per batch, so they arrive in order. Each API process
+    runs a listener thread that hands received events to its Socket.IO
+    server, wherever the worker that produced them is running.
+    """
+    
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._publisher = None
+        self._listener = None
+    
+    def publish(self, event: str, **args):
+        self._queue.put((event, args))
+        with self._lock:
+            if self._publisher is None:
+                self._publisher = threading.Thread(target=self._publish_loop, name="event-bus-publisher", daemon=True)
+                self._publisher.start()
+    
+    def _publish_loop(self):
+        connection = None
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < _PUBLISH_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                if connection is None or connection.closed:
+                    connection = _raw_connection(autocommit=False)
+                try:
+                    self._send(connection, batch)
+                except Exception:
+                    if connection.closed:
+                        raise
+                    # Most likely one unsendable event - resend one at a time so only it is lost
+                    connection.rollback()
+                    self._send_each(connection, batch)
+            except Exception as e:
+                # Live updates are best effort; clients can always re-read the logs
+                print(f"[ERROR] Event publish failed: {e}")
+                metrics.incr("event_bus.dropped", len(batch))
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                connection = None
+                time.sleep(1)
+    
+    def _send(self, connection, batch):
+        """NOTIFY a batch of events in one transaction (delivered in order, all or nothing)"""
+        with connection.cursor() as cursor:
+            for event, args in batch:
+                for payload in encode(event, args):
+                    cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+        connection.commit()
+        metrics.incr("event_bus.published", len(batch))
+    
+    def _send_each(self, connection, batch):
+        """Send events one transaction each, dropping only those that fail"""
+        for event, args in batch:
+            try:
+                self._send(connection, [(event, args)])
+            except Exception as e:
+                if connection.closed:
+                    raise
+                connection.rollback()
+                print(f"[ERROR] Dropping unsendable '{event}' event: {e}")
+                metrics.incr("event_bus.dropped")
+    
+    def start_listener(self):
+        """Start relaying notifications to this process's Socket.IO clients"""
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen_loop, name="event-bus-listener", daemon=True)
+                self._listener.start()
+    
+    def _listen_loop(self):
+        connection = None
+        while True:
+            try:
+                connection = _raw_connection(autocommit=True)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                
+                while True:
+                    if select.select([connection], [], [], 5) == ([], [], []):
+                        # Idle - a round trip surfaces a dead connection
+                        with connection.cursor() as cursor:
+                            cursor.execute("SELECT 1")
+                    else:
+                        connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        message = json.loads(notify.payload)
+                        dispatch(message["event"], message["args"])
+            except Exception as e:
+                print(f"[ERROR] Event listener disconnected, reconnecting: {e}")
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                time.sleep(1)
+
+
+def create_event_bus():
+    if settings.EVENT_BUS_BACKEND == "local":
+        return LocalEventBus()
+    return PostgresEventBus()
+
+
+# Process-wide bus shared by all investigations
+event_bus = create_event_bus()
@@ -1,6 +1,6 @@
 import os
 import shutil
-import requests
+import subprocess
 from datetime import datetime
 from collections import defaultdict
 from git import Repo, GitCommandError
@@ -9,18 +9,23 @@ import tempfile
 
 
 from app.config import settings
+from app.utils.cancellation import CancellationToken, InvestigationCancelled, StageTimeout
+from app.utils.github_cache import github_get
+from app.utils.resource_governor import resource_governor
 
 class GitAnalyzer:
     """Analyzes git repositories and extracts commit history"""
     
-    def __init__(self, repo_url: str):
+    def __init__(self, repo_url: str, cancel_token: CancellationToken = None):
         self.repo_url = repo_url
+        self.cancel_token = cancel_token or CancellationToken()
         # Extract owner and repo name from URL
         parts = repo_url.rstrip('/').replace('.git', '').split('/')
         self.repo_name = parts[-1]
         self.repo_owner = parts[-2] if len(parts) >= 2 else None
         self.temp_dir = None
         self.repo = None
+        self._disk_reserved = 0  # Bytes held against the governor's disk budget
         self.github_token = settings.GITHUB_TOKEN
         self._github_headers = self._build_github_headers()
     
@@ -41,7 +46,7 @@ class GitAnalyzer:
         
         try:
             url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}"
-            response = requests.get(url, headers=self._github_headers)
+            response = github_get(url, headers=self._github_headers, timeout=settings.GITHUB_API_TIMEOUT_SECONDS)
             
             if response.status_code == 200:
                 data = response.json()
@@ -79,7 +84,7 @@ class GitAnalyzer:
         
         try:
             url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/languages"
-            response = requests.get(url, headers=self._github_headers)
+            response = github_get(url, headers=self._github_headers, timeout=settings.GITHUB_API_TIMEOUT_SECONDS)
             
             if response.status_code == 200:
                 languages = response.json()
@@ -104,7 +109,7 @@ class GitAnalyzer:
         try:
             url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/releases"
             params = {'per_page': 10}
-            response = requests.get(url, headers=self._github_headers, params=params)
+            response = github_get(url, headers=self._github_headers, params=params, timeout=settings.GITHUB_API_TIMEOUT_SECONDS)
             
             if response.status_code == 200:
                 releases = response.json()
@@ -131,7 +136,7 @@ class GitAnalyzer:
             
             # First get total count via Link header
             params = {'per_page': 1, 'anon': 'false'}
-            response = requests.get(url, headers=self._github_headers, params=params)
+            response = github_get(url, headers=self._github_headers, params=params, timeout=settings.GITHUB_API_TIMEOUT_SECONDS)
             
             total_count = None
             if response.status_code == 200:
@@ -143,13 +148,13 @@ class GitAnalyzer:
                 else:
                     # Small repo, fetch all
                     params['per_page'] = 100
-                    response = requests.get(url, headers=self._github_headers, params=params)
+                    response = github_get(url, headers=self._github_headers, params=params, timeout=settings.GITHUB_API_TIMEOUT_SECONDS)
                     if response.status_code == 200:
                         total_count = len(response.json())
             
             # Now get top contributors with details
             params = {'per_page': limit, 'anon': 'false'}
-            response = requests.get(url, headers=self._github_headers, params=params)
+            response = github_get(url, headers=self._github_headers, params=params, timeout=settings.GITHUB_API_TIMEOUT_SECONDS)
             
             if response.status_code == 200:
                 contributors = response.json()
@@ -176,7 +181,7 @@ class GitAnalyzer:
         try:
             url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/community/profile"
             headers = {**self._github_headers, 'Accept': 'application/vnd.github.v3+json'}
-            response = requests.get(url, headers=headers)
+            response = github_get(url, headers=headers, timeout=settings.GITHUB_API_TIMEOUT_SECONDS)
             
             if response.status_code == 200:
                 data = response.json()
@@ -194,7 +199,24 @@ class GitAnalyzer:
             print(f"GitHub community API error: {e}")
             return None
     
-    def clone_repository(self) -> bool:
+    def estimate_clone_bytes(self, github_repo: Optional[Dict] = None) -> int:
+        """Disk a clone is expected to need (GitHub's packed size, doubled for the checkout)"""
+        default = settings.RESOURCE_CLONE_DEFAULT_MB * 1024 * 1024
+        size_kb = (github_repo or {}).get('size_kb') or 0
+        return max(size_kb * 1024 * 2, default)
+    
+    def directory_size(self) -> int:
+        """Bytes used by the cloned working tree"""
+        total = 0
+        for root, _, files in os.walk(self.temp_dir):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+    
+    def clone_repository(self, github_repo: Optional[Dict] = None) -> bool:
         """Clone the repository to a temporary directory"""
         try:
             # Create temp directory with unique timestamp
@@ -217,15 +239,48 @@ class GitAnalyzer:
                             timestamp = int(time.time())
                             self.temp_dir = os.path.join(tempfile.gettempdir(), f"neural_arch_{self.repo_name}_{timestamp}")
             
-            # Clone repository
-            self.repo = Repo.clone_from(self.repo_url, self.temp_dir, depth=None)
+            # Reserve disk up front, then wait for a clone slot
+            self._disk_reserved = resource_governor.reserve_disk(
+                self.estimate_clone_bytes(github_repo), self.cancel_token
+            )
+            with resource_governor.slot("clone", self.cancel_token):
+                with self.cancel_token.stage("clone", settings.STAGE_TIMEOUT_CLONE_SECONDS):
+                    self.run_git_clone()
+            self._disk_reserved = resource_governor.resize_disk(self._disk_reserved, self.directory_size())
+            self.repo = Repo(self.temp_dir)
             return True
         
+        except (StageTimeout, InvestigationCancelled):
+            # The coordinator and worker must tell a deadline or cancel from a clone error
+            raise
         except GitCommandError as e:
             raise Exception(f"Failed to clone repository: {str(e)}")
         except Exception as e:
             raise Exception(f"Error during cloning: {str(e)}")
     
+    def run_git_clone(self):
+        """git clone in a child process that is killed on cancellation or deadline"""
+        process = subprocess.Popen(
+            ["git", "clone", self.repo_url, self.temp_dir],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+        )
+        try:
+            while True:
+                try:
+                    process.wait(timeout=0.5)
+                    break
+                except subprocess.TimeoutExpired:
+                    self.cancel_token.check()
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        
+        if process.returncode != 0:
+            raise GitCommandError(["git", "clone"], process.returncode, process.stderr.read())
+    
     def analyze_commits(self) -> Dict:
         """Extract and analyze all commits"""
         if not self.repo:
@@ -247,7 +302,10 @@ class GitAnalyzer:
         ]
         
         # Iterate through all commits
-        for commit in self.repo.iter_commits():
+        for index, commit in enumerate(self.repo.iter_commits()):
+            if index % 500 == 0:
+                self.cancel_token.check()
+            
             commit_date = datetime.fromtimestamp(commit.committed_date)
             author_name = commit.author.name
             author_email = commit.author.email.lower() if commit.author.email else 'unknown'
@@ -384,15 +442,23 @@ class GitAnalyzer:
             except Exception as e:
                 
                 pass
+        
+        if self._disk_reserved:
+            resource_governor.release_disk(self._disk_reserved)
+            self._disk_reserved = 0
     
     def analyze(self) -> Dict:
         """Complete analysis pipeline"""
         try:
+            # Repo metadata first (cached) - its size sizes the disk reservation
+            github_repo = self.fetch_github_repo_data()
+            
             # Clone repository
-            self.clone_repository()
+            self.clone_repository(github_repo)
             
             # Analyze commits
-            commits_data = self.analyze_commits()
+            with self.cancel_token.stage("log_parse", settings.STAGE_TIMEOUT_LOG_PARSE_SECONDS):
+                commits_data = self.analyze_commits()
             
             # Detect patterns
             patterns = self.detect_patterns(commits_data)
@@ -409,7 +475,7 @@ class GitAnalyzer:
                 active_months = 0
             
             # Fetch all GitHub API data
-            github_repo = self.fetch_github_repo_data()
+            self.cancel_token.check()
             github_contributors = self.fetch_github_contributors(limit=10)
             github_languages = self.fetch_github_languages()
             github_releases = self.fetch_github_releases()
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from urllib.parse import urlencode
+
+import requests
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+
+class CachedResponse:
+    """The parts of a requests.Response the GitHub helpers use"""
+    
+    def __init__(self, status_code: int, body, headers: Dict):
+        self.status_code = status_code
+        self._body = body
+        self.headers = headers
+    
+    def json(self):
+        return self._body
+
+
+def github_headers() -> Dict:
+    """Headers for GitHub REST requests made outside GitAnalyzer"""
+    headers = {
+        'Accept': 'application/vnd.github.v3+json',
+        'User-Agent': 'NeuralArchaeologist'
+    }
+    if settings.GITHUB_TOKEN:
+        headers['Authorization'] = f'token {settings.GITHUB_TOKEN}'
+    return headers
+
+
+def _cache_key(url: str, params: Optional[Dict]) -> str:
+    return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+
+def github_get(url: str, headers: Dict, params: Dict = None, timeout: float = None) -> CachedResponse:
+    """GET a GitHub REST URL through the shared github_response_cache table.
+    
+    Successful responses are reused for GITHUB_API_CACHE_TTL_SECONDS by
+    every worker, so batch scans and repeat investigations don't spend the
+    hourly API quota on identical lookups. Expired entries are removed when
+    read. Cache errors fall through to a live request.
+    """
+    key = _cache_key(url, params)
+    ttl = settings.GITHUB_API_CACHE_TTL_SECONDS
+    
+    if ttl > 0:
+        # Imported lazily so the cache can be switched off without a database (CLI runs)
+        from app.database import SessionLocal
+        from app.models import GithubResponseCache
+        
+        db = SessionLocal()
+        try:
+            entry = db.query(GithubResponseCache).filter(GithubResponseCache.request_key == key).first()
+            if entry and entry.fetched_at >= datetime.utcnow() - timedelta(seconds=ttl):
+                metrics.incr("github_cache.hits")
+                return CachedResponse(entry.status_code, entry.body, entry.headers or {})
+            if entry:
+                db.delete(entry)
+                db.commit()
+        except Exception as e:
+            print(f"GitHub cache read error: {e}")
+        finally:
+            db.close()
+    
+    metrics.incr("github_cache.misses")
+    response = requests.get(url, headers=headers, params=params, timeout=timeout)
+    result = CachedResponse(
+        response.status_code,
+        response.json() if response.status_code == 200 else None,
+        {"Link": response.headers.get("Link", "")}
+    )
+    
+    if ttl > 0 and response.status_code == 200:
+        db = SessionLocal()
+        try:
+            db.merge(GithubResponseCache(
+                request_key=key,
+                status_code=result.status_code,
+                body=result.json(),
+                headers=result.headers,
+                fetched_at=datetime.utcnow()
+            ))
+            db.commit()
+        except Exception as e:
+            print(f"GitHub cache write error: {e}")
+        finally:
+            db.close()
+    
+    return result
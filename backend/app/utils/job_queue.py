@@ -0,0 +1,365 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, or_, text
+from sqlalchemy.orm import Session, aliased
+
+from app.config import settings
+from app.models import Investigation, InvestigationBatch, InvestigationJob
+from app.utils.llm_scheduler import JOB_CLASS_RANK
+from app.utils.metrics import metrics
+
+WORKER_LOST_ERROR = "Worker stopped responding on the final attempt"
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+def enqueue(db: Session, investigation_id: str, repo_url: str, payload: Dict = None, repo_key: str = None,
+            batch_id: str = None, user_id: str = None) -> InvestigationJob:
+    """Add an investigation to the durable job queue (its class comes from payload['job_class'])"""
+    job = InvestigationJob(
+        investigation_id=investigation_id,
+        repo_url=repo_url,
+        repo_key=repo_key,
+        batch_id=batch_id,
+        user_id=user_id,
+        job_class=(payload or {}).get("job_class", "interactive"),
+        payload=payload or {},
+        status="queued",
+        available_at=datetime.utcnow()
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def enqueue_or_follow(db: Session, investigation: Investigation, repo_key: str, payload: Dict = None) -> Optional[str]:
+    """Single-flight enqueue.
+    
+    If a job for the same repo_key is already queued or running, the
+    investigation becomes a follower of that job's investigation and no new
+    job is created. Returns the leader's investigation id, or None if this
+    investigation leads. A transaction-scoped advisory lock on the key
+    makes the check-then-insert atomic across API processes.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": repo_key})
+    
+    leader_job = db.query(InvestigationJob).filter(
+        InvestigationJob.repo_key == repo_key,
+        InvestigationJob.status.in_(["queued", "running"])
+    ).order_by(InvestigationJob.id.asc()).first()
+    
+    if leader_job:
+        investigation.leader_id = leader_job.investigation_id
+        db.commit()
+        return str(leader_job.investigation_id)
+    
+    enqueue(db, investigation.id, investigation.repo_url, payload, repo_key=repo_key,
+            batch_id=investigation.batch_id, user_id=investigation.user_id)
+    return None
+
+
+def promote_follower(db: Session, leader: Investigation) -> Optional[Investigation]:
+    """Hand an in-flight leader's job to its oldest follower (used before deleting the leader).
+    
+    A leader that already finished has nothing to hand over - its followers
+    hold copies of the outcome - so they are just detached.
+    """
+    job = db.query(InvestigationJob).filter(
+        InvestigationJob.investigation_id == leader.id,
+        InvestigationJob.status.in_(["queued", "running"])
+    ).first()
+    if not job:
+        db.query(Investigation).filter(Investigation.leader_id == leader.id).update(
+            {"leader_id": None}, synchronize_session=False
+        )
+        db.commit()
+        return None
+    
+    followers = db.query(Investigation).filter(
+        Investigation.leader_id == leader.id
+    ).order_by(Investigation.created_at.asc()).all()
+    if not followers:
+        return None
+    
+    new_leader = followers[0]
+    new_leader.leader_id = None
+    for follower in followers[1:]:
+        follower.leader_id = new_leader.id
+    
+    # A queued job can simply change owner; a running one is bound to the
+    # leader's id inside its worker, so the new leader gets a fresh job
+    if job.status == "queued":
+        job.investigation_id = new_leader.id
+        db.commit()
+    else:
+        db.commit()
+        enqueue(db, new_leader.id, new_leader.repo_url, job.payload, repo_key=job.repo_key,
+                batch_id=new_leader.batch_id, user_id=new_leader.user_id)
+    return new_leader
+
+
+def propagate_to_followers(db: Session, leader_id: str):
+    """Copy a finished leader's outcome to every investigation following it"""
+    leader = db.query(Investigation).filter(Investigation.id == leader_id).first()
+    if not leader:
+        return
+    
+    batch_ids = {leader.batch_id} | {
+        batch_id for (batch_id,) in
+        db.query(Investigation.batch_id).filter(Investigation.leader_id == leader.id).distinct().all()
+    }
+    db.query(Investigation).filter(Investigation.leader_id == leader.id).update({
+        "status": leader.status,
+        "findings": leader.findings,
+        "report": leader.report,
+        "confidence": leader.confidence,
+        "completed_at": leader.completed_at
+    }, synchronize_session=False)
+    db.commit()
+    close_finished_batches(db, batch_ids)
+
+
+def close_finished_batches(db: Session, batch_ids):
+    """Stamp completed_at on batches whose children have all finished (idempotent).
+    
+    Called wherever a child reaches a final status, so reading a batch
+    never has to write it.
+    """
+    batch_ids = {batch_id for batch_id in batch_ids if batch_id}
+    if not batch_ids:
+        return
+    
+    finished = db.query(func.count(Investigation.id)).filter(
+        Investigation.batch_id == InvestigationBatch.id,
+        Investigation.status.in_(FINISHED_STATUSES)
+    ).correlate(InvestigationBatch).scalar_subquery()
+    db.query(InvestigationBatch).filter(
+        InvestigationBatch.id.in_(batch_ids),
+        InvestigationBatch.completed_at.is_(None),
+        finished >= InvestigationBatch.total
+    ).update({"completed_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+
+def claim(db: Session, worker_id: str) -> Optional[InvestigationJob]:
+    """Atomically claim the next runnable job.
+    
+    Queued jobs become claimable at available_at; running jobs whose
+    visibility timeout lapsed (their worker died) are reclaimed while they
+    have attempts left (see reap_exhausted for the rest). SKIP LOCKED
+    lets many workers poll the same table without blocking each other.
+    Batch children are skipped while their batch already has
+    max_concurrency jobs running (a soft cap: two workers claiming at the
+    same instant can overshoot it by one).
+    
+    Ordering is fair-share: interactive jobs before batch jobs, then the
+    user with the fewest jobs currently running, then oldest first - so
+    one user's 200-repo scan interleaves with everyone else's work
+    instead of running ahead of it.
+    """
+    now = datetime.utcnow()
+    
+    user_jobs = aliased(InvestigationJob)
+    user_running = db.query(func.count(user_jobs.id)).filter(
+        user_jobs.user_id == InvestigationJob.user_id,
+        user_jobs.status == "running",
+        user_jobs.locked_until >= now
+    ).correlate(InvestigationJob).scalar_subquery()
+    class_rank = case(JOB_CLASS_RANK, value=InvestigationJob.job_class, else_=len(JOB_CLASS_RANK))
+    
+    running = aliased(InvestigationJob)
+    batch_running = db.query(func.count(running.id)).filter(
+        running.batch_id == InvestigationJob.batch_id,
+        running.status == "running",
+        running.locked_until >= now
+    ).correlate(InvestigationJob).scalar_subquery()
+    batch_limit = db.query(InvestigationBatch.max_concurrency).filter(
+        InvestigationBatch.id == InvestigationJob.batch_id
+    ).correlate(InvestigationJob).scalar_subquery()
+    
+    job = db.query(InvestigationJob).filter(
+        or_(
+            (InvestigationJob.status == "queued") & (InvestigationJob.available_at <= now),
+            (InvestigationJob.status == "running") & (InvestigationJob.locked_until < now)
+            & (InvestigationJob.attempts < settings.JOB_MAX_ATTEMPTS)
+        ),
+        or_(InvestigationJob.batch_id.is_(None), batch_running < batch_limit)
+    ).order_by(
+        class_rank,
+        user_running,
+        InvestigationJob.id.asc()
+    ).with_for_update(skip_locked=True).limit(1).first()
+    
+    if not job:
+        db.commit()
+        return None
+    
+    job.status = "running"
+    job.attempts = (job.attempts or 0) + 1
+    job.locked_by = worker_id
+    job.locked_until = now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS)
+    job.started_at = now
+    db.commit()
+    return job
+
+
+def reap_exhausted(db: Session) -> List[str]:
+    """Fail expired running jobs that were on their last attempt; returns their investigation ids.
+    
+    claim() will not reclaim these, so a job that keeps killing its worker
+    ends up failed instead of being retried forever.
+    """
+    now = datetime.utcnow()
+    jobs = db.query(InvestigationJob).filter(
+        InvestigationJob.status == "running",
+        InvestigationJob.locked_until < now,
+        InvestigationJob.attempts >= settings.JOB_MAX_ATTEMPTS
+    ).with_for_update(skip_locked=True).all()
+    
+    for job in jobs:
+        job.status = "failed"
+        job.last_error = WORKER_LOST_ERROR
+        job.locked_by = None
+        job.locked_until = None
+        job.finished_at = now
+    db.commit()
+    
+    if jobs:
+        metrics.incr("job_queue.reaped", len(jobs))
+    return [str(job.investigation_id) for job in jobs]
+
+
+def admission_retry_after(db: Session, user_id: str, job_class: str = "interactive", count: int = 1) -> Optional[int]:
+    """Admission control: seconds to wait if `count` more jobs would overflow the user's queue, else None"""
+    limit = settings.USER_MAX_QUEUED_BATCH if job_class == "batch" else settings.USER_MAX_QUEUED_INTERACTIVE
+    queued = db.query(func.count(InvestigationJob.id)).filter(
+        InvestigationJob.user_id == user_id,
+        InvestigationJob.job_class == job_class,
+        InvestigationJob.status == "queued"
+    ).scalar()
+    
+    if queued + count <= limit:
+        return None
+    metrics.incr(f"job_queue.rejected.{job_class}")
+    return settings.ADMISSION_RETRY_AFTER_SECONDS
+
+
+def stats(db: Session) -> Dict:
+    """Queue depth, running jobs and wait times per class.
+    
+    Read from the table rather than in-process metrics so the API reports
+    what every worker process is doing. Wait percentiles cover jobs
+    started in the last hour.
+    """
+    now = datetime.utcnow()
+    wait_seconds = func.extract("epoch", InvestigationJob.started_at - InvestigationJob.created_at)
+    result = {}
+    
+    for job_class in JOB_CLASS_RANK:
+        wait_p50, wait_p95 = db.query(
+            func.percentile_cont(0.5).within_group(wait_seconds),
+            func.percentile_cont(0.95).within_group(wait_seconds)
+        ).filter(
+            InvestigationJob.job_class == job_class,
+            InvestigationJob.started_at >= now - timedelta(hours=1)
+        ).one()
+
+        queued = db.query(InvestigationJob).filter(
+            InvestigationJob.job_class == job_class,
+            InvestigationJob.status == "queued"
+        )
+        oldest = queued.with_entities(func.min(InvestigationJob.created_at)).scalar()
+        result[job_class] = {
+            "queued": queued.count(),
+            "running": db.query(InvestigationJob).filter(
+                InvestigationJob.job_class == job_class,
+                InvestigationJob.status == "running"
+            ).count(),
+            "users_waiting": queued.with_entities(func.count(func.distinct(InvestigationJob.user_id))).scalar(),
+            "oldest_wait_seconds": round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+            "wait_p50_seconds": round(float(wait_p50 or 0), 2),
+            "wait_p95_seconds": round(float(wait_p95 or 0), 2),
+            "rejected": metrics.counter(f"job_queue.rejected.{job_class}")
+        }
+    
+    return result
+
+
+def heartbeat(db: Session, job_id: int, worker_id: str) -> bool:
+    """Extend the visibility timeout; False if the job is no longer ours"""
+    updated = db.query(InvestigationJob).filter(
+        InvestigationJob.id == job_id,
+        InvestigationJob.locked_by == worker_id,
+        InvestigationJob.status == "running"
+    ).update({
+        "locked_until": datetime.utcnow() + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS)
+    })
+    db.commit()
+    return updated > 0
+
+
+def complete(db: Session, job_id: int):
+    """Mark a job done"""
+    db.query(InvestigationJob).filter(
+        InvestigationJob.id == job_id,
+        InvestigationJob.status != "cancelled"
+    ).update({
+        "status": "done",
+        "locked_by": None,
+        "locked_until": None,
+        "finished_at": datetime.utcnow()
+    })
+    db.commit()
+
+
+def cancel(db: Session, investigation_id: str) -> bool:
+    """Cancel an investigation's queued or running jobs; running workers notice via is_cancelled.
+    
+    Returns True if a worker was running one. That worker still owns the
+    investigation's event sequence and records the cancellation itself.
+    """
+    jobs = db.query(InvestigationJob).filter(
+        InvestigationJob.investigation_id == investigation_id,
+        InvestigationJob.status.in_(["queued", "running"])
+    ).with_for_update().all()
+    
+    running = any(job.status == "running" for job in jobs)
+    for job in jobs:
+        job.status = "cancelled"
+        job.locked_by = None
+        job.locked_until = None
+        job.finished_at = datetime.utcnow()
+    db.commit()
+    return running
+
+
+def is_cancelled(db: Session, job_id: int) -> bool:
+    """True if the job was cancelled (or deleted along with its investigation)"""
+    job = db.query(InvestigationJob.status).filter(InvestigationJob.id == job_id).first()
+    return job is None or job.status == "cancelled"
+
+
+def fail(db: Session, job_id: int, error: str) -> bool:
+    """Record a failure; requeues with backoff while attempts remain. Returns True if requeued."""
+    job = db.query(InvestigationJob).filter(InvestigationJob.id == job_id).first()
+    if not job or job.status == "cancelled":
+        return False
+    
+    job.last_error = error
+    job.locked_by = None
+    job.locked_until = None
+    
+    if (job.attempts or 0) < settings.JOB_MAX_ATTEMPTS:
+        job.status = "queued"
+        job.available_at = datetime.utcnow() + timedelta(
+            seconds=settings.JOB_RETRY_BACKOFF_SECONDS * job.attempts
+        )
+        requeued = True
+    else:
+        job.status = "failed"
+        job.finished_at = datetime.utcnow()
+        requeued = False
+    
+    db.commit()
+    return requeued
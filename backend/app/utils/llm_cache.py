@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+
+def make_cache_key(model: str, messages: List[Dict], **params) -> str:
+    """Content-addressed key: sha256 over model, sampling params and messages"""
+    payload = json.dumps(
+        {"model": model, "params": params, "messages": messages},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DatabaseCacheBackend:
+    """Stores cached completions in the llm_cache table"""
+    
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+    
+    def get(self, key: str) -> Optional[Dict]:
+        from app.database import SessionLocal
+        from app.models import LLMCacheEntry
+        
+        db = SessionLocal()
+        try:
+            entry = db.query(LLMCacheEntry).filter(LLMCacheEntry.cache_key == key).first()
+            if not entry:
+                return None
+            
+            # Expired entries are treated as misses and removed
+            if entry.created_at < datetime.utcnow() - timedelta(seconds=self.ttl_seconds):
+                db.delete(entry)
+                db.commit()
+                return None
+            
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_hit_at = datetime.utcnow()
+            db.commit()
+            return entry.response
+        finally:
+            db.close()
+    
+    def set(self, key: str, model: str, response: Dict):
+        from app.database import SessionLocal
+        from app.models import LLMCacheEntry
+        
+        db = SessionLocal()
+        try:
+            db.merge(LLMCacheEntry(
+                cache_key=key,
+                model=model,
+                response=response,
+                hits=0,
+                created_at=datetime.utcnow()
+            ))
+            db.commit()
+            self.evict(db)
+        finally:
+            db.close()
+    
+    def evict(self, db):
+        """Drop expired entries, then the oldest ones beyond max_entries"""
+        from app.models import LLMCacheEntry
+        
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        db.query(LLMCacheEntry).filter(LLMCacheEntry.created_at < cutoff).delete(synchronize_session=False)
+        
+        overflow = db.query(LLMCacheEntry).count() - self.max_entries
+        if overflow > 0:
+            oldest = db.query(LLMCacheEntry.cache_key).order_by(
+                LLMCacheEntry.created_at.asc()
+            ).limit(overflow).all()
+            db.query(LLMCacheEntry).filter(
+                LLMCacheEntry.cache_key.in_([key for (key,) in oldest])
+            ).delete(synchronize_session=False)
+            metrics.incr("llm_cache.evictions", overflow)
+        
+        db.commit()
+
+
+class DiskCacheBackend:
+    """Stores cached completions as JSON files in a local directory"""
+    
+    def __init__(self, cache_dir: str, ttl_seconds: int, max_entries: int):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        
+        if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+            os.remove(path)
+            return None
+        
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["response"]
+    
+    def set(self, key: str, model: str, response: Dict):
+        # Write to a temp file first so concurrent readers never see partial JSON
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": model, "response": response}, f)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+    
+    def evict(self):
+        """Drop expired files, then the oldest ones beyond max_entries"""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                mtime = os.path.getmtime(path)
+                if now - mtime > self.ttl_seconds:
+                    os.remove(path)
+                else:
+                    entries.append((mtime, path))
+            except FileNotFoundError:
+                continue
+        
+        overflow = len(entries) - self.max_entries
+        if overflow > 0:
+            for _, path in sorted(entries)[:overflow]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            metrics.incr("llm_cache.evictions", overflow)
+
+
+class LLMCache:
+    """Content-addressed cache for chat completion responses"""
+    
+    def __init__(self):
+        self.backend = self._build_backend()
+    
+    def _build_backend(self):
+        backend = settings.LLM_CACHE_BACKEND.lower()
+        if backend == "database":
+            return DatabaseCacheBackend(settings.LLM_CACHE_TTL_SECONDS, settings.LLM_CACHE_MAX_ENTRIES)
+        if backend == "disk":
+            return DiskCacheBackend(
+                settings.LLM_CACHE_DIR,
+                settings.LLM_CACHE_TTL_SECONDS,
+                settings.LLM_CACHE_MAX_ENTRIES
+            )
+        return None
+    
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Look up a cached response, counting hits and misses"""
+        if not self.enabled:
+            return None
+        
+        try:
+            response = self.backend.get(key)
+        except Exception as e:
+            # Cache failures must never break an investigation
+            print(f"LLM cache read error: {e}")
+            metrics.incr("llm_cache.errors")
+            response = None
+        
+        metrics.incr("llm_cache.hits" if response is not None else "llm_cache.misses")
+        return response
+    
+    def set(self, key: str, model: str, response: Dict):
+        """Store a response"""
+        if not self.enabled:
+            return
+        
+        try:
+            self.backend.set(key, model, response)
+        except Exception as e:
+            print(f"LLM cache write error: {e}")
+            metrics.incr("llm_cache.errors")
+    
+    def stats(self) -> Dict:
+        """Hit-rate metrics"""
+        return {
+            "backend": settings.LLM_CACHE_BACKEND if self.enabled else "none",
+            "hits": metrics.counter("llm_cache.hits"),
+            "misses": metrics.counter("llm_cache.misses"),
+            "bypassed": metrics.counter("llm_cache.bypassed"),
+            "evictions": metrics.counter("llm_cache.evictions"),
+            "errors": metrics.counter("llm_cache.errors"),
+            "hit_rate": metrics.ratio("llm_cache.hits", ["llm_cache.hits", "llm_cache.misses"])
+        }
+
+
+# Process-wide cache instance
+llm_cache = LLMCache()
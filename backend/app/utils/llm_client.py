@@ -0,0 +1,356 @@
+import asyncio
+import concurrent.futures
+import queue
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from groq import AsyncGroq, APIError, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from app.config import settings
+from app.utils.cancellation import CancellationToken
+from app.utils.llm_cache import llm_cache, make_cache_key
+from app.utils.llm_scheduler import LLMScheduler, estimate_tokens
+from app.utils.metrics import metrics
+from app.utils.model_router import model_router
+from app.utils.resource_governor import resource_governor
+
+# Errors worth retrying: throttling, transient network failures and 5xx
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError, asyncio.TimeoutError)
+
+# Everything a completion can fail with once retries are exhausted
+LLM_ERRORS = (APIError, asyncio.TimeoutError)
+
+_STREAM_DONE = object()
+_CANCEL_POLL_SECONDS = 0.5
+
+
+def _usage_dict(usage) -> Dict:
+    """Normalize a completion usage object"""
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0
+    }
+
+
+class LLMClient:
+    """Process-wide async LLM client.
+    
+    One AsyncGroq client shares an HTTP/2 connection pool across every
+    investigation in the process. It runs on a dedicated event loop thread
+    so the synchronous agents can submit calls without each holding their
+    own connections. Calls are bounded by a concurrency limit, a per-call
+    timeout and retries with jittered exponential backoff.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[AsyncGroq] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.scheduler: Optional[LLMScheduler] = None
+    
+    def _ensure_started(self):
+        """Start the background event loop and HTTP client on first use"""
+        with self._lock:
+            if self._loop is not None:
+                return
+            
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True)
+            thread.start()
+            
+            async def build():
+                http_client = httpx.AsyncClient(
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=settings.LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+                    ),
+                    timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=10.0)
+                )
+                self._client = AsyncGroq(
+                    api_key=settings.GROQ_API_KEY,
+                    http_client=http_client,
+                    max_retries=0  # Retries are handled here with jittered backoff
+                )
+                self._semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+                self.scheduler = LLMScheduler()
+            
+            asyncio.run_coroutine_threadsafe(build(), loop).result()
+            self._loop = loop
+    
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when present"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after) + random.uniform(0, 1)
+            except ValueError:
+                pass
+        
+        cap = min(settings.LLM_BACKOFF_MAX_SECONDS, settings.LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+        return random.uniform(0, cap)
+    
+    async def _create(self, messages: List[Dict], model: str, on_delta: Optional[Callable], **params) -> Dict:
+        """Single completion request (streamed when on_delta is given)"""
+        if not on_delta:
+            chat_completion = await self._client.chat.completions.create(
+                messages=messages,
+                model=model,
+                **params
+            )
+            return {
+                "content": chat_completion.choices[0].message.content,
+                "usage": _usage_dict(getattr(chat_completion, "usage", None))
+            }
+        
+        stream = await self._client.chat.completions.create(
+            messages=messages,
+            model=model,
+            stream=True,
+            **params
+        )
+        
+        parts = []
+        usage = None
+        async for chunk in stream:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    on_delta(delta)
+            # Groq reports token usage on the final chunk
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None):
+                usage = x_groq.usage
+        
+        return {"content": "".join(parts), "usage": _usage_dict(usage)}
+    
+    async def acomplete(
+        self,
+        messages: List[Dict],
+        model: str,
+        timeout: Optional[float] = None,
+        on_delta: Optional[Callable] = None,
+        agent: str = "default",
+        job_class: str = "interactive",
+        on_dispatch: Optional[Callable] = None,
+        **params
+    ) -> Dict:
+        """Run a completion on the client loop with quota scheduling, concurrency limit, timeout and retries.
+        
+        on_dispatch is called each time the request is actually sent, after
+        any wait for quota or a concurrency slot.
+        """
+        timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+        estimated = estimate_tokens(messages, params.get("max_tokens", 0))
+        streamed = {"any": False}
+        queue_wait = 0.0
+        
+        def track_delta(delta: str):
+            streamed["any"] = True
+            on_delta(delta)
+        
+        attempt = 0
+        while True:
+            # Wait for TPM/RPM quota in priority order before taking a slot
+            queue_wait += await self.scheduler.acquire(estimated, agent=agent, job_class=job_class)
+            
+            try:
+                await self._semaphore.acquire()
+            except asyncio.CancelledError:
+                # Abandoned before it was sent (e.g. a hedge that lost while waiting for a slot)
+                self.scheduler.release(estimated)
+                raise
+            
+            try:
+                started = time.monotonic()
+                if on_dispatch:
+                    on_dispatch()
+                response = await asyncio.wait_for(
+                    self._create(messages, model, track_delta if on_delta else None, **params),
+                    timeout=timeout
+                )
+                metrics.observe(f"llm.latency.{model}", time.monotonic() - started)
+                usage = response["usage"]
+                self.scheduler.settle(estimated, usage["prompt_tokens"] + usage["completion_tokens"])
+                return {**response, "queue_wait_seconds": round(queue_wait, 3)}
+            except asyncio.CancelledError:
+                # Abandoned in flight (hedge loser or cancelled run): the prompt was
+                # sent, but the reserved completion tokens were never generated
+                self.scheduler.settle(estimated, estimate_tokens(messages))
+                raise
+            except RETRYABLE_ERRORS as e:
+                metrics.incr("llm.errors")
+                self._refund(estimated, messages, e)
+                # A stream that already produced output cannot be replayed cleanly
+                if attempt >= settings.LLM_MAX_RETRIES or streamed["any"]:
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                if isinstance(e, RateLimitError):
+                    self.scheduler.throttle(delay)
+            except Exception as e:
+                self._refund(estimated, messages, e)
+                raise
+            finally:
+                self._semaphore.release()
+            
+            attempt += 1
+            metrics.incr("llm.retries")
+            await asyncio.sleep(delay)
+    
+    def _refund(self, estimated: int, messages: List[Dict], error: Exception):
+        """Settle a failed attempt's quota reservation before it is retried or raised.
+        
+        Requests rejected for rate limiting or that never connected give
+        everything back; otherwise the prompt counts as sent.
+        """
+        unsent = isinstance(error, RateLimitError) or (
+            isinstance(error, APIConnectionError) and not isinstance(error, APITimeoutError)
+        )
+        if unsent:
+            self.scheduler.release(estimated)
+        else:
+            self.scheduler.settle(estimated, estimate_tokens(messages))
+    
+    async def acomplete_hedged(self, messages: List[Dict], model: str, hedge_after: float, **kwargs) -> Dict:
+        """Send a second identical request if the first is slower than hedge_after; first answer wins"""
+        dispatched = asyncio.Event()
+        first = asyncio.ensure_future(self.acomplete(messages, model, on_dispatch=dispatched.set, **kwargs))
+        tasks = {first}
+        
+        try:
+            # The hedge clock starts once the request is sent, not while it queues for quota
+            sent = asyncio.ensure_future(dispatched.wait())
+            tasks.add(sent)
+            await asyncio.wait({first, sent}, return_when=asyncio.FIRST_COMPLETED)
+            
+            done, _ = await asyncio.wait({first}, timeout=hedge_after)
+            if done:
+                return first.result()
+            
+            metrics.incr("llm.hedges")
+            second = asyncio.ensure_future(self.acomplete(messages, model, **kwargs))
+            tasks.add(second)
+            pending = {first, second}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            metrics.incr("llm.hedges.won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The loser (or both, if we were cancelled) settles its quota reservation as it unwinds
+            for task in tasks:
+                task.cancel()
+    
+    def stats(self) -> Dict:
+        """Scheduler queue and quota state"""
+        return self.scheduler.stats() if self.scheduler else {}
+    
+    def _check_cancelled(self, future, cancel_token: CancellationToken):
+        """Cancel the in-flight request and raise if the token says stop"""
+        try:
+            cancel_token.check()
+        except BaseException:
+            future.cancel()
+            raise
+    
+    def _wait(self, future, cancel_token: Optional[CancellationToken]):
+        """Block on a loop future, polling the cancel token if there is one"""
+        if cancel_token is None:
+            return future.result()
+        while True:
+            try:
+                return future.result(timeout=_CANCEL_POLL_SECONDS)
+            except concurrent.futures.TimeoutError:
+                self._check_cancelled(future, cancel_token)
+    
+    def complete(
+        self,
+        messages: List[Dict],
+        model: str,
+        cacheable: bool = True,
+        on_chunk: Optional[Callable] = None,
+        timeout: Optional[float] = None,
+        agent: str = "default",
+        job_class: str = "interactive",
+        hedge: bool = False,
+        cancel_token: Optional[CancellationToken] = None,
+        **params
+    ) -> Dict:
+        """Blocking entry point for the agents.
+        
+        Returns a dict with the completion text, token usage, time spent
+        waiting for quota and whether it was served from the response cache.
+        on_chunk receives streamed content deltas on the calling thread;
+        agent and job_class set the request's scheduling priority. With
+        hedge=True a non-streamed call is duplicated once it exceeds the
+        model's tail latency. A cancel_token aborts the wait (and the
+        in-flight request) on cancellation or when its stage deadline passes.
+        """
+        key = make_cache_key(model, messages, **params)
+        
+        if cacheable:
+            cached = llm_cache.get(key)
+            if cached is not None:
+                if on_chunk:
+                    on_chunk(cached["content"])
+                return {**cached, "cached": True, "queue_wait_seconds": 0.0}
+        else:
+            metrics.incr("llm_cache.bypassed")
+        
+        # One process-wide slot per uncached call, on top of the quota scheduler
+        with resource_governor.slot("llm", cancel_token):
+            self._ensure_started()
+            
+            if on_chunk:
+                # Deltas are handed back through a queue so the callback runs on
+                # this thread and never blocks the shared event loop
+                deltas = queue.Queue()
+                future = asyncio.run_coroutine_threadsafe(
+                    self.acomplete(
+                        messages, model, timeout=timeout, on_delta=deltas.put_nowait,
+                        agent=agent, job_class=job_class, **params
+                    ),
+                    self._loop
+                )
+                future.add_done_callback(lambda _: deltas.put_nowait(_STREAM_DONE))
+                
+                while True:
+                    try:
+                        delta = deltas.get(timeout=_CANCEL_POLL_SECONDS if cancel_token else None)
+                    except queue.Empty:
+                        self._check_cancelled(future, cancel_token)
+                        continue
+                    if delta is _STREAM_DONE:
+                        break
+                    on_chunk(delta)
+                response = future.result()
+            else:
+                hedge_after = model_router.hedge_delay(model) if hedge else None
+                if hedge_after:
+                    call = self.acomplete_hedged(
+                        messages, model, hedge_after, timeout=timeout, agent=agent, job_class=job_class, **params
+                    )
+                else:
+                    call = self.acomplete(messages, model, timeout=timeout, agent=agent, job_class=job_class, **params)
+                future = asyncio.run_coroutine_threadsafe(call, self._loop)
+                response = self._wait(future, cancel_token)
+        
+        if cacheable:
+            llm_cache.set(key, model, {"content": response["content"], "usage": response["usage"]})
+        
+        return {**response, "cached": False}
+
+
+# Process-wide client shared by all agents
+llm_client = LLMClient()
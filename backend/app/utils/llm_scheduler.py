@@ -0,0 +1,155 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+# Lower rank is served first: interactive work ahead of batch work, and
+# within a class the analyst (which gates the pipeline) ahead of the narrator,
+# then source summarization
+JOB_CLASS_RANK = {"interactive": 0, "batch": 1}
+AGENT_RANK = {"analyst": 0, "narrator": 1, "summarizer": 2}
+
+
+def estimate_tokens(messages: List[Dict], max_tokens: int = 0) -> int:
+    """Rough token estimate for quota accounting (~4 characters per token)"""
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    prompt_tokens = prompt_chars // 4 + 4 * len(messages)
+    return prompt_tokens + (max_tokens or 0)
+
+
+def request_priority(agent: str, job_class: str) -> int:
+    """Combine job class and agent into a single priority rank"""
+    class_rank = JOB_CLASS_RANK.get(job_class, len(JOB_CLASS_RANK))
+    agent_rank = AGENT_RANK.get(agent, len(AGENT_RANK))
+    return class_rank * (len(AGENT_RANK) + 1) + agent_rank
+
+
+class TokenBucket:
+    """Continuously refilling bucket sized to a per-minute quota"""
+    
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+    
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (requests larger than capacity wait for a full bucket)"""
+        self.refill()
+        needed = min(amount, self.capacity) - self.tokens
+        return max(0.0, needed / self.rate) if self.rate > 0 else 0.0
+    
+    def take(self, amount: float):
+        self.refill()
+        self.tokens -= amount
+    
+    def give(self, amount: float):
+        self.refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMScheduler:
+    """Priority queue in front of the LLM provider enforcing TPM/RPM quotas.
+    
+    Runs on the LLM client's event loop. Requests are admitted strictly in
+    priority order (FIFO within a priority) once both the token and the
+    request bucket can cover them, so concurrent investigations share the
+    quota instead of all tripping 429s at once. Quotas are per process;
+    divide the account limits between worker processes.
+    """
+    
+    def __init__(self):
+        self.tokens = TokenBucket(settings.LLM_TPM_LIMIT)
+        self.requests = TokenBucket(settings.LLM_RPM_LIMIT)
+        self._queue = []
+        self._sequence = itertools.count()
+        self._wakeup = None
+    
+    async def acquire(self, estimated_tokens: int, agent: str = "default", job_class: str = "interactive") -> float:
+        """Wait for quota; returns the time spent queued in seconds"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        priority = request_priority(agent, job_class)
+        enqueued = time.monotonic()
+        
+        heapq.heappush(self._queue, (priority, next(self._sequence), estimated_tokens, future))
+        self._dispatch()
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The request was abandoned while queued; drop it from the heap
+            self._queue = [item for item in self._queue if item[3] is not future]
+            heapq.heapify(self._queue)
+            self._dispatch()
+            raise
+        
+        waited = time.monotonic() - enqueued
+        metrics.observe(f"llm_scheduler.wait.{job_class}.{agent}", waited)
+        return waited
+    
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once real usage is known"""
+        if actual_tokens <= 0:
+            return
+        difference = estimated_tokens - actual_tokens
+        if difference > 0:
+            self.tokens.give(difference)
+        else:
+            self.tokens.take(-difference)
+        self._dispatch()
+    
+    def release(self, estimated_tokens: int):
+        """Return the quota of an admitted request that was abandoned before it was sent"""
+        self.tokens.give(estimated_tokens)
+        self.requests.give(1)
+        self._dispatch()
+    
+    def throttle(self, seconds: float):
+        """Provider reported a rate limit: drain the buckets so everyone backs off"""
+        self.tokens.tokens = -self.tokens.rate * seconds
+        self.requests.tokens = min(self.requests.tokens, 0.0)
+        metrics.incr("llm_scheduler.throttled")
+    
+    def _dispatch(self):
+        """Admit queued requests from the head while quota allows"""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        
+        while self._queue:
+            _, _, estimated, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            
+            wait = max(self.tokens.wait_time(estimated), self.requests.wait_time(1))
+            if wait > 0:
+                # Head of line must wait; retry once the buckets have refilled
+                self._wakeup = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            
+            heapq.heappop(self._queue)
+            self.tokens.take(estimated)
+            self.requests.take(1)
+            future.set_result(True)
+    
+    def stats(self) -> Dict:
+        """Queue depth and remaining quota (as of the last refill)"""
+        return {
+            "queue_depth": len(self._queue),
+            "tpm_limit": self.tokens.capacity,
+            "rpm_limit": self.requests.capacity,
+            "tokens_available": round(self.tokens.tokens),
+            "requests_available": round(self.requests.tokens, 1),
+            "throttled": metrics.counter("llm_scheduler.throttled")
+        }
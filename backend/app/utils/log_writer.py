@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import AgentLog, Investigation
+from app.utils.metrics import metrics
+
+
+class AgentLogWriter:
+    """Buffered, bulk-inserting writer for agent progress logs.
+    
+    append() only queues the row (timestamped at call time, so ordering is
+    preserved) and returns; a background thread inserts batches once
+    AGENT_LOG_BATCH_SIZE rows are waiting or AGENT_LOG_FLUSH_INTERVAL_SECONDS
+    has passed. flush() forces a write at stage boundaries and completion.
+    """
+    
+    def __init__(self):
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._enqueued = 0  # Rows ever appended
+        self._written = 0  # Rows ever handled (inserted or dropped)
+        self._flush_requested = False
+    
+    def _ensure_started(self):
+        """Start the writer thread on first use"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="agent-log-writer", daemon=True)
+            self._thread.start()
+    
+    def append(self, investigation_id: str, agent_name: str, message: str, data: Dict = None,
+               seq: Optional[int] = None) -> datetime:
+        """Queue one log row; never touches the database. Returns the row's timestamp"""
+        row = {
+            "investigation_id": investigation_id,
+            "agent_name": agent_name,
+            "message": message,
+            "data": data or {},
+            "timestamp": datetime.utcnow(),
+            "seq": seq
+        }
+        with self._cond:
+            self._ensure_started()
+            if len(self._buffer) >= settings.AGENT_LOG_QUEUE_MAX:
+                # Database is far behind - shed the oldest progress messages
+                self._buffer.popleft()
+                self._written += 1
+                metrics.incr("agent_log.dropped")
+            self._buffer.append(row)
+            self._enqueued += 1
+            if len(self._buffer) >= settings.AGENT_LOG_BATCH_SIZE:
+                self._cond.notify_all()
+        return row["timestamp"]
+    
+    def flush(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far; with wait=True block until it is stored.
+        
+        Returns False if the wait timed out.
+        """
+        with self._cond:
+            if self._thread is None:
+                return True
+            target = self._enqueued
+            self._flush_requested = True
+            self._cond.notify_all()
+            if not wait:
+                return True
+            timeout = settings.AGENT_LOG_FLUSH_TIMEOUT_SECONDS if timeout is None else timeout
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + settings.AGENT_LOG_FLUSH_INTERVAL_SECONDS
+                while (
+                    len(self._buffer) < settings.AGENT_LOG_BATCH_SIZE
+                    and not self._flush_requested
+                    and time.monotonic() < deadline
+                ):
+                    self._cond.wait(max(0.0, deadline - time.monotonic()))
+                self._flush_requested = False
+                batch = list(self._buffer)
+                self._buffer.clear()
+            
+            if batch:
+                self._write(batch)
+            
+            with self._cond:
+                self._written += len(batch)
+                self._cond.notify_all()
+    
+    def _write(self, batch):
+        """Bulk insert one batch, retrying briefly before giving up on it"""
+        from app.database import SessionLocal
+        
+        started = time.monotonic()
+        for attempt in range(3):
+            db = SessionLocal()
+            try:
+                # A row whose seq is already taken is skipped rather than failing the batch
+                db.execute(insert(AgentLog).on_conflict_do_nothing(), batch)
+                db.commit()
+                metrics.observe("agent_log.batch_rows", len(batch))
+                metrics.observe("agent_log.flush_seconds", time.monotonic() - started)
+                return
+            except IntegrityError:
+                # An investigation was deleted mid-run; keep the other rows
+                db.rollback()
+                live = {row["investigation_id"] for row in batch}
+                live = {
+                    str(inv_id) for (inv_id,) in
+                    db.query(Investigation.id).filter(Investigation.id.in_(live)).all()
+                }
+                kept = [row for row in batch if str(row["investigation_id"]) in live]
+                metrics.incr("agent_log.orphaned", len(batch) - len(kept))
+                batch = kept
+                if not batch:
+                    return
+            except Exception as e:
+                db.rollback()
+                print(f"[ERROR] Agent log write failed (attempt {attempt + 1}): {e}")
+                time.sleep(0.5 * (attempt + 1))
+            finally:
+                db.close()
+        
+        metrics.incr("agent_log.dropped", len(batch))
+    
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "queued": len(self._buffer),
+                "written": self._written,
+                "dropped": metrics.counter("agent_log.dropped"),
+                "batch_rows_p50": metrics.percentile("agent_log.batch_rows", 50),
+                "flush_p95_seconds": round(metrics.percentile("agent_log.flush_seconds", 95), 4)
+            }
+
+
+def last_seq(db: Session, investigation_id) -> int:
+    """Highest event sequence number stored for an investigation (0 if none)"""
+    return db.query(func.max(AgentLog.seq)).filter(AgentLog.investigation_id == investigation_id).scalar() or 0
+
+
+# Process-wide writer shared by all investigations
+log_writer = AgentLogWriter()
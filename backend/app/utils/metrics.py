@@ -0,0 +1,77 @@
+import threading
+from collections import defaultdict, deque
+from typing import Dict, List
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Metrics:
+    """Thread-safe in-process counters and timing samples"""
+    
+    def __init__(self, max_samples: int = 500):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._timings = defaultdict(lambda: deque(maxlen=max_samples))
+    
+    def incr(self, name: str, amount: int = 1):
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] += amount
+    
+    def observe(self, name: str, value: float):
+        """Record a timing/size sample"""
+        with self._lock:
+            self._timings[name].append(value)
+    
+    def counter(self, name: str) -> int:
+        """Read a counter"""
+        with self._lock:
+            return self._counters.get(name, 0)
+    
+    def sample_count(self, name: str) -> int:
+        """Number of recorded samples for a timing"""
+        with self._lock:
+            return len(self._timings.get(name, []))
+    
+    def ratio(self, numerator: str, denominator_names: list) -> float:
+        """Ratio of one counter to the sum of several (e.g. hit rate)"""
+        with self._lock:
+            total = sum(self._counters.get(n, 0) for n in denominator_names)
+            return round(self._counters.get(numerator, 0) / total, 4) if total else 0.0
+    
+    def percentile(self, name: str, pct: float) -> float:
+        """Percentile of recorded samples (0 if none)"""
+        with self._lock:
+            samples = sorted(self._timings.get(name, []))
+        return _percentile(samples, pct)
+    
+    def snapshot(self) -> Dict:
+        """Return all counters and timing summaries"""
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {name: list(samples) for name, samples in self._timings.items()}
+        
+        summaries = {}
+        for name, samples in timings.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            summaries[name] = {
+                "count": len(ordered),
+                "avg": round(sum(ordered) / len(ordered), 4),
+                "p50": _percentile(ordered, 50),
+                "p95": _percentile(ordered, 95),
+                "max": ordered[-1]
+            }
+        
+        return {"counters": counters, "timings": summaries}
+
+
+# Process-wide metrics registry
+metrics = Metrics()
@@ -0,0 +1,58 @@
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+
+class ModelRouter:
+    """Chooses models from a configurable ladder and tracks their latency.
+    
+    The ladder is ordered from fastest/cheapest to most capable. Latency
+    samples are the ones the LLM client records per model, and their
+    percentile sets the delay after which a hedged request is sent.
+    """
+    
+    def __init__(self, ladder: str = None):
+        ladder = ladder or settings.LLM_MODEL_LADDER
+        self.ladder: List[str] = [m.strip() for m in ladder.split(",") if m.strip()]
+    
+    @property
+    def smallest(self) -> str:
+        return self.ladder[0]
+    
+    @property
+    def largest(self) -> str:
+        return self.ladder[-1]
+    
+    def next_model(self, model: str) -> Optional[str]:
+        """The next model up the ladder, or None at the top"""
+        if model not in self.ladder:
+            return None
+        index = self.ladder.index(model)
+        return self.ladder[index + 1] if index + 1 < len(self.ladder) else None
+    
+    def latency(self, model: str, pct: float) -> float:
+        return metrics.percentile(f"llm.latency.{model}", pct)
+    
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None without enough samples"""
+        if not settings.LLM_HEDGE_ENABLED:
+            return None
+        if metrics.sample_count(f"llm.latency.{model}") < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency(model, settings.LLM_HEDGE_PERCENTILE)
+    
+    def stats(self) -> Dict:
+        """Per-model latency percentiles"""
+        return {
+            model: {
+                "p50": round(self.latency(model, 50), 3),
+                "p95": round(self.latency(model, 95), 3),
+                "p99": round(self.latency(model, 99), 3)
+            }
+            for model in self.ladder
+        }
+
+
+# Process-wide router
+model_router = ModelRouter()
@@ -0,0 +1,53 @@
+import os
+import subprocess
+from typing import Optional
+from urllib.parse import urlparse
+
+
+def normalize_repo_url(repo_url: str) -> str:
+    """Canonical form of a repository URL.
+    
+    https://www.GitHub.com/Uber/pyflame.git/ and github.com/uber/pyflame map
+    to the same key: https scheme, no www, no .git suffix or trailing slash,
+    and GitHub owner/repo lower-cased (GitHub paths are case-insensitive).
+    """
+    url = repo_url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    
+    path = parsed.path.rstrip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    if host == "github.com":
+        path = path.lower()
+    
+    return f"https://{host}{path}"
+
+
+def resolve_head_sha(repo_url: str, timeout: float = 5.0) -> Optional[str]:
+    """HEAD commit of a remote repository via git ls-remote (None if unavailable)"""
+    try:
+        result = subprocess.run(
+            ["git", "ls-remote", repo_url, "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}  # Never block on credential prompts
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+    
+    if result.returncode != 0 or not result.stdout.strip():
+        return None
+    return result.stdout.split()[0]
+
+
+def repo_key(repo_url: str, head_sha: Optional[str] = None) -> str:
+    """Single-flight / result key for a repository snapshot"""
+    normalized = normalize_repo_url(repo_url)
+    return f"{normalized}@{head_sha}" if head_sha else normalized
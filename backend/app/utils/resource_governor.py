@@ -0,0 +1,140 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.config import settings
+from app.utils.cancellation import CancellationToken
+from app.utils.metrics import metrics
+
+# How often blocked acquirers re-check their cancel token
+_POLL_SECONDS = 0.5
+
+
+class ResourcePool:
+    """Counted capacity (slots or bytes) with blocking, cancellable acquisition.
+    
+    Tracks in-use, peak and busy time so utilization can be reported.
+    """
+    
+    def __init__(self, name: str, capacity: int, unit: str = "slots"):
+        self.name = name
+        self.capacity = capacity
+        self.unit = unit
+        self.in_use = 0
+        self.peak = 0
+        self.waiting = 0
+        self.acquisitions = 0
+        self._busy = 0.0  # Integral of in_use over time
+        self._last_change = time.monotonic()
+        self._started = self._last_change
+        self._cond = threading.Condition()
+    
+    def _advance(self):
+        now = time.monotonic()
+        self._busy += self.in_use * (now - self._last_change)
+        self._last_change = now
+    
+    def acquire(self, amount: int = 1, cancel_token: Optional[CancellationToken] = None) -> float:
+        """Block until `amount` is free; returns seconds waited.
+        
+        A request larger than the whole capacity is admitted once the pool
+        is otherwise empty, so oversized work runs alone instead of never.
+        """
+        started = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            try:
+                while self.in_use and self.in_use + amount > self.capacity:
+                    self._cond.wait(_POLL_SECONDS)
+                    if cancel_token:
+                        cancel_token.check()
+            finally:
+                self.waiting -= 1
+            
+            self._advance()
+            self.in_use += amount
+            self.peak = max(self.peak, self.in_use)
+            self.acquisitions += 1
+        
+        waited = time.monotonic() - started
+        metrics.observe(f"resources.{self.name}.wait", waited)
+        return waited
+    
+    def release(self, amount: int = 1):
+        with self._cond:
+            self._advance()
+            self.in_use = max(0, self.in_use - amount)
+            self._cond.notify_all()
+    
+    def resize(self, reserved: int, actual: int):
+        """Swap a reservation for its measured size (may exceed capacity; later acquirers wait)"""
+        with self._cond:
+            self._advance()
+            self.in_use = max(0, self.in_use + actual - reserved)
+            self.peak = max(self.peak, self.in_use)
+            self._cond.notify_all()
+    
+    def stats(self) -> Dict:
+        with self._cond:
+            self._advance()
+            elapsed = max(1e-9, self._last_change - self._started)
+            return {
+                "unit": self.unit,
+                "capacity": self.capacity,
+                "in_use": self.in_use,
+                "peak": self.peak,
+                "waiting": self.waiting,
+                "acquisitions": self.acquisitions,
+                "utilization": round(self._busy / (self.capacity * elapsed), 4) if self.capacity else 0.0,
+                "wait_p95_seconds": round(metrics.percentile(f"resources.{self.name}.wait", 95), 3)
+            }
+
+
+class ResourceGovernor:
+    """Process-wide limits for the pipeline's contended resources.
+    
+    Clones, scrapes and LLM calls take slots; clones also reserve bytes
+    against a temp disk budget. Every investigation in the process draws
+    from the same pools, so a burst of submissions queues here instead of
+    filling the disk or saturating the network.
+    """
+    
+    def __init__(self):
+        self.pools = {
+            "clone": ResourcePool("clone", settings.RESOURCE_CLONE_SLOTS),
+            "disk": ResourcePool("disk", settings.RESOURCE_DISK_BUDGET_MB * 1024 * 1024, unit="bytes"),
+            "scrape": ResourcePool("scrape", settings.RESOURCE_SCRAPE_SLOTS),
+            "llm": ResourcePool("llm", settings.RESOURCE_LLM_SLOTS)
+        }
+    
+    @contextmanager
+    def slot(self, resource: str, cancel_token: Optional[CancellationToken] = None):
+        """Hold one slot of a resource for the duration of the block"""
+        pool = self.pools[resource]
+        pool.acquire(1, cancel_token)
+        try:
+            yield
+        finally:
+            pool.release(1)
+    
+    def reserve_disk(self, num_bytes: int, cancel_token: Optional[CancellationToken] = None) -> int:
+        """Reserve temp disk space before writing; returns the amount reserved"""
+        self.pools["disk"].acquire(num_bytes, cancel_token)
+        return num_bytes
+    
+    def resize_disk(self, reserved: int, actual: int) -> int:
+        """Replace an estimate with the measured size; returns the new reservation"""
+        self.pools["disk"].resize(reserved, actual)
+        return actual
+    
+    def release_disk(self, num_bytes: int):
+        self.pools["disk"].release(num_bytes)
+    
+    def stats(self) -> Dict:
+        """Utilization per resource (for sizing nodes)"""
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+
+# Process-wide governor shared by all investigations
+resource_governor = ResourceGovernor()
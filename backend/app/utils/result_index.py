@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Investigation, InvestigationResult
+from app.utils.metrics import metrics
+
+
+def result_key(repo_key: str) -> str:
+    """Index key for a repo snapshot under the current pipeline version"""
+    return f"{repo_key}#v{settings.PIPELINE_VERSION}"
+
+
+def lookup(db: Session, repo_key: str) -> Optional[InvestigationResult]:
+    """Most recent stored result for this snapshot, if still inside the freshness window"""
+    if not settings.RESULT_REUSE_ENABLED or not repo_key:
+        return None
+    
+    cutoff = datetime.utcnow() - timedelta(hours=settings.RESULT_REUSE_MAX_AGE_HOURS)
+    result = db.query(InvestigationResult).filter(
+        InvestigationResult.result_key == result_key(repo_key),
+        InvestigationResult.created_at >= cutoff
+    ).first()
+    
+    metrics.incr("result_index.hit" if result else "result_index.miss")
+    return result
+
+
+def apply(db: Session, investigation: Investigation, result: InvestigationResult):
+    """Answer an investigation from a stored result"""
+    investigation.findings = result.findings
+    investigation.report = result.report
+    investigation.confidence = result.confidence
+    investigation.status = "completed"
+    investigation.completed_at = datetime.utcnow()
+    result.hits = (result.hits or 0) + 1
+    db.commit()
+
+
+def store(db: Session, repo_key: str, investigation_id: str):
+    """Index a completed investigation's outcome (replaces any older entry for the key)"""
+    if not settings.RESULT_REUSE_ENABLED or not repo_key:
+        return
+    
+    investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+    if not investigation or investigation.status != "completed":
+        return
+    
+    # Runs that fell back to an error analysis or report must not be served to later requests
+    findings = investigation.findings or {}
+    if findings.get("analysis", {}).get("error") or findings.get("report_data", {}).get("error"):
+        metrics.incr("result_index.skipped_error")
+        return
+    
+    key = result_key(repo_key)
+    entry = db.query(InvestigationResult).filter(InvestigationResult.result_key == key).first()
+    if not entry:
+        entry = InvestigationResult(result_key=key)
+        db.add(entry)
+    
+    entry.repo_url = investigation.repo_url
+    entry.investigation_id = investigation.id
+    entry.findings = investigation.findings
+    entry.report = investigation.report
+    entry.confidence = investigation.confidence
+    entry.hits = 0
+    entry.created_at = datetime.utcnow()
+    db.commit()
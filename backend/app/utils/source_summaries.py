@@ -0,0 +1,134 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from app.config import settings
+from app.utils.cancellation import CancellationToken, StageTimeout
+from app.utils.llm_client import llm_client
+from app.utils.metrics import metrics
+from app.utils.model_router import model_router
+from app.utils.token_budget import truncate_to_tokens
+
+# Bump when the prompt or the post-processing changes so memoized summaries are not reused
+SUMMARY_PROMPT_VERSION = 1
+
+SUMMARY_PROMPT = """Summarize the following web page about the software repository "{repo_name}" in at most {max_words} words.
+
+Keep every concrete fact that explains the project's history: dates, names of people and companies, version numbers, replacement or successor tools, and reasons given for deprecation or archiving. Quote short phrases verbatim where they state a decision. Do not add information that is not in the page. If the page is unrelated to the repository, reply with exactly: UNRELATED
+
+Title: {title}
+URL: {url}
+
+Page content:
+{content}"""
+
+
+class SourceSummarizer:
+    """Compact, citation-preserving summaries of scraped sources.
+    
+    Summaries are produced once per distinct page content by the smallest
+    model at temperature 0. The prompt is derived from the content, so the
+    LLM response cache makes them content-addressed and shareable across
+    investigations; an in-process LRU keyed by the prompt (content, repo,
+    prompt version) and model avoids even the cache lookup for sources seen
+    recently.
+    """
+    
+    def __init__(self, max_entries: int = 1000):
+        self._lock = threading.Lock()
+        self._memo = OrderedDict()
+        self.max_entries = max_entries
+    
+    def content_hash(self, content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+    
+    def memo_key(self, prompt: str, model: str) -> str:
+        """Memo key for one summary request; the prompt carries repo name, page and limits"""
+        return self.content_hash(f"v{SUMMARY_PROMPT_VERSION}\n{model}\n{prompt}")
+    
+    def summarize(self, result: Dict, repo_name: str, job_class: str = "interactive",
+                  cancel_token: CancellationToken = None) -> str:
+        """Summary for one search result ("" if it has no content)"""
+        content = result.get('full_content') or ""
+        if not content:
+            return ""
+        
+        prompt = SUMMARY_PROMPT.format(
+            repo_name=repo_name,
+            max_words=settings.SOURCE_SUMMARY_MAX_WORDS,
+            title=result.get('title', ''),
+            url=result.get('link', ''),
+            content=content
+        )
+        model = model_router.smallest
+        key = self.memo_key(prompt, model)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                metrics.incr("source_summaries.memo_hits")
+                return self._memo[key]
+        
+        try:
+            completion = llm_client.complete(
+                messages=[{"role": "user", "content": prompt}],
+                model=model,
+                agent="summarizer",
+                job_class=job_class,
+                temperature=0,
+                max_tokens=settings.SOURCE_SUMMARY_MAX_WORDS * 2,
+                cancel_token=cancel_token
+            )
+            summary = completion['content'].strip()
+            metrics.incr("source_summaries.cached" if completion['cached'] else "source_summaries.generated")
+        except Exception as e:
+            # Fall back to the leading part of the page
+            print(f"Source summary error for {result.get('link', '')}: {e}")
+            metrics.incr("source_summaries.errors")
+            return truncate_to_tokens(content, settings.SOURCE_SUMMARY_MAX_WORDS)
+        
+        with self._lock:
+            self._memo[key] = summary
+            if len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+        
+        return summary
+    
+    def attach_summaries(self, web_results: Dict, repo_name: str, job_class: str = "interactive",
+                         cancel_token: CancellationToken = None) -> int:
+        """Add a 'summary' field to every result with scraped content; returns how many"""
+        results: List[Dict] = [
+            result
+            for category_results in web_results.values()
+            for result in category_results
+            if result.get('full_content')
+        ]
+        if not results:
+            return 0
+        
+        # Pool threads inherit whatever is left of the caller's stage deadline
+        cancel_token = cancel_token or CancellationToken()
+        remaining = cancel_token.remaining()
+        if remaining is not None:
+            remaining = max(remaining, 0.001)  # 0 would mean "no deadline"
+        
+        def summarize_within_deadline(result: Dict) -> str:
+            try:
+                with cancel_token.stage("summaries", remaining):
+                    return self.summarize(result, repo_name, job_class, cancel_token)
+            except StageTimeout:
+                # Out of time - fall back to the leading part of the page
+                return truncate_to_tokens(result['full_content'], settings.SOURCE_SUMMARY_MAX_WORDS)
+        
+        with ThreadPoolExecutor(max_workers=min(4, len(results))) as executor:
+            summaries = list(executor.map(summarize_within_deadline, results))
+        
+        for result, summary in zip(results, summaries):
+            result['summary'] = summary
+        
+        return len(results)
+
+
+# Process-wide summarizer
+source_summarizer = SourceSummarizer()
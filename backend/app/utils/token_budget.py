@@ -0,0 +1,117 @@
+from typing import Dict, List
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to a character heuristic without tiktoken
+    tiktoken = None
+
+TRUNCATION_MARKER = " …"
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Load the tokenizer once; None if unavailable (e.g. BPE file can't be fetched)"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                print(f"Tokenizer unavailable, estimating token counts: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the local tokenizer (~4 characters per token without it)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Deterministically cut text to at most max_tokens tokens"""
+    if not text or max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return encoding.decode(tokens[:max_tokens]).rstrip() + TRUNCATION_MARKER
+    return text[:max_tokens * 4].rstrip() + TRUNCATION_MARKER
+
+
+class TokenBudget:
+    """Allocates a prompt token budget across sections by priority.
+    
+    Each section is a list of items (lines, sources, contributors) in
+    preference order. Every section first receives its guaranteed minimum,
+    then the remaining budget goes to sections in priority order (lower
+    number first). Items are kept whole while they fit; the first item that
+    does not fit is truncated if enough budget remains, and the rest are
+    dropped. The same inputs always produce the same prompt.
+    """
+    
+    MIN_PARTIAL_ITEM_TOKENS = 30  # Don't bother keeping smaller fragments
+    
+    def __init__(self, total_tokens: int):
+        self.total_tokens = total_tokens
+        self.sections = []
+    
+    def add(self, name: str, items: List[str], priority: int, min_tokens: int = 0):
+        """Register a section"""
+        self.sections.append({
+            "name": name,
+            "items": [item for item in items if item],
+            "priority": priority,
+            "min_tokens": min_tokens
+        })
+    
+    def allocate(self) -> Dict[str, int]:
+        """Token allowance per section"""
+        needs = {s["name"]: sum(count_tokens(item) for item in s["items"]) for s in self.sections}
+        allowance = {}
+        remaining = self.total_tokens
+        
+        # Guaranteed minimums first, so low-priority sections are not starved entirely
+        for section in self.sections:
+            grant = min(section["min_tokens"], needs[section["name"]], max(remaining, 0))
+            allowance[section["name"]] = grant
+            remaining -= grant
+        
+        # Then the rest by priority (stable for equal priorities)
+        for section in sorted(self.sections, key=lambda s: s["priority"]):
+            name = section["name"]
+            grant = min(needs[name] - allowance[name], max(remaining, 0))
+            allowance[name] += grant
+            remaining -= grant
+        
+        return allowance
+    
+    def fit(self) -> Dict[str, List[str]]:
+        """Trim every section to its allowance"""
+        allowance = self.allocate()
+        fitted = {}
+        
+        for section in self.sections:
+            budget = allowance[section["name"]]
+            kept = []
+            for item in section["items"]:
+                cost = count_tokens(item)
+                if cost <= budget:
+                    kept.append(item)
+                    budget -= cost
+                    continue
+                if budget >= self.MIN_PARTIAL_ITEM_TOKENS:
+                    kept.append(truncate_to_tokens(item, budget))
+                break
+            fitted[section["name"]] = kept
+        
+        return fitted
@@ -1,16 +1,18 @@
 from serpapi import GoogleSearch
 from app.config import settings
+from app.utils.cancellation import CancellationToken, StageTimeout
+from app.utils.resource_governor import resource_governor
 from typing import List, Dict
 import requests
 from bs4 import BeautifulSoup
-import time
 
 
 class WebSearcher:
     """Search the web and scrape content for context about repositories"""
     
-    def __init__(self):
+    def __init__(self, cancel_token: CancellationToken = None):
         self.api_key = settings.SERPAPI_API_KEY
+        self.cancel_token = cancel_token or CancellationToken()
     
     def scrape_article(self, url: str) -> str:
         """Scrape full content from a URL"""
@@ -18,7 +20,10 @@ class WebSearcher:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
-            response = requests.get(url, headers=headers, timeout=10)
+            with resource_governor.slot("scrape", self.cancel_token):
+                # Never wait on a slow site past the web stage's deadline
+                timeout = max(0.5, self.cancel_token.remaining(10))
+                response = requests.get(url, headers=headers, timeout=timeout)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -83,12 +88,16 @@ class WebSearcher:
             for result in organic_results:
                 url = result.get("link", "")
                 
-                # Scrape full content
+                # Scrape full content (unless out of time - keep what we have)
                 full_content = ""
                 if url:
+                    try:
+                        self.cancel_token.check()
+                    except StageTimeout:
+                        break
                     print(f"Scraping: {url}")
                     full_content = self.scrape_article(url)
-                    time.sleep(1)  # Be polite, wait between requests
+                    self.cancel_token.wait(1)  # Be polite, wait between requests
                 
                 formatted_results.append({
                     "title": result.get("title", ""),
@@ -113,7 +122,11 @@ class WebSearcher:
         print(f"Searching: {query1}")
         results['abandonment_info'] = self.search(query1, num_results=2)  # Reduced to 2 for speed
         
-        # Search 2: Migration/replacement (only if owner provided)
+        # Search 2: Migration/replacement (only if owner provided and time remains)
+        try:
+            self.cancel_token.check()
+        except StageTimeout:
+            return results
         if owner:
             query2 = f"{owner} {repo_name} migration"
             print(f"Searching: {query2}")
@@ -1,5 +1,11 @@
+import asyncio
 import socketio
-from typing import Dict, Set
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Set
+
+from app.config import settings
+from app.utils.auth import verify_token
+from app.utils.metrics import metrics
 
 # Create Socket.IO server
 sio = socketio.AsyncServer(
@@ -16,29 +22,77 @@ sio = socketio.AsyncServer(
 # Track active connections per investigation
 active_connections: Dict[str, Set[str]] = {}
 
+# Recent sequenced agent events per investigation, most recently active last.
+# Filled by emit_agent_message (on the event loop), read by subscribe replays.
+event_buffers: "OrderedDict[str, deque]" = OrderedDict()
+
+# Event loop running the ASGI app, captured at startup so that pipeline
+# threads can schedule emits onto it
+_event_loop: asyncio.AbstractEventLoop = None
+
+
+def set_event_loop(loop: asyncio.AbstractEventLoop):
+    """Register the server's event loop for thread-safe emits"""
+    global _event_loop
+    _event_loop = loop
+
+
+def emit_threadsafe(coro):
+    """Schedule an emit coroutine from a non-async thread (fire and forget)"""
+    if _event_loop is None or _event_loop.is_closed():
+        coro.close()
+        return
+    asyncio.run_coroutine_threadsafe(coro, _event_loop)
+
+
+def buffer_event(investigation_id: str, event: dict):
+    """Remember a sequenced event for reconnect replay (bounded per investigation and overall)"""
+    buffer = event_buffers.get(investigation_id)
+    if buffer is None:
+        buffer = event_buffers[investigation_id] = deque(maxlen=settings.EVENT_BUFFER_SIZE)
+        while len(event_buffers) > settings.EVENT_BUFFER_INVESTIGATIONS:
+            event_buffers.popitem(last=False)
+    else:
+        event_buffers.move_to_end(investigation_id)
+    buffer.append(event)
 
-async def emit_agent_message(investigation_id: str, agent_name: str, message: str, data: dict = None):
+
+async def emit_agent_message(investigation_id: str, agent_name: str, message: str, data: dict = None,
+                             timestamp: str = None, seq: int = None):
     """Emit agent message to all clients watching this investigation"""
+    event = {
+        'investigation_id': investigation_id,
+        'agent_name': agent_name,
+        'message': message,
+        'data': data or {},
+        'timestamp': timestamp,  # Client falls back to its own clock when missing
+        'seq': seq
+    }
+    if seq is not None:
+        buffer_event(investigation_id, event)
+    await sio.emit('agent_message', event, room=investigation_id)
+
+
+async def emit_confidence_update(investigation_id: str, confidence: int):
+    """Emit confidence score update"""
     await sio.emit(
-        'agent_message',
+        'confidence_update',
         {
             'investigation_id': investigation_id,
-            'agent_name': agent_name,
-            'message': message,
-            'data': data or {},
-            'timestamp': None  # Will be added by client
+            'confidence': confidence
         },
         room=investigation_id
     )
 
 
-async def emit_confidence_update(investigation_id: str, confidence: int):
-    """Emit confidence score update"""
+async def emit_report_chunk(investigation_id: str, chunk: str, offset: int):
+    """Emit a piece of the narrator's report as it is generated"""
     await sio.emit(
-        'confidence_update',
+        'report_chunk',
         {
             'investigation_id': investigation_id,
-            'confidence': confidence
+            'chunk': chunk,
+            'offset': offset  # Character offset of this chunk in the full report
         },
         room=investigation_id
     )
@@ -67,10 +121,82 @@ async def emit_investigation_error(investigation_id: str, error: str):
     )
 
 
+def get_subscription(investigation_id: str, user_id: str):
+    """Whether user_id owns the investigation, and the investigation whose run it follows"""
+    from app.database import SessionLocal
+    from app.models import Investigation
+    
+    db = SessionLocal()
+    try:
+        investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+        if not investigation or str(investigation.user_id) != str(user_id):
+            return False, None
+        return True, str(investigation.leader_id) if investigation.leader_id else None
+    except Exception:
+        return False, None
+    finally:
+        db.close()
+
+
+def load_missed_events(investigation_id: str, after_seq: int, before_seq: Optional[int] = None) -> List[dict]:
+    """Stored agent events after after_seq (and before before_seq), for replay"""
+    from app.database import SessionLocal
+    from app.models import AgentLog
+    
+    db = SessionLocal()
+    try:
+        query = db.query(AgentLog).filter(
+            AgentLog.investigation_id == investigation_id,
+            AgentLog.seq > after_seq
+        )
+        if before_seq is not None:
+            query = query.filter(AgentLog.seq < before_seq)
+        return [
+            {
+                'investigation_id': investigation_id,
+                'agent_name': log.agent_name,
+                'message': log.message,
+                'data': log.data or {},
+                'timestamp': log.timestamp.isoformat() if log.timestamp else None,
+                'seq': log.seq
+            }
+            for log in query.order_by(AgentLog.seq.asc()).all()
+        ]
+    except Exception as e:
+        print(f"[ERROR] Event replay query failed: {e}")
+        return []
+    finally:
+        db.close()
+
+
+async def stored_gap(investigation_id: str, last_seq: int) -> List[dict]:
+    """Missed events the ring buffer no longer (or never) held, from the database"""
+    buffer = event_buffers.get(investigation_id)
+    first_buffered = buffer[0]['seq'] if buffer else None
+    
+    if first_buffered is not None and first_buffered <= last_seq + 1:
+        metrics.incr("event_buffer.hit")
+        return []
+    
+    # Evicted, or the buffer starts after the client's position
+    metrics.incr("event_buffer.db_fallback")
+    return await asyncio.to_thread(load_missed_events, investigation_id, last_seq, first_buffered)
+
+
+def buffered_after(investigation_id: str, seq: int) -> List[dict]:
+    """Ring-buffered events after seq"""
+    return [event for event in event_buffers.get(investigation_id, ()) if event['seq'] > seq]
+
+
 # Socket.IO event handlers
 @sio.event
-async def connect(sid, environ):
-    """Client connected"""
+async def connect(sid, environ, auth=None):
+    """Client connected - requires the same JWT as the REST API in the auth payload"""
+    payload = verify_token(auth.get('token', '')) if isinstance(auth, dict) else None
+    if not payload or not payload.get('user_id'):
+        raise socketio.exceptions.ConnectionRefusedError('Invalid or expired token')
+    
+    await sio.save_session(sid, {'user_id': payload['user_id']})
     print(f"Client connected: {sid}")
 
 
@@ -82,15 +208,50 @@ async def disconnect(sid):
 
 @sio.event
 async def subscribe(sid, data):
-    """Client subscribes to investigation updates"""
+    """Client subscribes to investigation updates.
+    
+    With last_seq (and leader_last_seq for followers) the client first gets
+    a 'replay' of the agent events it missed, then live events.
+    """
     investigation_id = data.get('investigation_id')
     if investigation_id:
-        # Join room for this investigation
-        await sio.enter_room(sid, investigation_id)
+        # Only the owner may watch (or replay) an investigation
+        session = await sio.get_session(sid)
+        allowed, leader_id = await asyncio.to_thread(get_subscription, investigation_id, session.get('user_id'))
+        if not allowed:
+            await sio.emit('subscribe_error', {'investigation_id': investigation_id, 'error': 'Investigation not found'}, room=sid)
+            return
+        
+        # Followers of a shared run also receive the leader's events
+        streams = {investigation_id: data.get('last_seq')}
+        if leader_id:
+            streams[leader_id] = data.get('leader_last_seq', data.get('last_seq'))
+        
+        # Database reads first; buffer snapshots and room joins then happen
+        # without yielding, so every event is either replayed or delivered live
+        gaps = {}
+        for stream_id, last_seq in streams.items():
+            if last_seq is not None:
+                gaps[stream_id] = await stored_gap(stream_id, int(last_seq))
+        
+        replay = []
+        for stream_id, stored in gaps.items():
+            after = stored[-1]['seq'] if stored else int(streams[stream_id])
+            replay += stored + buffered_after(stream_id, after)
+        
+        for stream_id in streams:
+            await sio.enter_room(sid, stream_id)
         print(f"Client {sid} subscribed to investigation {investigation_id}")
         
+        if replay:
+            await sio.emit(
+                'replay',
+                {'investigation_id': investigation_id, 'leader_id': leader_id, 'events': replay},
+                room=sid
+            )
+        
         # Send acknowledgment
-        await sio.emit('subscribed', {'investigation_id': investigation_id}, room=sid)
+        await sio.emit('subscribed', {'investigation_id': investigation_id, 'leader_id': leader_id}, room=sid)
 
 
 @sio.event
@@ -0,0 +1,400 @@
+"""Investigation worker.
+
+Claims jobs from the investigation_jobs table and runs the Scout → Analyst
+→ Narrator pipeline for each, with its own database session per job.
+
+Usage:
+    python -m app.worker --concurrency 4
+"""
+import argparse
+import itertools
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.agents.coordinator import Coordinator
+from app.config import settings
+from app.database import SessionLocal, engine, upgrade_schema
+from app.models import Base, Investigation, InvestigationJob, AgentLog
+from app.utils import checkpoints, job_queue, result_index
+from app.utils.cancellation import CancellationToken, InvestigationCancelled
+from app.utils.log_writer import last_seq, log_writer
+from app.utils.resource_governor import resource_governor
+from app.utils.event_bus import event_bus
+
+LEASE_LOST = "Job lease lost"
+
+
+def progress_callback_sync(investigation_id: str, start_seq: int = 0):
+    """Create a callback function for agent progress.
+    
+    Every message gets the next sequence number after start_seq; the stored
+    row and the live event share it so clients can resume from either.
+    """
+    sequence = itertools.count(start_seq + 1)
+    
+    def callback(agent_name: str, message: str, data: dict = None):
+        seq = next(sequence)
+        
+        # Buffered; the log writer bulk-inserts off the pipeline's thread
+        timestamp = log_writer.append(investigation_id, agent_name, message, data, seq=seq)
+        
+        # Pushed live to the investigation's Socket.IO room
+        event_bus.publish(
+            "agent_message",
+            investigation_id=investigation_id,
+            agent_name=agent_name,
+            message=message,
+            data=data or {},
+            timestamp=timestamp.isoformat(),
+            seq=seq
+        )
+        if data and data.get("confidence") is not None:
+            event_bus.publish("confidence_update", investigation_id=investigation_id, confidence=data["confidence"])
+    
+    return callback
+
+
+def report_stream_callback(investigation_id: str, db: Session):
+    """Create a callback that forwards narrator chunks to subscribed clients"""
+    parts = []
+    state = {"length": 0, "last_persist": time.monotonic()}
+    lock = db.info.setdefault("write_lock", threading.Lock())
+    
+    def callback(chunk: str):
+        offset = state["length"]
+        parts.append(chunk)
+        state["length"] += len(chunk)
+        
+        # Push to the investigation's Socket.IO room
+        event_bus.publish("report_chunk", investigation_id=investigation_id, chunk=chunk, offset=offset)
+        
+        # Periodically persist the partial report so reconnecting clients can catch up
+        now = time.monotonic()
+        if now - state["last_persist"] >= settings.REPORT_PERSIST_INTERVAL_SECONDS:
+            with lock:
+                # Followers of this investigation see the same partial report
+                db.query(Investigation).filter(
+                    or_(Investigation.id == investigation_id, Investigation.leader_id == investigation_id)
+                ).update({"report": "".join(parts)}, synchronize_session=False)
+                db.commit()
+            state["last_persist"] = now
+    
+    return callback
+
+
+def checkpoint_callback(investigation_id: str, db: Session):
+    """Create a callback that persists workflow state after each node"""
+    lock = db.info.setdefault("write_lock", threading.Lock())
+    
+    def callback(node: str, state: dict):
+        # Stage boundary - push this stage's logs out without waiting on them
+        log_writer.flush(wait=False)
+        with lock:
+            checkpoints.save(db, investigation_id, node, state)
+    
+    return callback
+
+
+def run_investigation(investigation_id: str, repo_url: str, payload: dict = None,
+                      cancel_token: CancellationToken = None):
+    """Run the full pipeline for one investigation in its own DB session.
+    
+    Raises on failure so the caller can decide whether to retry, and
+    InvestigationCancelled if cancel_token fires.
+    """
+    payload = payload or {}
+    db = SessionLocal()
+    
+    try:
+        # Get investigation record
+        investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+        
+        if not investigation:
+            print(f"[ERROR] Investigation {investigation_id} not found in database")
+            return
+        
+        # Update status (for followers too)
+        investigation.status = "processing"
+        db.query(Investigation).filter(Investigation.leader_id == investigation.id).update(
+            {"status": "processing"}, synchronize_session=False
+        )
+        db.commit()
+        print(f"[INFO] Starting investigation {investigation_id} for {repo_url}")
+        
+        # Pick up after the last completed node if an earlier attempt died
+        checkpoint = checkpoints.load(db, investigation_id)
+        resume_state = checkpoint[1] if checkpoint else None
+        if checkpoint:
+            print(f"[INFO] Resuming investigation {investigation_id} after '{checkpoint[0]}'")
+        
+        # Create coordinator with progress callback (sequence continues after earlier attempts)
+        callback = progress_callback_sync(investigation_id, last_seq(db, investigation_id))
+        coordinator = Coordinator(
+            progress_callback=callback,
+            stream_callback=report_stream_callback(investigation_id, db),
+            job_class=payload.get("job_class", "interactive"),
+            checkpoint_callback=checkpoint_callback(investigation_id, db),
+            cancel_token=cancel_token
+        )
+        
+        # Run investigation
+        result = coordinator.investigate(
+            repo_url,
+            resume_state=resume_state,
+            time_budget=payload.get("time_budget_seconds"),
+            deadline_at=datetime.fromisoformat(payload["deadline_at"]) if payload.get("deadline_at") else None
+        )
+        
+        # Save results - include full report data in findings for visualization
+        investigation.findings = {
+            "scout_data": result.get("scout_data", {}),
+            "analysis": result.get("analysis", {}),
+            "rounds_taken": result.get("rounds_taken", 0),
+            "web_search_performed": result.get("web_search_performed", False),
+            "token_usage": result.get("token_usage", {}),
+            "budget_decisions": result.get("budget_decisions", []),
+            "report_data": result.get("report", {})  # Full report object with timeline, citations, etc.
+        }
+        investigation.report = result["report"]["narrative"]
+        investigation.confidence = result["confidence"]
+        
+        # Clients stop polling logs once the status flips, so land them first
+        log_writer.flush()
+        investigation.status = "completed"
+        investigation.completed_at = datetime.utcnow()
+        
+        db.commit()
+        checkpoints.clear(db, investigation_id)
+        job_queue.propagate_to_followers(db, investigation_id)
+        event_bus.publish("investigation_complete", investigation_id=investigation_id)
+        print(f"[SUCCESS] Investigation {investigation_id} completed with {result['confidence']}% confidence")
+    
+    finally:
+        log_writer.flush()
+        db.close()
+
+
+def record_failure(investigation_id: str, error: str, final: bool):
+    """Mark the investigation failed, or note the retry if the job was requeued"""
+    db = SessionLocal()
+    try:
+        investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+        if not investigation:
+            return
+        
+        if final:
+            investigation.status = "failed"
+            investigation.report = f"Investigation failed: {error}"
+            db.commit()
+            job_queue.propagate_to_followers(db, investigation_id)
+            event_bus.publish("investigation_error", investigation_id=investigation_id, error=error)
+        else:
+            investigation.status = "pending"
+            log = AgentLog(
+                investigation_id=investigation_id,
+                agent_name="coordinator",
+                message=f"Attempt failed, investigation requeued: {error}",
+                data={"retry": True},
+                seq=last_seq(db, investigation_id) + 1
+            )
+            db.add(log)
+            db.commit()
+            # Only announce state subscribers can already read back
+            event_bus.publish(
+                "agent_message",
+                investigation_id=investigation_id,
+                agent_name=log.agent_name,
+                message=log.message,
+                data=log.data,
+                seq=log.seq
+            )
+    finally:
+        db.close()
+
+
+def record_cancelled(investigation_id: str):
+    """Note a run stopped by a cancel request (the row may already be deleted)"""
+    db = SessionLocal()
+    try:
+        investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+        if not investigation:
+            return
+        investigation.status = "cancelled"
+        log = AgentLog(
+            investigation_id=investigation_id,
+            agent_name="coordinator",
+            message="Investigation cancelled",
+            data={"cancelled": True},
+            seq=last_seq(db, investigation_id) + 1
+        )
+        db.add(log)
+        db.commit()
+        job_queue.close_finished_batches(db, [investigation.batch_id])
+        event_bus.publish(
+            "agent_message",
+            investigation_id=investigation_id,
+            agent_name=log.agent_name,
+            message=log.message,
+            data=log.data,
+            seq=log.seq
+        )
+        event_bus.publish("investigation_error", investigation_id=investigation_id, error="Investigation cancelled")
+    finally:
+        db.close()
+
+
+class Worker:
+    """Polls the job queue and runs investigations on a fixed number of threads"""
+    
+    def __init__(self, concurrency: int = None, worker_id: str = None):
+        self.concurrency = concurrency or settings.WORKER_CONCURRENCY
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads = []
+    
+    def start(self):
+        """Start the worker threads"""
+        for slot in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._loop,
+                args=(f"{self.worker_id}:{slot}",),
+                name=f"investigation-worker-{slot}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        print(f"[INFO] Worker {self.worker_id} started with {self.concurrency} slots")
+    
+    def stop(self):
+        """Stop claiming new jobs (running jobs finish or are reclaimed after their visibility timeout)"""
+        self._stop.set()
+    
+    def run_forever(self):
+        """Start and block until interrupted"""
+        self.start()
+        interval = settings.RESOURCE_REPORT_INTERVAL_SECONDS
+        next_report = time.monotonic() + interval
+        try:
+            while any(thread.is_alive() for thread in self._threads):
+                time.sleep(1)
+                if interval and time.monotonic() >= next_report:
+                    self.report_resources()
+                    next_report = time.monotonic() + interval
+        except KeyboardInterrupt:
+            print("[INFO] Shutting down worker...")
+            self.stop()
+    
+    def report_resources(self):
+        """Log governor utilization (standalone workers have no /metrics endpoint)"""
+        for name, pool in resource_governor.stats().items():
+            print(
+                f"[INFO] Resource {name}: {pool['in_use']}/{pool['capacity']} {pool['unit']} in use, "
+                f"peak {pool['peak']}, {pool['waiting']} waiting, utilization {pool['utilization']:.0%}, "
+                f"wait p95 {pool['wait_p95_seconds']}s"
+            )
+    
+    def _loop(self, slot_id: str):
+        while not self._stop.is_set():
+            try:
+                db = SessionLocal()
+                try:
+                    for investigation_id in job_queue.reap_exhausted(db):
+                        record_failure(investigation_id, job_queue.WORKER_LOST_ERROR, final=True)
+                    job = job_queue.claim(db, slot_id)
+                    # Copy what we need before the session closes
+                    job_info = (job.id, str(job.investigation_id), job.repo_url, job.payload or {}) if job else None
+                finally:
+                    db.close()
+            except Exception as e:
+                print(f"[ERROR] Job claim failed: {e}")
+                job_info = None
+            
+            if not job_info:
+                self._stop.wait(settings.WORKER_POLL_INTERVAL_SECONDS)
+                continue
+            
+            self.process(slot_id, *job_info)
+    
+    def _heartbeat(self, job_id: int, slot_id: str, done: threading.Event, cancel_token: CancellationToken):
+        """Keep extending the job's visibility timeout while it runs, and watch for cancel requests"""
+        interval = max(1, settings.JOB_VISIBILITY_TIMEOUT_SECONDS / 3)
+        next_heartbeat = time.monotonic() + interval
+        while not done.wait(settings.CANCEL_POLL_INTERVAL_SECONDS):
+            db = SessionLocal()
+            try:
+                if job_queue.is_cancelled(db, job_id):
+                    cancel_token.cancel("Cancelled by request")
+                    return
+                if time.monotonic() >= next_heartbeat:
+                    if not job_queue.heartbeat(db, job_id, slot_id):
+                        # Our lease lapsed and the job was reclaimed (or reaped); stop working on it
+                        cancel_token.cancel(LEASE_LOST)
+                        return
+                    next_heartbeat = time.monotonic() + interval
+            except Exception as e:
+                print(f"[ERROR] Heartbeat failed for job {job_id}: {e}")
+            finally:
+                db.close()
+    
+    def process(self, slot_id: str, job_id: int, investigation_id: str, repo_url: str, payload: dict):
+        """Run one claimed job and record the outcome"""
+        done = threading.Event()
+        cancel_token = CancellationToken()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job_id, slot_id, done, cancel_token), daemon=True
+        )
+        heartbeat.start()
+        
+        try:
+            run_investigation(investigation_id, repo_url, payload, cancel_token)
+            outcome = None
+        except InvestigationCancelled:
+            done.set()
+            if cancel_token.reason == LEASE_LOST:
+                # Whoever holds the job now records its outcome
+                print(f"[WARN] Lost the lease on job {job_id}; abandoning investigation {investigation_id}")
+                return
+            print(f"[INFO] Investigation {investigation_id} cancelled")
+            record_cancelled(investigation_id)
+            return
+        except Exception as e:
+            print(f"[ERROR] Investigation failed: {e}")
+            print(f"[TRACEBACK] {traceback.format_exc()}")
+            outcome = str(e)
+        finally:
+            done.set()
+        
+        db = SessionLocal()
+        try:
+            if outcome is None:
+                job_queue.complete(db, job_id)
+                job = db.query(InvestigationJob).filter(InvestigationJob.id == job_id).first()
+                if job:
+                    result_index.store(db, job.repo_key, investigation_id)
+            else:
+                requeued = job_queue.fail(db, job_id, outcome)
+                record_failure(investigation_id, outcome, final=not requeued)
+        finally:
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neural Archaeologist investigation worker")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY,
+                        help="Investigations to run in parallel")
+    args = parser.parse_args()
+    
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    Worker(concurrency=args.concurrency).run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+
+# Settings are read at import time; unit tests never reach these services
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unit-tests")
+os.environ.setdefault("SECRET_KEY", "unit-test-secret")
+os.environ.setdefault("GROQ_API_KEY", "unit-test-key")
+os.environ.setdefault("SERPAPI_API_KEY", "unit-test-key")
+os.environ.setdefault("EVENT_BUS_BACKEND", "local")
@@ -0,0 +1,145 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import Investigation, InvestigationBatch
+from app.routes import batches
+from app.utils.github_cache import CachedResponse
+
+USER = SimpleNamespace(id="user-1")
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+    
+    def filter(self, *criteria):
+        return self
+    
+    def group_by(self, *columns):
+        return self
+    
+    def first(self):
+        return self.rows[0] if self.rows else None
+    
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, rows=None):
+        self.rows = rows or {}
+        self.added = []
+        self.commits = 0
+    
+    def query(self, *entities):
+        return FakeQuery(self.rows.get(entities[0], []))
+    
+    def add(self, row):
+        self.added.append(row)
+    
+    def add_all(self, rows):
+        self.added.extend(rows)
+    
+    def commit(self):
+        self.commits += 1
+
+
+def create(monkeypatch, data, retry_after=None):
+    submitted = []
+    closed = []
+    
+    async def snapshot_key(url):
+        return f"key:{url}"
+    
+    monkeypatch.setattr(batches, "snapshot_key", snapshot_key)
+    monkeypatch.setattr(batches, "submit_investigation", lambda db, inv, key, force_fresh, payload: submitted.append((inv.repo_url, key, payload)))
+    monkeypatch.setattr(batches.job_queue, "admission_retry_after", lambda db, user_id, job_class, count: retry_after)
+    monkeypatch.setattr(batches.job_queue, "close_finished_batches", lambda db, batch_ids: closed.extend(batch_ids))
+    monkeypatch.setattr(batches, "batch_summary", lambda db, batch: batch)
+    
+    db = FakeSession()
+    batch = asyncio.run(batches.create_batch(data, USER, db))
+    return batch, db, submitted, closed
+
+
+def test_org_is_expanded_into_batch_children(monkeypatch):
+    pages = {
+        1: [{"html_url": f"https://github.com/acme/r{i}", "fork": i == 0} for i in range(100)],
+        2: [{"html_url": "https://github.com/acme/last", "fork": False}]
+    }
+    monkeypatch.setattr(batches, "github_get", lambda url, headers, params, timeout: CachedResponse(200, pages[params["page"]], {}))
+    
+    batch, db, submitted, closed = create(monkeypatch, batches.BatchCreate(org="acme"))
+    
+    assert batch.source == "org:acme"
+    assert batch.total == 100  # 99 non-forks from page one plus the one on page two
+    assert submitted[-1] == ("https://github.com/acme/last", "key:https://github.com/acme/last", {"job_class": "batch"})
+    assert all(inv.batch_id == batch.id for inv in db.added if isinstance(inv, Investigation))
+    assert closed == [batch.id]
+
+
+def test_unknown_org_is_rejected(monkeypatch):
+    monkeypatch.setattr(batches, "github_get", lambda url, headers, params, timeout: CachedResponse(404, None, {}))
+    
+    with pytest.raises(HTTPException) as error:
+        create(monkeypatch, batches.BatchCreate(org="nobody"))
+    
+    assert error.value.status_code == 400
+
+
+def test_the_same_repository_listed_twice_runs_once(monkeypatch):
+    data = batches.BatchCreate(repo_urls=[
+        "https://github.com/Uber/pyflame",
+        "https://www.github.com/uber/pyflame.git",
+        "https://github.com/a/b"
+    ])
+    
+    batch, _, submitted, _ = create(monkeypatch, data)
+    
+    assert batch.total == 2
+    assert [url for url, _, _ in submitted] == ["https://github.com/Uber/pyflame", "https://github.com/a/b"]
+
+
+def test_admission_control_rejects_before_anything_is_stored(monkeypatch):
+    data = batches.BatchCreate(repo_urls=["https://github.com/a/b"])
+    
+    with pytest.raises(HTTPException) as error:
+        create(monkeypatch, data, retry_after=30)
+    
+    assert error.value.status_code == 429
+    assert error.value.headers == {"Retry-After": "30"}
+
+
+def test_cancel_cascades_to_unfinished_children(monkeypatch):
+    batch = SimpleNamespace(id="batch-1")
+    leader = SimpleNamespace(id="inv-1", leader_id=None, status="processing", completed_at=None)
+    follower = SimpleNamespace(id="inv-2", leader_id="other", status="pending", completed_at=None)
+    cancelled_jobs = []
+    closed = []
+    monkeypatch.setattr(batches.job_queue, "promote_follower", lambda db, investigation: None)
+    monkeypatch.setattr(batches.job_queue, "cancel", lambda db, investigation_id: cancelled_jobs.append(investigation_id))
+    monkeypatch.setattr(batches.job_queue, "close_finished_batches", lambda db, batch_ids: closed.extend(batch_ids))
+    monkeypatch.setattr(batches, "batch_summary", lambda db, batch: batch)
+    db = FakeSession({InvestigationBatch: [batch], Investigation: [leader, follower]})
+    
+    asyncio.run(batches.cancel_batch("batch-1", USER, db))
+    
+    assert [leader.status, follower.status] == ["cancelled", "cancelled"]
+    assert follower.leader_id is None
+    assert cancelled_jobs == ["inv-1"]  # The follower's run belongs to another investigation
+    assert closed == ["batch-1"]
+
+
+def test_reading_a_finished_batch_does_not_write_it():
+    batch = SimpleNamespace(id="batch-1", source="list", total=2, max_concurrency=4,
+                            created_at=None, completed_at=None)
+    db = FakeSession({Investigation.status: [("completed", 1), ("failed", 1)]})
+    
+    summary = batches.batch_summary(db, batch)
+    
+    assert summary["percent_complete"] == 100.0
+    assert db.commits == 0
+    assert batch.completed_at is None
@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.routes import investigations
+
+
+class FakeQuery:
+    def __init__(self, row):
+        self.row = row
+    
+    def filter(self, *criteria):
+        return self
+    
+    def first(self):
+        return self.row
+
+
+class FakeSession:
+    def __init__(self, investigation):
+        self.investigation = investigation
+        self.added = []
+    
+    def query(self, model):
+        return FakeQuery(self.investigation)
+    
+    def add(self, row):
+        self.added.append(row)
+    
+    def commit(self):
+        pass
+
+
+def cancel(monkeypatch, worker_running):
+    published = []
+    investigation = SimpleNamespace(
+        id="inv-1", leader_id=None, batch_id=None, status="processing", repo_url="https://github.com/a/b",
+        confidence=None, created_at=None, completed_at=None
+    )
+    db = FakeSession(investigation)
+    monkeypatch.setattr(investigations.job_queue, "promote_follower", lambda db, investigation: None)
+    monkeypatch.setattr(investigations.job_queue, "cancel", lambda db, investigation_id: worker_running)
+    monkeypatch.setattr(investigations, "last_seq", lambda db, investigation_id: 41)
+    monkeypatch.setattr(investigations.event_bus, "publish", lambda event, **args: published.append((event, args)))
+    
+    asyncio.run(investigations.cancel_investigation("inv-1", SimpleNamespace(id="user-1"), db))
+    return investigation, db.added, published
+
+
+def test_cancel_of_queued_job_logs_and_publishes_the_next_seq(monkeypatch):
+    investigation, added, published = cancel(monkeypatch, worker_running=False)
+    
+    assert investigation.status == "cancelled"
+    assert [log.seq for log in added] == [42]
+    assert published[0][0] == "agent_message"
+    assert published[0][1]["seq"] == 42
+    assert published[1] == ("investigation_error", {"investigation_id": "inv-1", "error": "Investigation cancelled"})
+
+
+def test_cancel_of_running_job_leaves_the_sequence_to_the_worker(monkeypatch):
+    investigation, added, published = cancel(monkeypatch, worker_running=True)
+    
+    assert investigation.status == "cancelled"
+    assert added == []
+    assert published == []
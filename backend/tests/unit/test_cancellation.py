@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.cancellation import CancellationToken, InvestigationCancelled, StageTimeout
+
+
+def test_cancelling_a_child_leaves_the_parent_running():
+    parent = CancellationToken()
+    child = parent.child()
+    
+    child.cancel("discarded")
+    
+    assert child.is_cancelled
+    assert not parent.is_cancelled
+    with pytest.raises(InvestigationCancelled):
+        child.check()
+    parent.check()
+
+
+def test_cancelling_the_parent_cancels_children():
+    parent = CancellationToken()
+    child = parent.child()
+    
+    parent.cancel("Cancelled by request")
+    
+    assert child.is_cancelled
+    assert child.reason == "Cancelled by request"
+    assert parent.child().is_cancelled
+
+
+def test_child_wait_wakes_up_when_the_parent_is_cancelled():
+    parent = CancellationToken()
+    child = parent.child()
+    threading.Timer(0.05, parent.cancel).start()
+    
+    started = time.monotonic()
+    with pytest.raises(InvestigationCancelled):
+        child.wait(5)
+    assert time.monotonic() - started < 1
+
+
+def test_nested_stage_cannot_extend_the_outer_deadline():
+    token = CancellationToken()
+    
+    with token.stage("outer", 0.05):
+        with token.stage("inner", 60):
+            assert token.remaining() <= 0.05
+            time.sleep(0.06)
+            with pytest.raises(StageTimeout, match="inner"):
+                token.check()
+        with pytest.raises(StageTimeout, match="outer"):
+            token.check()
+    
+    token.check()
+    assert token.remaining() is None
+
+
+def test_nested_stage_can_shorten_the_deadline():
+    token = CancellationToken()
+    
+    with token.stage("outer", 60):
+        with token.stage("inner", 0.01):
+            time.sleep(0.02)
+            with pytest.raises(StageTimeout):
+                token.check()
+        token.check()
+
+
+def test_stage_deadlines_are_per_thread():
+    token = CancellationToken()
+    seen = {}
+    
+    with token.stage("analyst", 0.01):
+        time.sleep(0.02)
+        worker = threading.Thread(target=lambda: seen.update(remaining=token.remaining()))
+        worker.start()
+        worker.join()
+    
+    assert seen == {"remaining": None}
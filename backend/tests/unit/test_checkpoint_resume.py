@@ -0,0 +1,23 @@
+from app.agents.coordinator import Coordinator
+
+
+def test_resume_continues_after_the_last_completed_node():
+    coordinator = Coordinator()
+    
+    assert coordinator.route_resume({}) == "scout"
+    assert coordinator.route_resume({"last_node": "scout"}) == "analyst"
+    assert coordinator.route_resume({"last_node": "narrator"}) == "end"
+
+
+def test_resume_after_analyst_reapplies_the_evidence_decision(monkeypatch):
+    coordinator = Coordinator()
+    decisions = []
+    
+    def should_gather_more_evidence(state):
+        decisions.append(state["last_node"])
+        return "narrator"
+    
+    monkeypatch.setattr(coordinator, "should_gather_more_evidence", should_gather_more_evidence)
+    
+    assert coordinator.route_resume({"last_node": "analyst"}) == "narrator"
+    assert decisions == ["analyst"]
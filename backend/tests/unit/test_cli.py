@@ -0,0 +1,50 @@
+import pytest
+
+from app import cli
+from app.agents.coordinator import Coordinator
+
+
+def investigate_returning(result):
+    def investigate(self, repo_url, time_budget=None):
+        return result
+    return investigate
+
+
+def test_clean_result_is_completed(monkeypatch):
+    monkeypatch.setattr(Coordinator, "investigate", investigate_returning({
+        "confidence": 85,
+        "analysis": {"hypothesis": "Replaced by v2", "likely_cause": "replaced"},
+        "report": {"narrative": "story"}
+    }))
+    
+    record = cli.scan_repo("https://github.com/a/b", "batch")
+    
+    assert record["status"] == "completed"
+    assert record["report"] == "story"
+
+
+@pytest.mark.parametrize("analysis, report", [
+    ({"hypothesis": "Analysis error: boom", "error": "boom"}, {"narrative": "story"}),
+    ({"hypothesis": "Replaced by v2"}, {"narrative": "# Error", "error": "boom"}),
+])
+def test_error_fallback_is_recorded_as_failed(monkeypatch, analysis, report):
+    monkeypatch.setattr(Coordinator, "investigate", investigate_returning({
+        "confidence": 0, "analysis": analysis, "report": report
+    }))
+    
+    record = cli.scan_repo("https://github.com/a/b", "batch")
+    
+    assert record["status"] == "failed"
+    assert record["error"] == "boom"
+
+
+def test_failed_records_are_not_skipped_on_resume(tmp_path):
+    output = tmp_path / "results.ndjson"
+    output.write_text(
+        '{"repo_url": "https://github.com/a/done", "status": "completed"}\n'
+        '{"repo_url": "https://github.com/a/broken", "status": "failed", "error": "boom"}\n'
+    )
+    
+    completed = cli.read_completed(str(output))
+    
+    assert completed == {cli.normalize_repo_url("https://github.com/a/done")}
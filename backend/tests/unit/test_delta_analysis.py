@@ -0,0 +1,41 @@
+import json
+
+from app.agents.analyst import AnalystAgent
+from app.config import settings
+
+
+def source(name):
+    return {"title": name, "link": f"https://example.com/{name}", "snippet": f"{name} snippet", "summary": f"{name} summary"}
+
+
+def test_second_round_sends_only_new_sources_with_the_previous_verdict(monkeypatch):
+    monkeypatch.setattr(settings, "FASTPATH_ENABLED", False)
+    monkeypatch.setattr(AnalystAgent, "build_analysis_prompt",
+                        lambda self, scout_data: "\n".join(self.summarize_web_evidence(scout_data)))
+    prompts = []
+    
+    def request_completion(self, messages, model):
+        prompts.append(messages[-1]["content"])
+        content = json.dumps({"hypothesis": "Abandoned after the 2019 rewrite", "confidence": 40, "reasoning": ["r"]})
+        return {"content": content, "usage": {"prompt_tokens": 10, "completion_tokens": 5}}
+    
+    monkeypatch.setattr(AnalystAgent, "request_completion", request_completion)
+    agent = AnalystAgent()
+    
+    first = agent.analyze({"web_search_results": {"news": [source("blog")]}}, allow_escalation=False)
+    conversation = first.pop("conversation")
+    second = agent.analyze(
+        {"web_search_results": {"news": [source("blog"), source("archive")], "docs": [source("readme")]}},
+        previous_analysis=first,
+        conversation=conversation,
+        allow_escalation=False
+    )
+    
+    assert "blog summary" in prompts[0]
+    delta = prompts[1]
+    assert "archive summary" in delta and "readme summary" in delta
+    assert "blog" not in delta
+    assert 'Your previous hypothesis was: "Abandoned after the 2019 rewrite" with 40% confidence' in delta
+    assert second["sources_sent"] == [
+        "https://example.com/blog", "https://example.com/archive", "https://example.com/readme"
+    ]
@@ -0,0 +1,110 @@
+import json
+
+from app.utils import event_bus
+from app.utils.event_bus import PostgresEventBus, encode
+
+
+def decoded(payloads):
+    return [json.loads(payload) for payload in payloads]
+
+
+def fits(payloads):
+    return all(len(payload.encode("utf-8")) <= event_bus._MAX_PAYLOAD_BYTES for payload in payloads)
+
+
+def test_small_event_is_sent_unchanged():
+    args = {"investigation_id": "inv-1", "agent_name": "scout", "message": "hi", "data": {"a": 1}, "seq": 3}
+    
+    assert decoded(encode("agent_message", args)) == [{"event": "agent_message", "args": args}]
+
+
+def test_oversized_data_is_dropped_first():
+    args = {"investigation_id": "inv-1", "message": "hi", "data": {"blob": "x" * 20000}, "seq": 3}
+    
+    [message] = decoded(encode("agent_message", args))
+    
+    assert message["args"]["data"] == {"truncated": True}
+    assert message["args"]["message"] == "hi"
+
+
+def test_oversized_message_is_trimmed_to_fit():
+    args = {"investigation_id": "inv-1", "message": "é\"" * 10000, "data": {}, "seq": 3}
+    
+    payloads = encode("agent_message", args)
+    [message] = decoded(payloads)
+    
+    assert fits(payloads)
+    assert len(message["args"]["message"]) > 500
+    assert message["args"]["message"].startswith("é\"é\"")
+    assert message["args"]["message"].endswith(event_bus._TRUNCATED_MARK)
+    assert message["args"]["seq"] == 3
+
+
+def test_oversized_error_is_trimmed_to_fit():
+    payloads = encode("investigation_error", {"investigation_id": "inv-1", "error": "boom " * 5000})
+    
+    assert fits(payloads)
+    assert decoded(payloads)[0]["args"]["error"].startswith("boom boom")
+
+
+def test_long_report_chunk_is_split_with_offsets():
+    chunk = "".join(chr(ord("a") + i % 26) for i in range(30000))
+    
+    pieces = [m["args"] for m in decoded(encode("report_chunk", {"investigation_id": "inv-1", "chunk": chunk, "offset": 100}))]
+    
+    assert len(pieces) > 1
+    assert "".join(piece["chunk"] for piece in pieces) == chunk
+    assert [piece["offset"] for piece in pieces] == [
+        100 + sum(len(p["chunk"]) for p in pieces[:i]) for i in range(len(pieces))
+    ]
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def execute(self, sql, params):
+        if "poison" in params[1]:
+            raise ValueError("cannot send")
+        self.connection.pending.append(json.loads(params[1])["args"]["seq"])
+
+
+class FakeConnection:
+    closed = False
+    
+    def __init__(self):
+        self.pending, self.sent = [], []
+    
+    def cursor(self):
+        return FakeCursor(self)
+    
+    def commit(self):
+        self.sent += self.pending
+        self.pending = []
+    
+    def rollback(self):
+        self.pending = []
+
+
+def test_one_bad_event_does_not_drop_the_batch():
+    connection = FakeConnection()
+    bus = PostgresEventBus()
+    batch = [
+        ("agent_message", {"investigation_id": "inv-1", "message": "ok", "seq": 1}),
+        ("agent_message", {"investigation_id": "inv-1", "message": "poison", "seq": 2}),
+        ("agent_message", {"investigation_id": "inv-1", "message": "ok", "seq": 3}),
+    ]
+    
+    try:
+        bus._send(connection, batch)
+    except ValueError:
+        connection.rollback()
+        bus._send_each(connection, batch)
+    
+    assert connection.sent == [1, 3]
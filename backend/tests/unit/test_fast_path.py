@@ -0,0 +1,45 @@
+from app.agents.analyst import AnalystAgent
+from app.config import settings
+
+
+def scout_data(archived=False, months_since=None, decline=None):
+    patterns = {}
+    if months_since is not None:
+        patterns["sudden_stop"] = {"months_since": months_since, "last_activity": "2015-03-01T00:00:00"}
+    if decline is not None:
+        patterns["gradual_decay"] = {"decline_percentage": decline, "early_avg": 40, "later_avg": 4}
+    return {
+        "repo_name": "pyflame",
+        "github_data": {"repo_info": {"is_archived": archived}},
+        "patterns_detected": patterns,
+        "last_commit_date": "2015-03-01T00:00:00",
+        "total_commits": 120,
+        "contributors_count": 5,
+        "active_period_months": 30.0
+    }
+
+
+def test_archived_repositories_skip_the_llm():
+    analysis = AnalystAgent().pre_analyze(scout_data(archived=True))
+    
+    assert analysis["fast_path"] == "archived"
+    assert analysis["confidence"] == settings.FASTPATH_ARCHIVED_CONFIDENCE
+    assert analysis["needs_more_evidence"] is False
+
+
+def test_long_dormant_decline_skips_the_llm():
+    analysis = AnalystAgent().pre_analyze(scout_data(months_since=96, decline=90))
+    
+    assert analysis["fast_path"] == "dormant"
+    assert analysis["likely_cause"] == "abandonment"
+
+
+def test_ambiguous_signals_go_to_the_llm(monkeypatch):
+    agent = AnalystAgent()
+    
+    assert agent.pre_analyze(scout_data(months_since=12, decline=90)) is None
+    assert agent.pre_analyze(scout_data(months_since=96, decline=30)) is None
+    assert agent.pre_analyze(scout_data(months_since=96)) is None
+    
+    monkeypatch.setattr(settings, "FASTPATH_ENABLED", False)
+    assert agent.pre_analyze(scout_data(archived=True)) is None
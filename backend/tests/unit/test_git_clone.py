@@ -0,0 +1,35 @@
+import subprocess
+
+import pytest
+
+from app.config import settings
+from app.utils import git_analyzer
+from app.utils.cancellation import StageTimeout
+from app.utils.git_analyzer import GitAnalyzer
+
+
+class HangingClone:
+    """git clone that never finishes"""
+    
+    def __init__(self, *args, **kwargs):
+        self.killed = False
+    
+    def wait(self, timeout=None):
+        if self.killed:
+            return -9
+        raise subprocess.TimeoutExpired("git", timeout)
+    
+    def kill(self):
+        self.killed = True
+
+
+def test_clone_past_its_deadline_raises_stage_timeout(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "STAGE_TIMEOUT_CLONE_SECONDS", 0.2)
+    monkeypatch.setattr(git_analyzer.tempfile, "gettempdir", lambda: str(tmp_path))
+    monkeypatch.setattr(git_analyzer.subprocess, "Popen", HangingClone)
+    analyzer = GitAnalyzer("https://github.com/a/b")
+    
+    with pytest.raises(StageTimeout):
+        analyzer.clone_repository()
+    
+    git_analyzer.resource_governor.release_disk(analyzer._disk_reserved)
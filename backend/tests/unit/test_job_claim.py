@@ -0,0 +1,80 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, InvestigationBatch, InvestigationJob
+from app.utils import job_queue
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+@pytest.fixture
+def db():
+    # claim() is plain SQL apart from FOR UPDATE SKIP LOCKED, which SQLite ignores
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[InvestigationBatch.__table__, InvestigationJob.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def add_job(db, user_id, job_class="interactive", status="queued", batch_id=None):
+    now = datetime.utcnow()
+    job = InvestigationJob(
+        investigation_id=uuid.uuid4(),
+        repo_url="https://github.com/a/b",
+        user_id=user_id,
+        job_class=job_class,
+        batch_id=batch_id,
+        status=status,
+        available_at=now - timedelta(seconds=1),
+        locked_until=now + timedelta(minutes=5) if status == "running" else None
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def test_interactive_job_beats_an_older_batch_job(db):
+    batch_job = add_job(db, uuid.uuid4(), "batch")
+    interactive = add_job(db, uuid.uuid4(), "interactive")
+    
+    assert job_queue.claim(db, "worker").id == interactive.id
+    assert job_queue.claim(db, "worker").id == batch_job.id
+
+
+def test_user_with_fewer_running_jobs_is_claimed_first(db):
+    busy, idle = uuid.uuid4(), uuid.uuid4()
+    add_job(db, busy, status="running")
+    busy_queued = add_job(db, busy)
+    idle_queued = add_job(db, idle)
+    
+    assert job_queue.claim(db, "worker").id == idle_queued.id
+    assert job_queue.claim(db, "worker").id == busy_queued.id
+
+
+def test_batch_children_respect_the_batch_cap(db):
+    batch = InvestigationBatch(id=uuid.uuid4(), user_id=uuid.uuid4(), source="list", total=3, max_concurrency=1)
+    db.add(batch)
+    db.commit()
+    first = add_job(db, batch.user_id, "batch", batch_id=batch.id)
+    add_job(db, batch.user_id, "batch", batch_id=batch.id)
+    
+    assert job_queue.claim(db, "worker").id == first.id
+    assert job_queue.claim(db, "worker") is None
+    
+    job_queue.complete(db, first.id)
+    assert job_queue.claim(db, "worker") is not None
@@ -0,0 +1,20 @@
+from app.utils.llm_cache import make_cache_key
+
+MESSAGES = [{"role": "system", "content": "You are an analyst"}, {"role": "user", "content": "Why did it die?"}]
+
+
+def test_key_ignores_param_order():
+    first = make_cache_key("model-a", MESSAGES, temperature=0.2, max_tokens=500)
+    second = make_cache_key("model-a", MESSAGES, max_tokens=500, temperature=0.2)
+    
+    assert first == second
+    assert len(first) == 64
+
+
+def test_key_changes_with_model_params_and_messages():
+    key = make_cache_key("model-a", MESSAGES, temperature=0.2)
+    
+    assert make_cache_key("model-b", MESSAGES, temperature=0.2) != key
+    assert make_cache_key("model-a", MESSAGES, temperature=0.3) != key
+    assert make_cache_key("model-a", MESSAGES[:1], temperature=0.2) != key
+    assert make_cache_key("model-a", list(reversed(MESSAGES)), temperature=0.2) != key
@@ -0,0 +1,39 @@
+import httpx
+import pytest
+from groq import APIConnectionError
+
+from app.agents.analyst import AnalystAgent
+from app.agents.narrator import NarratorAgent
+from app.config import settings
+
+
+def connection_error(*args, **kwargs):
+    raise APIConnectionError(request=httpx.Request("POST", "https://api.groq.com"))
+
+
+def test_narrator_raises_when_the_model_is_unreachable(monkeypatch):
+    """An LLM outage must fail the attempt (and be retried), not produce an error report"""
+    monkeypatch.setattr(settings, "NARRATOR_PARALLEL_SECTIONS", False)
+    monkeypatch.setattr(NarratorAgent, "has_web_evidence", lambda self, scout_data: False)
+    monkeypatch.setattr(NarratorAgent, "build_narrative_prompt", lambda self, scout_data, analysis: "prompt")
+    monkeypatch.setattr("app.agents.narrator.llm_client.complete", connection_error)
+    
+    with pytest.raises(APIConnectionError):
+        NarratorAgent().generate_report({}, {"hypothesis": "h", "confidence": 50})
+
+
+def test_analyst_raises_when_the_model_is_unreachable(monkeypatch):
+    monkeypatch.setattr(settings, "FASTPATH_ENABLED", False)
+    monkeypatch.setattr(AnalystAgent, "build_analysis_prompt", lambda self, scout_data: "prompt")
+    monkeypatch.setattr("app.agents.analyst.llm_client.complete", connection_error)
+    
+    with pytest.raises(APIConnectionError):
+        AnalystAgent().analyze({"repo_info": {}})
+
+
+def test_narrator_keeps_error_report_for_other_failures(monkeypatch):
+    monkeypatch.setattr(NarratorAgent, "has_web_evidence", lambda self, scout_data: 1 / 0)
+    
+    report = NarratorAgent().generate_report({}, {"hypothesis": "h", "confidence": 50})
+    
+    assert report["error"] == "division by zero"
@@ -0,0 +1,89 @@
+import asyncio
+
+from app.utils.llm_client import LLMClient
+from app.utils.llm_scheduler import estimate_tokens
+
+MESSAGES = [{"role": "user", "content": "x" * 400}]
+
+
+class RecordingScheduler:
+    def __init__(self, queue_wait: float = 0.0):
+        self.queue_wait = queue_wait
+        self.settled = []
+        self.released = []
+    
+    async def acquire(self, estimated_tokens, agent="default", job_class="interactive"):
+        await asyncio.sleep(self.queue_wait)
+        return self.queue_wait
+    
+    def settle(self, estimated_tokens, actual_tokens):
+        self.settled.append((estimated_tokens, actual_tokens))
+    
+    def release(self, estimated_tokens):
+        self.released.append(estimated_tokens)
+
+
+def make_client(scheduler, latencies):
+    """Client whose n-th request takes latencies[n] seconds"""
+    client = LLMClient()
+    client.scheduler = scheduler
+    calls = []
+    
+    async def create(messages, model, on_delta, **params):
+        latency = latencies[len(calls)]
+        calls.append(model)
+        await asyncio.sleep(latency)
+        return {"content": f"answer {len(calls)}", "usage": {"prompt_tokens": 100, "completion_tokens": 10}}
+    
+    client._create = create
+    return client, calls
+
+
+async def run_hedged(client, hedge_after):
+    client._semaphore = asyncio.Semaphore(4)
+    result = await client.acomplete_hedged(MESSAGES, "model", hedge_after, max_tokens=50)
+    await asyncio.sleep(0.01)  # Let the cancelled loser unwind
+    return result
+
+
+def test_time_spent_waiting_for_quota_does_not_trigger_a_hedge():
+    scheduler = RecordingScheduler(queue_wait=0.2)
+    client, calls = make_client(scheduler, [0.02])
+    
+    result = asyncio.run(run_hedged(client, hedge_after=0.1))
+    
+    assert result["content"] == "answer 1"
+    assert calls == ["model"]
+
+
+def test_slow_request_is_hedged_and_the_loser_settles_its_reservation():
+    scheduler = RecordingScheduler()
+    client, calls = make_client(scheduler, [1.0, 0.01])
+    
+    result = asyncio.run(run_hedged(client, hedge_after=0.05))
+    
+    estimated = estimate_tokens(MESSAGES, 50)
+    assert result["content"] == "answer 2"
+    assert len(calls) == 2
+    assert sorted(scheduler.settled) == sorted([(estimated, 110), (estimated, estimate_tokens(MESSAGES))])
+
+
+def test_loser_still_waiting_for_a_slot_releases_its_reservation():
+    scheduler = RecordingScheduler()
+    client, calls = make_client(scheduler, [1.0, 0.01])
+    
+    async def scenario():
+        client._semaphore = asyncio.Semaphore(1)
+        first = asyncio.ensure_future(client.acomplete(MESSAGES, "model", max_tokens=50))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(client.acomplete(MESSAGES, "model", max_tokens=50))
+        await asyncio.sleep(0.01)
+        second.cancel()
+        first.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+    
+    asyncio.run(scenario())
+    
+    estimated = estimate_tokens(MESSAGES, 50)
+    assert scheduler.released == [estimated]
+    assert scheduler.settled == [(estimated, estimate_tokens(MESSAGES))]
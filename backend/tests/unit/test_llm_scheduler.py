@@ -0,0 +1,166 @@
+import asyncio
+
+import httpx
+from groq import APIConnectionError, APITimeoutError
+
+from app.config import settings
+from app.utils import llm_scheduler
+from app.utils.llm_client import LLMClient
+from app.utils.llm_scheduler import LLMScheduler, TokenBucket, request_priority
+
+MESSAGES = [{"role": "user", "content": "x" * 400}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refills_at_its_per_minute_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", clock)
+    bucket = TokenBucket(600)
+    
+    bucket.take(600)
+    assert bucket.wait_time(100) == 10.0
+    
+    clock.now += 5
+    assert bucket.wait_time(100) == 5.0
+    
+    clock.now += 120
+    bucket.refill()
+    assert bucket.tokens == 600  # Capped at capacity
+
+
+def test_oversized_request_only_waits_for_a_full_bucket(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", clock)
+    bucket = TokenBucket(600)
+    
+    assert bucket.wait_time(5000) == 0.0
+
+
+def test_interactive_work_outranks_batch_work():
+    assert request_priority("narrator", "interactive") < request_priority("analyst", "batch")
+    assert request_priority("analyst", "interactive") < request_priority("narrator", "interactive")
+    assert request_priority("unknown", "interactive") < request_priority("analyst", "batch")
+
+
+def test_queued_requests_are_admitted_in_priority_order(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_TPM_LIMIT", 6000)
+    monkeypatch.setattr(settings, "LLM_RPM_LIMIT", 60)
+    
+    async def run():
+        scheduler = LLMScheduler()
+        scheduler.tokens.tokens = 0  # Quota exhausted; everyone queues
+        admitted = []
+        
+        async def request(agent, job_class):
+            await scheduler.acquire(100, agent, job_class)
+            admitted.append((job_class, agent))
+        
+        tasks = [
+            asyncio.create_task(request("summarizer", "batch")),
+            asyncio.create_task(request("narrator", "interactive")),
+            asyncio.create_task(request("analyst", "interactive"))
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queue_depth"] == 3
+        
+        scheduler.tokens.give(6000)
+        scheduler._dispatch()
+        await asyncio.gather(*tasks)
+        return admitted
+    
+    assert asyncio.run(run()) == [
+        ("interactive", "analyst"),
+        ("interactive", "narrator"),
+        ("batch", "summarizer")
+    ]
+
+
+def test_cancelled_request_leaves_the_queue_and_unblocks_the_next(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_TPM_LIMIT", 6000)
+    monkeypatch.setattr(settings, "LLM_RPM_LIMIT", 60)
+    
+    async def run():
+        scheduler = LLMScheduler()
+        scheduler.tokens.tokens = 0
+        head = asyncio.create_task(scheduler.acquire(100, "analyst"))
+        behind = asyncio.create_task(scheduler.acquire(100, "narrator"))
+        await asyncio.sleep(0)
+        
+        head.cancel()
+        scheduler.tokens.give(100)
+        await asyncio.sleep(0)
+        await asyncio.wait_for(behind, 1)
+        return scheduler.stats()["queue_depth"]
+    
+    assert asyncio.run(run()) == 0
+
+
+def test_settle_and_release_return_unused_quota(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_TPM_LIMIT", 6000)
+    monkeypatch.setattr(settings, "LLM_RPM_LIMIT", 60)
+    clock = FakeClock()
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", clock)
+    
+    async def run():
+        scheduler = LLMScheduler()
+        await scheduler.acquire(1000)
+        scheduler.settle(1000, 400)
+        assert scheduler.tokens.tokens == 5600
+        
+        await scheduler.acquire(1000)
+        scheduler.release(1000)
+        assert scheduler.tokens.tokens == 5600
+        assert scheduler.requests.tokens == 59
+    
+    asyncio.run(run())
+
+
+def run_with_failures(monkeypatch, failures):
+    """Completion that raises each error in failures before succeeding; returns the scheduler"""
+    monkeypatch.setattr(settings, "LLM_TPM_LIMIT", 6000)
+    monkeypatch.setattr(settings, "LLM_RPM_LIMIT", 60)
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", FakeClock())
+    errors = list(failures)
+    
+    async def create(messages, model, on_delta, **params):
+        if errors:
+            raise errors.pop(0)(request=httpx.Request("POST", "https://api.groq.com"))
+        return {"content": "answer", "usage": {"prompt_tokens": 100, "completion_tokens": 10}}
+    
+    async def run():
+        client = LLMClient()
+        client.scheduler = LLMScheduler()
+        client._semaphore = asyncio.Semaphore(1)
+        client._create = create
+        client._backoff_delay = lambda attempt, error: 0
+        try:
+            await client.acomplete(MESSAGES, "model", max_tokens=50)
+        except Exception:
+            pass
+        return client.scheduler
+    
+    return asyncio.run(run())
+
+
+def test_retried_call_only_spends_what_was_sent(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 2)
+    scheduler = run_with_failures(monkeypatch, [APITimeoutError, APITimeoutError])
+    
+    prompt = llm_scheduler.estimate_tokens(MESSAGES)
+    assert scheduler.tokens.tokens == 6000 - 2 * prompt - 110
+    assert scheduler.requests.tokens == 60 - 3
+
+
+def test_calls_that_never_connected_give_all_their_quota_back(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 1)
+    scheduler = run_with_failures(monkeypatch, [APIConnectionError, APIConnectionError])
+    
+    assert scheduler.tokens.tokens == 6000
+    assert scheduler.requests.tokens == 60
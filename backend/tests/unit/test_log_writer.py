@@ -0,0 +1,77 @@
+import threading
+
+from app.config import settings
+from app.utils.log_writer import AgentLogWriter
+
+
+class RecordingWriter(AgentLogWriter):
+    """Collects batches instead of inserting them"""
+    
+    def __init__(self, release=None):
+        super().__init__()
+        self.batches = []
+        self.release = release
+    
+    def _write(self, batch):
+        if self.release:
+            self.release.wait(5)
+        self.batches.append([row["message"] for row in batch])
+
+
+def test_flush_waits_until_everything_appended_is_written(monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_LOG_FLUSH_INTERVAL_SECONDS", 60)
+    writer = RecordingWriter()
+    
+    for i in range(3):
+        writer.append("inv-1", "scout", f"step {i}", seq=i + 1)
+    
+    assert writer.flush()
+    assert writer.batches == [["step 0", "step 1", "step 2"]]
+
+
+def test_full_batches_are_written_without_a_flush(monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_LOG_FLUSH_INTERVAL_SECONDS", 60)
+    monkeypatch.setattr(settings, "AGENT_LOG_BATCH_SIZE", 2)
+    writer = RecordingWriter()
+    
+    writer.append("inv-1", "scout", "a")
+    writer.append("inv-1", "scout", "b")
+    
+    with writer._cond:
+        assert writer._cond.wait_for(lambda: writer._written == 2, 1)
+    assert writer.batches == [["a", "b"]]
+
+
+def test_flush_times_out_while_the_database_is_stuck(monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_LOG_FLUSH_INTERVAL_SECONDS", 60)
+    release = threading.Event()
+    writer = RecordingWriter(release)
+    writer.append("inv-1", "scout", "a")
+    
+    assert not writer.flush(timeout=0.1)
+    
+    release.set()
+    assert writer.flush()
+    assert writer.batches == [["a"]]
+
+
+def test_flush_before_any_append_returns_at_once():
+    assert RecordingWriter().flush()
+
+
+def test_overflow_sheds_the_oldest_rows(monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_LOG_FLUSH_INTERVAL_SECONDS", 60)
+    monkeypatch.setattr(settings, "AGENT_LOG_QUEUE_MAX", 2)
+    release = threading.Event()
+    writer = RecordingWriter(release)
+    writer.append("inv-1", "scout", "held")
+    writer.flush(wait=False)  # The writer thread takes "held" and blocks on the database
+    
+    with writer._cond:
+        assert writer._cond.wait_for(lambda: not writer._buffer, 1)
+    for message in ("a", "b", "c"):
+        writer.append("inv-1", "scout", message)
+    release.set()
+    
+    assert writer.flush()
+    assert writer.batches == [["held"], ["b", "c"]]
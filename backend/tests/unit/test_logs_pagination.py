@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi import Response
+
+from app.routes import investigations
+
+STARTED = datetime(2026, 1, 1)
+
+
+class FakeLogQuery:
+    """Applies the investigation/id filters the endpoint uses to in-memory rows"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+    
+    def filter(self, *criteria):
+        rows = self.rows
+        for criterion in criteria:
+            column = criterion.left.key
+            bound = criterion.right.value
+            rows = [row for row in rows if criterion.operator(getattr(row, column), bound)]
+        return FakeLogQuery(rows)
+    
+    def order_by(self, *clauses):
+        return FakeLogQuery(sorted(self.rows, key=lambda row: row.id))
+    
+    def limit(self, count):
+        return FakeLogQuery(self.rows[:count])
+    
+    def all(self):
+        return self.rows
+
+
+def log(log_id, investigation_id="inv-1"):
+    return SimpleNamespace(id=log_id, investigation_id=investigation_id, seq=log_id, agent_name="scout",
+                           message=f"log {log_id}", data={}, timestamp=STARTED + timedelta(seconds=log_id))
+
+
+class FakeSession:
+    def __init__(self, logs, leader_id=None):
+        self.investigation = SimpleNamespace(id="inv-1", leader_id=leader_id)
+        self.logs = logs
+    
+    def query(self, model):
+        if model is investigations.Investigation:
+            return SimpleNamespace(filter=lambda *c: SimpleNamespace(first=lambda: self.investigation))
+        return FakeLogQuery(self.logs)
+
+
+def get_logs(db, after_id=None, leader_after_id=None, limit=10):
+    response = Response()
+    result = asyncio.run(investigations.get_investigation_logs(
+        "inv-1", response, after_id=after_id, leader_after_id=leader_after_id, limit=limit,
+        current_user=SimpleNamespace(id="user-1"), db=db
+    ))
+    return result, response.headers
+
+
+def test_polling_at_the_last_returned_id_is_no_content():
+    db = FakeSession([log(1), log(2), log(3)])
+    
+    rows, headers = get_logs(db)
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    
+    result, _ = get_logs(db, after_id=int(headers["X-Last-Id"]))
+    assert result.status_code == 204
+
+
+def test_pages_only_return_rows_after_the_cursor():
+    db = FakeSession([log(i) for i in range(1, 20)])
+    
+    rows, headers = get_logs(db, after_id=10, limit=2)
+    
+    assert [row["id"] for row in rows] == [11, 12]
+    assert headers["X-Last-Id"] == "12"
+    assert headers["X-Has-More"] == "true"
+
+
+def test_leader_rows_committing_late_are_not_skipped():
+    # The leader's worker took id 5 but commits it after the follower's row 6 is visible
+    db = FakeSession([log(1), log(2, "lead"), log(6)], leader_id="lead")
+    
+    rows, headers = get_logs(db)
+    assert [row["id"] for row in rows] == [1, 2, 6]
+    assert headers["X-Leader-Id"] == "lead"
+    assert (headers["X-Last-Id"], headers["X-Leader-Last-Id"]) == ("6", "2")
+    
+    db.logs.append(log(5, "lead"))
+    rows, headers = get_logs(db, after_id=6, leader_after_id=2)
+    assert [row["id"] for row in rows] == [5]
+    assert (headers["X-Last-Id"], headers["X-Leader-Last-Id"]) == ("6", "5")
+    
+    result, _ = get_logs(db, after_id=6, leader_after_id=5)
+    assert result.status_code == 204
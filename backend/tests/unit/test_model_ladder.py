@@ -0,0 +1,40 @@
+import json
+
+from app.agents import analyst
+from app.agents.analyst import AnalystAgent
+from app.config import settings
+from app.utils.model_router import ModelRouter
+
+WEB_EVIDENCE = {"web_search_results": {"news": [{"title": "t", "snippet": "s", "summary": "Archived in 2019"}]}}
+
+
+def run(monkeypatch, confidence, scout_data):
+    monkeypatch.setattr(settings, "FASTPATH_ENABLED", False)
+    monkeypatch.setattr(settings, "CONFIDENCE_THRESHOLD", 70)
+    monkeypatch.setattr(settings, "ANALYST_ESCALATION_MARGIN", 5)
+    monkeypatch.setattr(analyst, "model_router", ModelRouter("small,large"))
+    monkeypatch.setattr(AnalystAgent, "build_analysis_prompt", lambda self, scout_data: "prompt")
+    models = []
+    
+    def request_completion(self, messages, model):
+        models.append(model)
+        content = json.dumps({"hypothesis": "h", "confidence": confidence, "reasoning": ["r"]})
+        return {"content": content, "usage": {"prompt_tokens": 10, "completion_tokens": 5}}
+    
+    monkeypatch.setattr(AnalystAgent, "request_completion", request_completion)
+    AnalystAgent().analyze(scout_data)
+    return models
+
+
+def test_borderline_web_informed_answer_escalates(monkeypatch):
+    assert run(monkeypatch, 72, WEB_EVIDENCE) == ["small", "large"]
+
+
+def test_git_only_answer_in_the_prompted_range_stays_on_the_small_model(monkeypatch):
+    assert run(monkeypatch, 65, {}) == ["small"]
+    assert run(monkeypatch, 70, {}) == ["small"]
+
+
+def test_answers_clear_of_the_threshold_do_not_escalate(monkeypatch):
+    assert run(monkeypatch, 60, WEB_EVIDENCE) == ["small"]
+    assert run(monkeypatch, 85, WEB_EVIDENCE) == ["small"]
@@ -0,0 +1,58 @@
+import time
+
+from app.agents import narrator
+from app.agents.narrator import GIT_ONLY_NOTE, REPORT_SECTIONS, NarratorAgent, StrippedStream
+
+
+def test_stripped_stream_matches_strip():
+    emitted = []
+    stream = StrippedStream(emitted.append)
+    
+    for chunk in ["\n\n  ", "# Title\n", "\nBody ", " text", "  \n", "\n"]:
+        stream.feed(chunk)
+    
+    assert "".join(emitted) == "\n\n  # Title\n\nBody  text  \n\n".strip()
+
+
+def fake_sections(monkeypatch):
+    """Section completions that finish out of order and stream in small chunks"""
+    def complete(messages, model, on_chunk=None, **kwargs):
+        index = next(i for i, section in enumerate(REPORT_SECTIONS) if section[0] in messages[1]["content"])
+        # Later sections finish first, so they have to buffer behind earlier ones
+        time.sleep(0.02 * (len(REPORT_SECTIONS) - index))
+        content = f"\n{REPORT_SECTIONS[index][0]}\n\nSection {index} text.  \n\n"
+        for start in range(0, len(content), 7):
+            on_chunk(content[start:start + 7])
+        return {"content": content, "usage": {"prompt_tokens": 10, "completion_tokens": 5}, "cached": False}
+    
+    monkeypatch.setattr(narrator.llm_client, "complete", complete)
+    monkeypatch.setattr(NarratorAgent, "build_section_context", lambda self, scout_data, analysis, has_web: "context")
+    monkeypatch.setattr(NarratorAgent, "format_sources_section", lambda self, scout_data: "# 📚 SOURCES\n- [Source 1] x")
+
+
+def test_parallel_sections_stream_exactly_the_final_narrative(monkeypatch):
+    fake_sections(monkeypatch)
+    streamed = []
+    
+    agent = NarratorAgent(stream_callback=streamed.append)
+    narrative, usage = agent.generate_sections({}, {}, has_web=True)
+    
+    assert "".join(streamed) == narrative
+    assert narrative.startswith(REPORT_SECTIONS[0][0])
+    assert usage["completion_tokens"] == 5 * len(REPORT_SECTIONS)
+
+
+def test_parallel_git_only_report_ends_with_the_same_note_as_the_single_prompt(monkeypatch):
+    fake_sections(monkeypatch)
+    streamed = []
+    
+    agent = NarratorAgent(stream_callback=streamed.append)
+    narrative, _ = agent.generate_sections({}, {}, has_web=False)
+    
+    assert narrative.endswith("\n\n" + GIT_ONLY_NOTE)
+    assert "SOURCES" not in narrative
+    assert "".join(streamed) == narrative
+    assert GIT_ONLY_NOTE in agent.build_narrative_prompt(
+        {"repo_name": "b", "total_commits": 1, "contributors_count": 1, "active_period_months": 1.0},
+        {"hypothesis": "h", "confidence": 50}
+    )
@@ -0,0 +1,21 @@
+from app.utils.repo_identity import normalize_repo_url, repo_key
+
+
+def test_equivalent_github_urls_share_one_form():
+    variants = [
+        "https://github.com/uber/pyflame",
+        "https://www.GitHub.com/Uber/pyflame.git/",
+        "github.com/uber/pyflame",
+        "  http://github.com/Uber/PyFlame/  "
+    ]
+    
+    assert {normalize_repo_url(url) for url in variants} == {"https://github.com/uber/pyflame"}
+
+
+def test_paths_on_other_hosts_keep_their_case():
+    assert normalize_repo_url("https://GitLab.com/Group/Project.git") == "https://gitlab.com/Group/Project"
+
+
+def test_repo_key_pins_the_snapshot_when_head_is_known():
+    assert repo_key("github.com/Uber/pyflame") == "https://github.com/uber/pyflame"
+    assert repo_key("github.com/Uber/pyflame", "abc123") == "https://github.com/uber/pyflame@abc123"
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from app.utils import resource_governor
+from app.utils.cancellation import CancellationToken, InvestigationCancelled
+from app.utils.resource_governor import ResourcePool
+
+
+def test_acquire_blocks_until_capacity_is_released(monkeypatch):
+    monkeypatch.setattr(resource_governor, "_POLL_SECONDS", 0.01)
+    pool = ResourcePool("test", capacity=2)
+    pool.acquire(2)
+    acquired = threading.Event()
+    
+    def waiter():
+        pool.acquire(1)
+        acquired.set()
+    
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    assert not acquired.wait(0.1)
+    assert pool.stats()["waiting"] == 1
+    
+    pool.release(1)
+    assert acquired.wait(1)
+    thread.join()
+    assert pool.in_use == 2
+    assert pool.peak == 2
+
+
+def test_oversized_request_runs_alone():
+    pool = ResourcePool("test", capacity=10, unit="bytes")
+    
+    pool.acquire(50)  # Pool is empty, so it is admitted rather than waiting forever
+    
+    assert pool.in_use == 50
+
+
+def test_cancelled_waiter_gives_up(monkeypatch):
+    monkeypatch.setattr(resource_governor, "_POLL_SECONDS", 0.01)
+    pool = ResourcePool("test", capacity=1)
+    pool.acquire(1)
+    token = CancellationToken()
+    token.cancel("Stopped by user")
+    
+    with pytest.raises(InvestigationCancelled):
+        pool.acquire(1, token)
+    
+    assert pool.in_use == 1
+    assert pool.waiting == 0
+
+
+def test_resize_swaps_the_estimate_for_the_measured_size():
+    pool = ResourcePool("test", capacity=100, unit="bytes")
+    pool.acquire(40)
+    
+    pool.resize(40, 120)
+    assert pool.in_use == 120
+    assert pool.peak == 120
+    
+    pool.resize(120, 30)
+    assert pool.in_use == 30
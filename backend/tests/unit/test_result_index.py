@@ -0,0 +1,61 @@
+from app.models import Investigation, InvestigationResult
+from app.utils import result_index
+
+
+class FakeQuery:
+    def __init__(self, row):
+        self.row = row
+    
+    def filter(self, *criteria):
+        return self
+    
+    def first(self):
+        return self.row
+
+
+class FakeSession:
+    def __init__(self, investigation):
+        self.investigation = investigation
+        self.added = []
+    
+    def query(self, model):
+        return FakeQuery(self.investigation if model is Investigation else None)
+    
+    def add(self, row):
+        self.added.append(row)
+    
+    def commit(self):
+        pass
+
+
+def completed(findings):
+    return Investigation(
+        id="inv-1", repo_url="https://github.com/a/b", status="completed",
+        findings=findings, report="report", confidence=80
+    )
+
+
+def test_store_indexes_a_clean_result():
+    db = FakeSession(completed({"analysis": {"confidence": 80}, "report_data": {"narrative": "n"}}))
+    
+    result_index.store(db, "github.com/a/b@abc", "inv-1")
+    
+    assert len(db.added) == 1
+    assert isinstance(db.added[0], InvestigationResult)
+    assert db.added[0].result_key == result_index.result_key("github.com/a/b@abc")
+
+
+def test_store_skips_error_analysis():
+    db = FakeSession(completed({"analysis": {"error": "bad prompt"}, "report_data": {}}))
+    
+    result_index.store(db, "github.com/a/b@abc", "inv-1")
+    
+    assert db.added == []
+
+
+def test_store_skips_error_report():
+    db = FakeSession(completed({"analysis": {}, "report_data": {"error": "bad template"}}))
+    
+    result_index.store(db, "github.com/a/b@abc", "inv-1")
+    
+    assert db.added == []
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+
+from app import database
+from app.models import Base
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+    
+    def execute(self, statement):
+        self.statements.append(str(statement))
+
+
+class RecordingEngine:
+    def __init__(self):
+        self.connection = RecordingConnection()
+    
+    @contextmanager
+    def begin(self):
+        yield self.connection
+
+
+def test_upgrade_runs_every_statement_under_the_lock():
+    bind = RecordingEngine()
+    
+    database.upgrade_schema(bind)
+    
+    assert "pg_advisory_xact_lock" in bind.connection.statements[0]
+    assert bind.connection.statements[1:] == database.SCHEMA_UPGRADES
+
+
+def test_upgrade_is_idempotent_ddl():
+    for statement in database.SCHEMA_UPGRADES:
+        if statement.startswith(("ALTER", "CREATE")):
+            assert "IF NOT EXISTS" in statement
+        elif statement.startswith("DROP"):
+            assert "IF EXISTS" in statement
+
+
+def test_upgrade_covers_indexes_declared_on_upgraded_tables():
+    upgrades = "\n".join(database.SCHEMA_UPGRADES)
+    for table in ("agent_logs", "investigation_jobs"):
+        for index in Base.metadata.tables[table].indexes:
+            if index.name.startswith("ix_investigation_jobs_") and index.name.endswith(("_investigation_id", "_status")):
+                continue  # Created with the table itself
+            assert index.name in upgrades
+    assert upgrades.index("SET seq = NULL") < upgrades.index("uq_agent_logs_investigation_seq")
@@ -0,0 +1,46 @@
+from app.utils import source_summaries
+from app.utils.source_summaries import SourceSummarizer
+
+PAGE = {"title": "Release notes", "link": "https://example.com/notes", "full_content": "The project moved to v2."}
+
+
+def fake_complete(calls):
+    def complete(messages, model, **kwargs):
+        calls.append(messages[0]["content"])
+        return {"content": f"summary {len(calls)}", "cached": False}
+    return complete
+
+
+def test_same_page_for_the_same_repo_is_summarized_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(source_summaries.llm_client, "complete", fake_complete(calls))
+    summarizer = SourceSummarizer()
+    
+    first = summarizer.summarize(PAGE, "owner/repo")
+    second = summarizer.summarize(PAGE, "owner/repo")
+    
+    assert first == second == "summary 1"
+    assert len(calls) == 1
+
+
+def test_same_page_for_another_repo_gets_its_own_summary(monkeypatch):
+    calls = []
+    monkeypatch.setattr(source_summaries.llm_client, "complete", fake_complete(calls))
+    summarizer = SourceSummarizer()
+    
+    summarizer.summarize(PAGE, "owner/repo")
+    other = summarizer.summarize(PAGE, "someone/else")
+    
+    assert other == "summary 2"
+    assert '"someone/else"' in calls[1]
+
+
+def test_prompt_version_bump_invalidates_memoized_summaries(monkeypatch):
+    calls = []
+    monkeypatch.setattr(source_summaries.llm_client, "complete", fake_complete(calls))
+    summarizer = SourceSummarizer()
+    
+    summarizer.summarize(PAGE, "owner/repo")
+    monkeypatch.setattr(source_summaries, "SUMMARY_PROMPT_VERSION", source_summaries.SUMMARY_PROMPT_VERSION + 1)
+    
+    assert summarizer.summarize(PAGE, "owner/repo") == "summary 2"
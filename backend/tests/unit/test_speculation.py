@@ -0,0 +1,32 @@
+import threading
+
+from app.agents.coordinator import Coordinator
+from app.config import settings
+from app.utils.cancellation import InvestigationCancelled
+
+
+def test_discarding_speculation_stops_a_search_that_already_started(monkeypatch):
+    monkeypatch.setattr(settings, "SPECULATIVE_MODE", "web")
+    started = threading.Event()
+    outcome = {}
+    
+    def search_web(repo_url, repo_name, cancel_token=None):
+        started.set()
+        try:
+            cancel_token.wait(5)
+            outcome["result"] = "finished"
+        except InvestigationCancelled as e:
+            outcome["result"] = f"stopped: {e}"
+            raise
+    
+    coordinator = Coordinator()
+    monkeypatch.setattr(coordinator.scout, "search_web", search_web)
+    
+    coordinator.start_speculation({"repo_url": "https://github.com/a/b", "scout_data": {"repo_name": "b"}})
+    assert started.wait(1)
+    future = coordinator._speculative_web
+    coordinator.discard_speculative_web()
+    future.exception(timeout=1)
+    
+    assert outcome == {"result": "stopped: Speculative web search discarded"}
+    assert not coordinator.cancel_token.is_cancelled
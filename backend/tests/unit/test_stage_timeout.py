@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from app import worker
+from app.agents.analyst import AnalystAgent
+from app.config import settings
+from app.utils.cancellation import StageTimeout
+
+
+class DummySession:
+    def close(self):
+        pass
+
+
+def test_analyst_stage_deadline_fails_the_job(monkeypatch):
+    """A StageTimeout inside the analyst must reach job_queue.fail, not an error result"""
+    failed = []
+    recorded = []
+    
+    monkeypatch.setattr(settings, "FASTPATH_ENABLED", False)
+    monkeypatch.setattr(AnalystAgent, "build_analysis_prompt", lambda self, scout_data: "prompt")
+    
+    def slow_completion(self, messages, model):
+        time.sleep(0.05)
+        self.cancel_token.check()
+    
+    monkeypatch.setattr(AnalystAgent, "request_completion", slow_completion)
+    
+    def run_investigation(investigation_id, repo_url, payload, cancel_token):
+        with cancel_token.stage("analyst", 0.01):
+            AnalystAgent(cancel_token=cancel_token).analyze({"repo_info": {}})
+    
+    monkeypatch.setattr(worker, "run_investigation", run_investigation)
+    monkeypatch.setattr(worker, "SessionLocal", DummySession)
+    monkeypatch.setattr(worker.job_queue, "is_cancelled", lambda db, job_id: False)
+    monkeypatch.setattr(worker.job_queue, "fail", lambda db, job_id, error: failed.append((job_id, error)) or True)
+    monkeypatch.setattr(worker, "record_failure", lambda *args, **kwargs: recorded.append((args, kwargs)))
+    
+    worker.Worker(concurrency=1, worker_id="test").process("test-0", 7, "inv-1", "https://github.com/a/b", {})
+    
+    assert failed == [(7, "Stage 'analyst' exceeded its deadline")]
+    assert recorded == [(("inv-1", "Stage 'analyst' exceeded its deadline"), {"final": False})]
+
+
+def test_stage_timeout_is_not_swallowed_by_analyst(monkeypatch):
+    monkeypatch.setattr(settings, "FASTPATH_ENABLED", False)
+    monkeypatch.setattr(AnalystAgent, "build_analysis_prompt", lambda self, scout_data: "prompt")
+    
+    def timed_out(self, messages, model):
+        raise StageTimeout("Stage 'analyst' exceeded its deadline")
+    
+    monkeypatch.setattr(AnalystAgent, "request_completion", timed_out)
+    
+    with pytest.raises(StageTimeout):
+        AnalystAgent().analyze({"repo_info": {}})
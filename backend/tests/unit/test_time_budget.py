@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents.coordinator import Coordinator
+
+
+def remaining_at_start(**budget):
+    coordinator = Coordinator()
+    seen = {}
+    
+    def invoke(state):
+        seen["remaining"] = coordinator.time_remaining()
+        return state
+    
+    coordinator.workflow = SimpleNamespace(invoke=invoke)
+    coordinator.investigate("https://github.com/a/b", **budget)
+    return seen["remaining"]
+
+
+def test_relative_budget_starts_now():
+    assert remaining_at_start(time_budget=45) == pytest.approx(45, abs=1)
+
+
+def test_deadline_counts_time_already_spent_queued():
+    deadline_at = datetime.utcnow() + timedelta(seconds=15)  # Submitted with 45s, queued for 30s
+    
+    assert remaining_at_start(time_budget=45, deadline_at=deadline_at) == pytest.approx(15, abs=1)
+
+
+def test_passed_deadline_leaves_no_time():
+    assert remaining_at_start(time_budget=45, deadline_at=datetime.utcnow() - timedelta(seconds=5)) < 0
+
+
+def test_no_budget_means_no_deadline():
+    assert remaining_at_start() is None
@@ -0,0 +1,55 @@
+from app.utils import token_budget
+from app.utils.token_budget import TRUNCATION_MARKER, TokenBudget
+
+
+def use_character_estimate(monkeypatch):
+    # Four characters per token, independent of whether tiktoken is installed
+    monkeypatch.setattr(token_budget, "_get_encoding", lambda: None)
+
+
+def test_higher_priority_sections_are_filled_first(monkeypatch):
+    use_character_estimate(monkeypatch)
+    budget = TokenBudget(100)
+    budget.add("web", ["w" * 200], priority=2)
+    budget.add("git", ["g" * 200], priority=1)
+    
+    assert budget.allocate() == {"web": 50, "git": 50}
+    
+    budget = TokenBudget(40)
+    budget.add("web", ["w" * 200], priority=2)
+    budget.add("git", ["g" * 200], priority=1)
+    
+    assert budget.allocate() == {"web": 0, "git": 40}
+
+
+def test_minimums_are_granted_before_priorities(monkeypatch):
+    use_character_estimate(monkeypatch)
+    budget = TokenBudget(100)
+    budget.add("git", ["g" * 800], priority=1)
+    budget.add("contributors", ["c" * 80], priority=3, min_tokens=10)
+    
+    assert budget.allocate() == {"git": 90, "contributors": 10}
+
+
+def test_fit_keeps_whole_items_then_truncates_one(monkeypatch):
+    use_character_estimate(monkeypatch)
+    budget = TokenBudget(90)
+    budget.add("sources", ["a" * 200, "b" * 200, "c" * 200], priority=1)
+    
+    sources = budget.fit()["sources"]
+    
+    assert sources[0] == "a" * 200
+    assert sources[1] == "b" * 160 + TRUNCATION_MARKER
+    assert len(sources) == 2
+
+
+def test_fit_drops_fragments_too_small_to_keep(monkeypatch):
+    use_character_estimate(monkeypatch)
+    budget = TokenBudget(60)
+    budget.add("sources", ["a" * 200, "b" * 200], priority=1)
+    
+    assert budget.fit() == {"sources": ["a" * 200]}
+    
+    budget = TokenBudget(60)
+    budget.add("sources", ["a" * 200, "b" * 200], priority=1)
+    assert budget.fit() == budget.fit()  # Deterministic
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+import socketio
+
+from app.utils import websocket
+from app.utils.auth import create_access_token
+
+
+def test_connect_requires_a_valid_token(monkeypatch):
+    sessions = {}
+    
+    async def save_session(sid, session):
+        sessions[sid] = session
+    
+    monkeypatch.setattr(websocket.sio, "save_session", save_session)
+    
+    for auth in (None, {}, {"token": "not-a-jwt"}):
+        with pytest.raises(socketio.exceptions.ConnectionRefusedError):
+            asyncio.run(websocket.connect("sid-1", {}, auth))
+    
+    asyncio.run(websocket.connect("sid-1", {}, {"token": create_access_token({"user_id": "user-1"})}))
+    assert sessions == {"sid-1": {"user_id": "user-1"}}
+
+
+def test_subscribe_to_another_users_investigation_is_refused(monkeypatch):
+    emitted, joined, replay_reads = [], [], []
+    
+    async def get_session(sid):
+        return {"user_id": "intruder"}
+    
+    async def emit(event, data, room=None):
+        emitted.append((event, data))
+    
+    async def enter_room(sid, room):
+        joined.append(room)
+    
+    async def stored_gap(investigation_id, last_seq):
+        replay_reads.append(investigation_id)
+        return []
+    
+    monkeypatch.setattr(websocket.sio, "get_session", get_session)
+    monkeypatch.setattr(websocket.sio, "emit", emit)
+    monkeypatch.setattr(websocket.sio, "enter_room", enter_room)
+    monkeypatch.setattr(websocket, "stored_gap", stored_gap)
+    monkeypatch.setattr(
+        websocket, "get_subscription",
+        lambda investigation_id, user_id: (user_id == "owner", None)
+    )
+    
+    asyncio.run(websocket.subscribe("sid-1", {"investigation_id": "inv-1", "last_seq": 0}))
+    
+    assert joined == []
+    assert replay_reads == []
+    assert emitted == [("subscribe_error", {"investigation_id": "inv-1", "error": "Investigation not found"})]
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+from app import worker
+from app.config import settings
+
+
+class DummySession:
+    def close(self):
+        pass
+
+
+def test_lost_lease_stops_the_run_without_recording_an_outcome(monkeypatch):
+    outcomes = []
+    
+    def run_investigation(investigation_id, repo_url, payload, cancel_token):
+        cancel_token.wait(10)
+        outcomes.append("ran to the end")
+    
+    monkeypatch.setattr(settings, "CANCEL_POLL_INTERVAL_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "JOB_VISIBILITY_TIMEOUT_SECONDS", 3)  # Heartbeat after 1s
+    monkeypatch.setattr(worker, "run_investigation", run_investigation)
+    monkeypatch.setattr(worker, "SessionLocal", DummySession)
+    monkeypatch.setattr(worker.job_queue, "is_cancelled", lambda db, job_id: False)
+    monkeypatch.setattr(worker.job_queue, "heartbeat", lambda db, job_id, worker_id: False)
+    monkeypatch.setattr(worker.job_queue, "fail", lambda *args: outcomes.append("failed"))
+    monkeypatch.setattr(worker.job_queue, "complete", lambda *args: outcomes.append("completed"))
+    monkeypatch.setattr(worker, "record_cancelled", lambda *args: outcomes.append("cancelled"))
+    monkeypatch.setattr(worker, "record_failure", lambda *args, **kwargs: outcomes.append("failure recorded"))
+    
+    worker.Worker(concurrency=1, worker_id="test").process("test-0", 7, "inv-1", "https://github.com/a/b", {})
+    
+    assert outcomes == []
+
+
+def test_exhausted_jobs_are_failed_before_claiming(monkeypatch):
+    failures = []
+    claims = []
+    w = worker.Worker(concurrency=1, worker_id="test")
+    
+    def claim(db, slot_id):
+        claims.append(slot_id)
+        w.stop()
+        return None
+    
+    monkeypatch.setattr(worker, "SessionLocal", DummySession)
+    monkeypatch.setattr(worker.job_queue, "reap_exhausted", lambda db: ["inv-1"])
+    monkeypatch.setattr(worker.job_queue, "claim", claim)
+    monkeypatch.setattr(worker, "record_failure", lambda *args, **kwargs: failures.append((args, kwargs)))
+    
+    w._loop("test-0")
+    
+    assert failures == [(("inv-1", worker.job_queue.WORKER_LOST_ERROR), {"final": True})]
+    assert claims == ["test-0"]
+
+
+def test_retry_is_published_after_it_is_committed(monkeypatch):
+    steps = []
+    investigation = SimpleNamespace(status="processing")
+    
+    class RetrySession(DummySession):
+        def query(self, model):
+            return SimpleNamespace(filter=lambda *criteria: SimpleNamespace(first=lambda: investigation))
+        
+        def add(self, row):
+            steps.append("add")
+        
+        def commit(self):
+            steps.append("commit")
+    
+    monkeypatch.setattr(worker, "SessionLocal", RetrySession)
+    monkeypatch.setattr(worker, "last_seq", lambda db, investigation_id: 3)
+    monkeypatch.setattr(worker.event_bus, "publish", lambda event, **args: steps.append(("publish", args["seq"])))
+    
+    worker.record_failure("inv-1", "boom", final=False)
+    
+    assert investigation.status == "pending"
+    assert steps == ["add", "commit", ("publish", 4)]
@@ -0,0 +1,23 @@
+import { motion } from 'framer-motion';
+import ReactMarkdown from 'react-markdown';
+
+// Narrator output as it is written - Dark theme (Compact)
+const LiveReport = ({ report }) => {
+    return (
+        <motion.div
+            initial={{ opacity: 0, y: 20 }}
+            animate={{ opacity: 1, y: 0 }}
+            className="bg-black/40 backdrop-blur-xl rounded-2xl border border-white/5 p-4"
+        >
+            <h3 className="text-xs font-medium text-gray-400 mb-2 flex items-center gap-1">
+                <span>📝</span>
+                Report in progress
+            </h3>
+            <div className="prose prose-invert prose-sm max-w-none max-h-80 overflow-y-auto scrollbar-hide text-gray-300">
+                <ReactMarkdown>{report}</ReactMarkdown>
+            </div>
+        </motion.div>
+    );
+};
+
+export default LiveReport;
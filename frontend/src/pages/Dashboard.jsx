@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { investigations } from '../services/api';
@@ -10,6 +10,7 @@ import ProgressMetrics from '../components/ProgressMetrics';
 import AgentStatusPanel from '../components/AgentStatusPanel';
 import AnimatedHypothesis from '../components/AnimatedHypothesis';
 import AnimatedLogFeed from '../components/AnimatedLogFeed';
+import LiveReport from '../components/LiveReport';
 
 function Dashboard() {
     const { id } = useParams();
@@ -21,7 +22,11 @@ function Dashboard() {
     const [confidence, setConfidence] = useState(0);
     const [status, setStatus] = useState('pending');
     const [loading, setLoading] = useState(true);
+    const logCursor = useRef({}); // Cursors into the logs API for fallback polling (own and leader rows)
     const [hypothesis, setHypothesis] = useState('');
+    const [liveReport, setLiveReport] = useState(''); // Narrator output streamed so far
+    const liveReportRef = useRef(''); // Same text, readable from the socket handlers
+    const pendingChunks = useRef([]); // Chunks past the end of liveReport, waiting for the gap to fill
     const [metrics, setMetrics] = useState({ commitsAnalyzed: 0, sourcesFound: 0, roundsCompleted: 0 });
     const [agentStatus, setAgentStatus] = useState({
         coordinator: 'idle',
@@ -52,152 +57,248 @@ function Dashboard() {
         narrator: 'text-purple-300'
     }[agent] || 'text-gray-300');
 
-    // Initial fetch and WebSocket setup
-    useEffect(() => {
-        const fetchInvestigation = async () => {
-            try {
-                const response = await investigations.get(id);
-                setInvestigation(response.data);
-                setStatus(response.data.status);
-                setConfidence(response.data.confidence || 0);
-                setLoading(false);
-            } catch (error) {
-                console.error('Failed to fetch investigation:', error);
-                setLoading(false);
-            }
-        };
+    // Counters, hypothesis and agent activity derived from the log feed
+    const deriveFromLogs = (logsData, currentStatus) => {
+        let commitsCount = 0;
+        let sourcesCount = 0;
+        let currentHypothesis = '';
+        const activeAgents = new Set();
 
-        fetchInvestigation();
-        socketService.connect();
-        socketService.subscribe(id);
-
-        socketService.on('agent_message', (data) => {
-            if (data.investigation_id === id) {
-                setLogs((prev) => [...prev, {
-                    agent: data.agent_name,
-                    message: data.message,
-                    data: data.data,
-                    timestamp: new Date().toISOString(),
-                }]);
-                setAgentStatus(prev => ({ ...prev, [data.agent_name]: 'active' }));
+        logsData.forEach(log => {
+            activeAgents.add(log.agent);
+            // Final confidence comes from the investigation record once completed
+            if (currentStatus !== 'completed') {
+                // Extract confidence from log data
+                if (log.data?.confidence !== undefined) {
+                    setConfidence(log.data.confidence);
+                }
+                // Also extract confidence from log messages (e.g., "Confidence score: 65%")
+                const confMatch = log.message.match(/[Cc]onfidence[:\s]+(\d+)%?/);
+                if (confMatch) {
+                    setConfidence(parseInt(confMatch[1]));
+                }
+            }
+            if (log.agent === 'analyst' && log.message.includes('Analysis complete:')) {
+                currentHypothesis = log.message.replace('Analysis complete: ', '');
+            }
+            if (log.message.includes('commits')) {
+                const match = log.message.match(/(\d+)\s*commits/);
+                if (match) commitsCount = parseInt(match[1]);
+            }
+            if (log.message.includes('Scraping') || log.message.includes('sources')) {
+                sourcesCount++;
             }
         });
 
-        socketService.on('confidence_update', (data) => {
-            if (data.investigation_id === id) setConfidence(data.confidence);
-        });
+        if (currentHypothesis) setHypothesis(currentHypothesis);
 
-        socketService.on('investigation_complete', (data) => {
-            if (data.investigation_id === id) setStatus('completed');
+        const scoutLogs = logsData.filter(l => l.agent === 'scout' && l.message.includes('activated'));
+        setMetrics({
+            commitsAnalyzed: commitsCount,
+            sourcesFound: Math.min(sourcesCount, 10),
+            roundsCompleted: Math.min(scoutLogs.length, 3)
         });
 
-        socketService.on('investigation_error', (data) => {
-            if (data.investigation_id === id) setStatus('failed');
-        });
+        // If completed or failed, set all agents to idle/completed
+        if (currentStatus === 'completed' || currentStatus === 'failed' || currentStatus === 'cancelled') {
+            setAgentStatus({
+                coordinator: 'completed',
+                scout: 'completed',
+                analyst: 'completed',
+                narrator: 'completed'
+            });
+        } else {
+            // Active investigation - calculate from recent logs
+            const recentAgents = logsData.slice(-5).map(l => l.agent);
+            setAgentStatus({
+                coordinator: recentAgents.includes('coordinator') ? 'active' : (activeAgents.has('coordinator') ? 'waiting' : 'idle'),
+                scout: recentAgents.includes('scout') ? 'active' : (activeAgents.has('scout') ? 'waiting' : 'idle'),
+                analyst: recentAgents.includes('analyst') ? 'active' : (activeAgents.has('analyst') ? 'waiting' : 'idle'),
+                narrator: recentAgents.includes('narrator') ? 'active' : (activeAgents.has('narrator') ? 'waiting' : 'idle')
+            });
+        }
+    };
 
-        return () => {
-            socketService.unsubscribe(id);
-            socketService.off('agent_message');
-            socketService.off('confidence_update');
-            socketService.off('investigation_complete');
-            socketService.off('investigation_error');
-        };
-    }, [id, navigate]);
+    // Show the live report, extended by any waiting chunks that now connect to it
+    const showReport = (text) => {
+        let merged = true;
+        while (merged) {
+            merged = false;
+            const waiting = [];
+            for (const { offset, chunk } of pendingChunks.current) {
+                if (offset > text.length) {
+                    waiting.push({ offset, chunk });
+                    continue;
+                }
+                if (offset + chunk.length > text.length) text = text.slice(0, offset) + chunk;
+                merged = true;
+            }
+            pendingChunks.current = waiting;
+        }
+        liveReportRef.current = text;
+        setLiveReport(text);
+    };
 
-    // Polling for logs and status
-    useEffect(() => {
-        const pollData = async () => {
-            try {
-                const logsResponse = await investigations.getLogs(id);
-                const logsData = logsResponse.data.map(log => ({
-                    agent: log.agent_name,
-                    message: log.message,
-                    data: log.data,
-                    timestamp: log.timestamp
-                }));
-                setLogs(logsData);
-
-                let commitsCount = 0;
-                let sourcesCount = 0;
-                let currentHypothesis = '';
-                const activeAgents = new Set();
-
-                logsData.forEach(log => {
-                    activeAgents.add(log.agent);
-                    // Extract confidence from log data
-                    if (log.data?.confidence !== undefined) {
-                        setConfidence(log.data.confidence);
-                    }
-                    // Also extract confidence from log messages (e.g., "Confidence score: 65%")
-                    const confMatch = log.message.match(/[Cc]onfidence[:\s]+(\d+)%?/);
-                    if (confMatch) {
-                        setConfidence(parseInt(confMatch[1]));
-                    }
-                    if (log.agent === 'analyst' && log.message.includes('Analysis complete:')) {
-                        currentHypothesis = log.message.replace('Analysis complete: ', '');
-                    }
-                    if (log.message.includes('commits')) {
-                        const match = log.message.match(/(\d+)\s*commits/);
-                        if (match) commitsCount = parseInt(match[1]);
-                    }
-                    if (log.message.includes('Scraping') || log.message.includes('sources')) {
-                        sourcesCount++;
-                    }
-                });
+    // Investigation record (status, final confidence)
+    const fetchInvestigation = async () => {
+        try {
+            const invResponse = await investigations.get(id);
+            setInvestigation(invResponse.data);
+            setStatus(invResponse.data.status);
+
+            // The worker persists the partial report; it seeds chunks missed while away
+            const partial = invResponse.data.report;
+            if (['pending', 'processing'].includes(invResponse.data.status) && partial
+                && partial.length > liveReportRef.current.length) {
+                showReport(partial);
+            }
+
+            // Only update confidence from backend if it's non-zero,
+            // effectively preventing flickering if backend state lags behind logs
+            if (invResponse.data.confidence && invResponse.data.confidence > 0) {
+                setConfidence(invResponse.data.confidence);
+            } else if (invResponse.data.confidence === 0 && invResponse.data.status === 'completed') {
+                // Only set to 0 if completed and actually 0
+                setConfidence(0);
+            }
+        } catch (error) {
+            console.error('Failed to fetch investigation:', error);
+        } finally {
+            setLoading(false);
+        }
+    };
 
-                if (currentHypothesis) setHypothesis(currentHypothesis);
+    // Identifies an agent event across replays, live pushes and the logs API
+    // Sequenced events dedupe by seq; older unsequenced rows from the logs API by id
+    const eventKey = (event) => {
+        if (event.seq != null) return `${event.investigation_id}:${event.seq}`;
+        return event.id != null ? `id:${event.id}` : null;
+    };
 
-                const scoutLogs = logsData.filter(l => l.agent === 'scout' && l.message.includes('activated'));
-                setMetrics({
-                    commitsAnalyzed: commitsCount,
-                    sourcesFound: Math.min(sourcesCount, 10),
-                    roundsCompleted: Math.min(scoutLogs.length, 3)
+    const toLog = (event) => ({
+        key: eventKey(event),
+        agent: event.agent_name,
+        message: event.message,
+        data: event.data,
+        timestamp: event.timestamp || new Date().toISOString()
+    });
+
+    // Rows newer than the last log fetched from the API - only needed while the WebSocket is down
+    const fetchLogs = async () => {
+        try {
+            let hasMore = true;
+            while (hasMore) {
+                const cursor = logCursor.current;
+                const logsResponse = await investigations.getLogs(id, cursor.lastId, cursor.leaderLastId);
+                if (logsResponse.status === 204) break; // Nothing new
+                const leaderId = logsResponse.headers['x-leader-id'] || null;
+                const leaderChanged = cursor.lastId != null && leaderId !== (cursor.leaderId || null);
+                logCursor.current = {
+                    lastId: Number(logsResponse.headers['x-last-id']),
+                    leaderId,
+                    // Attached to a different run - read that one from its start
+                    leaderLastId: leaderId && !leaderChanged ? Number(logsResponse.headers['x-leader-last-id']) : undefined
+                };
+                hasMore = logsResponse.headers['x-has-more'] === 'true' || (leaderChanged && leaderId !== null);
+
+                const page = logsResponse.data.map(toLog);
+                setLogs((prev) => {
+                    const seen = new Set(prev.map((log) => log.key).filter(Boolean));
+                    return [...prev, ...page.filter((log) => !log.key || !seen.has(log.key))];
                 });
+            }
+        } catch (error) {
+            console.error('Failed to fetch logs:', error);
+        }
+    };
 
-                // Update agent statuses based on investigation status
-                const invResponse = await investigations.get(id);
-                const currentStatus = invResponse.data.status;
-                setStatus(currentStatus);
-
-                // Only update confidence from backend if it's non-zero, 
-                // effectively preventing flickering if backend state lags behind logs
-                if (invResponse.data.confidence && invResponse.data.confidence > 0) {
-                    setConfidence(invResponse.data.confidence);
-                } else if (invResponse.data.confidence === 0 && currentStatus === 'completed') {
-                    // Only set to 0 if completed and actually 0
-                    setConfidence(0);
-                }
+    // Initial fetch, then the event history replayed on subscribe and live updates
+    useEffect(() => {
+        // Events for this investigation, or for the run it follows
+        let leaderId = null;
+        let resubscribed = false;
+        let lastReseed = 0;
+        const isOurs = (data) => data.investigation_id === id || data.investigation_id === leaderId;
 
-                // If completed or failed, set all agents to idle/completed
-                if (currentStatus === 'completed' || currentStatus === 'failed') {
-                    setAgentStatus({
-                        coordinator: 'completed',
-                        scout: 'completed',
-                        analyst: 'completed',
-                        narrator: 'completed'
-                    });
-                } else {
-                    // Active investigation - calculate from recent logs
-                    const recentAgents = logsData.slice(-5).map(l => l.agent);
-                    setAgentStatus({
-                        coordinator: recentAgents.includes('coordinator') ? 'active' : (activeAgents.has('coordinator') ? 'waiting' : 'idle'),
-                        scout: recentAgents.includes('scout') ? 'active' : (activeAgents.has('scout') ? 'waiting' : 'idle'),
-                        analyst: recentAgents.includes('analyst') ? 'active' : (activeAgents.has('analyst') ? 'waiting' : 'idle'),
-                        narrator: recentAgents.includes('narrator') ? 'active' : (activeAgents.has('narrator') ? 'waiting' : 'idle')
-                    });
+        const appendEvents = (events) => {
+            setLogs((prev) => {
+                const seen = new Set(prev.map((log) => log.key).filter(Boolean));
+                const fresh = events.filter((event) => isOurs(event) && !seen.has(eventKey(event)));
+                return fresh.length ? [...prev, ...fresh.map(toLog)] : prev;
+            });
+        };
+
+        const handlers = {
+            subscribed: (data) => {
+                if (data.investigation_id !== id) return;
+                leaderId = data.leader_id;
+                // After a reconnect, catch up on status and the report written meanwhile
+                if (resubscribed) fetchInvestigation();
+                resubscribed = true;
+            },
+            replay: (data) => {
+                if (data.investigation_id === id) {
+                    leaderId = data.leader_id;
+                    appendEvents(data.events);
+                }
+            },
+            agent_message: (data) => appendEvents([data]),
+            report_chunk: (data) => {
+                if (!isOurs(data)) return;
+                const current = liveReportRef.current;
+                if (data.offset <= current.length) {
+                    // In order, or a retried run starting over at offset 0
+                    showReport(current.slice(0, data.offset) + data.chunk);
+                    return;
                 }
-            } catch (error) {
-                console.error('Polling error:', error);
+                // Chunks were missed - hold this one and fetch the persisted partial report
+                pendingChunks.current.push({ offset: data.offset, chunk: data.chunk });
+                if (Date.now() - lastReseed > 3000) {
+                    lastReseed = Date.now();
+                    fetchInvestigation();
+                }
+            },
+            confidence_update: (data) => {
+                if (isOurs(data)) setConfidence(data.confidence);
+            },
+            // Pick up the final report and confidence
+            investigation_complete: (data) => {
+                if (isOurs(data)) fetchInvestigation();
+            },
+            investigation_error: (data) => {
+                if (isOurs(data)) fetchInvestigation();
             }
         };
 
-        const interval = setInterval(() => {
-            if (status === 'processing' || status === 'pending') pollData();
-        }, 2000);
+        logCursor.current = {};
+        pendingChunks.current = [];
+        showReport('');
+        fetchInvestigation();
+        socketService.connect();
+        Object.entries(handlers).forEach(([event, handler]) => socketService.on(event, handler));
+        // A fresh page replays the whole history; reconnects only what was missed
+        socketService.subscribe(id, { replayAll: true });
+
+        return () => {
+            socketService.unsubscribe(id);
+            Object.entries(handlers).forEach(([event, handler]) => socketService.off(event, handler));
+        };
+    }, [id, navigate]);
 
-        pollData();
+    useEffect(() => {
+        deriveFromLogs(logs, status);
+    }, [logs, status]);
+
+    // Fallback polling only while the WebSocket is disconnected
+    useEffect(() => {
+        const interval = setInterval(() => {
+            if ((status === 'processing' || status === 'pending') && !socketService.isConnected()) {
+                fetchLogs();
+                fetchInvestigation();
+            }
+        }, 5000);
         return () => clearInterval(interval);
-    }, [id, status, navigate]);
+    }, [id, status]);
 
     // Loading state
     if (loading) {
@@ -360,6 +461,7 @@ function Dashboard() {
                         <ConfidenceScore confidence={confidence} status={status} />
                         <AnimatedHypothesis hypothesis={hypothesis} />
                         <ProgressMetrics metrics={metrics} />
+                        {liveReport && status !== 'completed' && <LiveReport report={liveReport} />}
                     </motion.div>
                 </div>
             </div>
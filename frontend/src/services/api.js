@@ -42,8 +42,17 @@ export const investigations = {
   delete: (id) =>
     api.delete(`/api/investigations/${id}`),
   
-  getLogs: (id) =>
-    api.get(`/api/investigations/${id}/logs`),
+  cancel: (id) =>
+    api.post(`/api/investigations/${id}/cancel`),
+  
+  // Pass the previous page's X-Last-Id / X-Leader-Last-Id headers to get only newer rows
+  getLogs: (id, afterId = null, leaderAfterId = null) =>
+    api.get(`/api/investigations/${id}/logs`, {
+      params: {
+        ...(afterId != null ? { after_id: afterId } : {}),
+        ...(leaderAfterId != null ? { leader_after_id: leaderAfterId } : {}),
+      },
+    }),
 };
 
 export default api;
\ No newline at end of file
@@ -5,12 +5,32 @@ const SOCKET_URL = import.meta.env.VITE_SOCKET_URL || 'http://localhost:8000';
 class SocketService {
   constructor() {
     this.socket = null;
+    this.subscriptions = new Set();
+    this.lastSeq = new Map(); // Highest agent event seq seen, per investigation stream
+    this.leaders = new Map(); // Investigation -> the shared run it follows
+  }
+
+  trackSeq(event) {
+    if (event.seq != null && event.seq > (this.lastSeq.get(event.investigation_id) ?? 0)) {
+      this.lastSeq.set(event.investigation_id, event.seq);
+    }
+  }
+
+  sendSubscribe(investigationId) {
+    // The server replays whatever arrived after these positions before going live
+    this.socket.emit('subscribe', {
+      investigation_id: investigationId,
+      last_seq: this.lastSeq.get(investigationId) ?? 0,
+      leader_last_seq: this.lastSeq.get(this.leaders.get(investigationId)) ?? 0,
+    });
   }
 
   connect() {
     if (!this.socket) {
       this.socket = io(SOCKET_URL, {
         transports: ['websocket', 'polling'],
+        // Read on every (re)connect so a fresh login is picked up
+        auth: (cb) => cb({ token: localStorage.getItem('token') }),
         reconnection: true,
         reconnectionAttempts: 5,
         reconnectionDelay: 1000,
@@ -18,8 +38,16 @@ class SocketService {
 
       this.socket.on('connect', () => {
         console.log('✅ WebSocket connected:', this.socket.id);
+        // Rooms belong to the old connection; rejoin them after a reconnect
+        this.subscriptions.forEach((id) => this.sendSubscribe(id));
       });
 
+      this.socket.on('subscribed', (data) => {
+        if (data.leader_id) this.leaders.set(data.investigation_id, data.leader_id);
+      });
+      this.socket.on('agent_message', (event) => this.trackSeq(event));
+      this.socket.on('replay', (data) => data.events.forEach((event) => this.trackSeq(event)));
+
       this.socket.on('disconnect', () => {
         console.log('❌ WebSocket disconnected');
       });
@@ -38,14 +66,20 @@ class SocketService {
     }
   }
 
-  subscribe(investigationId) {
-    if (this.socket) {
-      this.socket.emit('subscribe', { investigation_id: investigationId });
+  subscribe(investigationId, { replayAll = false } = {}) {
+    if (replayAll) {
+      this.lastSeq.delete(investigationId);
+      this.lastSeq.delete(this.leaders.get(investigationId));
+    }
+    this.subscriptions.add(investigationId);
+    if (this.socket?.connected) {
+      this.sendSubscribe(investigationId);
       console.log('📡 Subscribed to investigation:', investigationId);
     }
   }
 
   unsubscribe(investigationId) {
+    this.subscriptions.delete(investigationId);
     if (this.socket) {
       this.socket.emit('unsubscribe', { investigation_id: investigationId });
       console.log('🔕 Unsubscribed from investigation:', investigationId);
@@ -64,6 +98,10 @@ class SocketService {
     }
   }
 
+  isConnected() {
+    return Boolean(this.socket?.connected);
+  }
+
   getSocket() {
     return this.socket;
   }